@@ -6,19 +6,34 @@ Configura la conexión a MySQL, JWT y registra los blueprints de los controlador
 import os
 import logging
 from dotenv import load_dotenv
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_jwt_extended import JWTManager
 from flasgger import Swagger
 
 from controllers.user_controller import user_bp
+from controllers.bar_controller import bar_bp
+from controllers.reservation_controller import reservation_bp
+from controllers.availability_controller import availability_bp
+from controllers.admin_controller import admin_bp
+from controllers.change_controller import change_bp
 from models.db import db
+from utils import metrics
+from utils.sql_profiler import init_sql_profiler
+from utils.request_profiler import init_request_profiler
+from utils.tracing import init_tracing
+from utils.replicas import init_replicas, replica_status
+from utils.compression import init_compression
+from utils.deadlines import init_deadlines
+from utils.admission import admission_status, init_admission
+from utils.scheduler import init_scheduler
+from utils.logging_config import configure_logging
 
 # =========================
 # Carga de entorno y logging
 # =========================
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+configure_logging()
 logger = logging.getLogger(__name__)
 
 logger.info("Inicializando la aplicación Flask")
@@ -73,25 +88,63 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "tu_clave_secreta_jwt")
 
 jwt = JWTManager(app)
-logger.info(f"Conexión a la base de datos: {app.config['SQLALCHEMY_DATABASE_URI']}")
+logger.info("Conexión a la base de datos: %s", app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Réplicas de lectura opcionales (REPLICA_URLS); deben configurarse antes de init_app
+init_replicas(app)
 
 # Inicializar extensiones
 db.init_app(app)
 logger.info("SQLAlchemy inicializado")
 
+init_tracing(app)
+
+metrics.init_metrics(app)
+logger.info("Métricas inicializadas")
+
+# Compresión gzip/brotli de las respuestas (antes que los hooks que pueden reemplazarlas)
+init_compression(app)
+
+# Plazos por petición (REQUEST_DEADLINE / REQUEST_DEADLINES), propagados a la DB y al SMTP
+init_deadlines(app)
+
+# Control de admisión: descarta la navegación con 503 cuando el pool de conexiones se satura
+init_admission(app, db)
+
+init_sql_profiler(app)
+init_request_profiler(app)
+
+# Tareas programadas (el hilo lo arranca cada worker desde gunicorn.conf.py)
+init_scheduler(app)
+
 # =========================
 # Blueprints
 # =========================
 app.register_blueprint(user_bp)
+app.register_blueprint(bar_bp)
+app.register_blueprint(reservation_bp)
+app.register_blueprint(availability_bp)
+app.register_blueprint(admin_bp)
+app.register_blueprint(change_bp)
 
-logger.info("Blueprint de usuarios registrado")
+logger.info("Blueprints registrados")
 
 # =========================
 # Rutas utilitarias
 # =========================
 @app.route("/health")
 def health():
-    return {"status": "ok"}, 200
+    status = {"status": "ok", "admission": admission_status()}
+    replicas = replica_status()
+    if replicas:
+        status["replicas"] = replicas
+    return status, 200
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Métricas de la API en formato de texto de Prometheus."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
 
 
 @app.route("/")
@@ -108,6 +161,8 @@ def index():
                 "GET /users/": "Listado de usuarios (requiere JWT)",
                 "GET /": "Información de la API",
                 "GET /health": "Health check",
+                "GET /metrics": "Métricas en formato Prometheus",
+                "GET /changes?since=": "Cambios de bares y disponibilidad desde un cursor",
             },
             "repository": "https://github.com/afmirandad/FlaskAPIExample",
         },
@@ -0,0 +1,2 @@
+# Este archivo permite que la carpeta benchmarks sea tratada como un módulo.
+# Ejecuta cada benchmark desde la raíz del proyecto, por ejemplo: python -m benchmarks.bench_logging
@@ -0,0 +1,96 @@
+"""
+Benchmark de la agrupación de bares para el mapa con 100k bares.
+
+Genera los bares con scripts.generate_dataset (determinista), construye la
+grilla jerárquica midiendo tiempo y memoria, y compara por vista de mapa
+(país, ciudad, barrio) la latencia de:
+    grid -> BarClusterService (conteos precalculados en memoria)
+    sql  -> GROUP BY sobre la celda calculada en SQL con el mismo tamaño de
+            celda (agregación completa en cada consulta)
+
+También mide el costo de mover un bar (actualización incremental).
+
+Uso:
+    python -m benchmarks.bench_clusters [bares] [iteraciones]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import cast, func, Integer, select
+
+from benchmarks.common import boot_app, measure
+from scripts.generate_dataset import Writer, generate_bars, generate_genres
+
+# (vista, bbox oeste,sur,este,norte, zoom)
+VIEWS = [
+    ("Colombia", (-80.0, -4.5, -66.0, 13.0), 5),
+    ("Medellín", (-75.70, 6.10, -75.45, 6.40), 11),
+    ("Bogotá", (-74.25, 4.45, -73.95, 4.85), 12),
+    ("barrio", (-75.58, 6.20, -75.55, 6.23), 16),
+]
+
+
+def main() -> None:
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_clusters_'), 'clusters.db')}"
+    writer = Writer(db_url=db_url)
+    generate_bars(writer, bars, seed=42, genre_ids=generate_genres(writer))
+    writer.close()
+
+    app = boot_app(db_url)
+    logging.disable(logging.WARNING)
+    from models.bar import Bar
+    from models.db import db
+    from services.bar_cluster_service import BarClusterService, _build, _view
+
+    with app.test_request_context():
+        started = time.perf_counter()
+        grid = _view.get()
+        build_s = time.perf_counter() - started
+        tracemalloc.start()
+        copy = _build(db.session)
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        del copy
+        db.session.remove()
+
+        print(f"{len(grid)} bares geolocalizados: grilla construida en {build_s:.2f}s, {memory_mb:.0f} MB\n")
+        print(f"{'vista':<12}{'clusters':>9}{'grid p50 ms':>13}{'grid p99 ms':>13}{'sql p50 ms':>12}")
+
+        for name, (west, south, east, north), zoom in VIEWS:
+            def clusters():
+                return BarClusterService.clusters(west, south, east, north, zoom)
+
+            # Mismo tamaño de celda que la grilla, en grados (aproximación lineal, como haría un GROUP BY típico)
+            cell = 360.0 / (1 << BarClusterService.level_for_zoom(zoom))
+
+            def sql():
+                stmt = (select(func.count(), func.avg(Bar.latitude), func.avg(Bar.longitude))
+                        .where(Bar.is_active.is_(True), Bar.latitude.between(south, north),
+                               Bar.longitude.between(west, east))
+                        .group_by(cast(Bar.longitude / cell, Integer), cast(Bar.latitude / cell, Integer)))
+                result = db.session.execute(stmt).all()
+                db.session.remove()
+                return result
+
+            count = len(clusters()["clusters"])
+            grid_stats = measure(clusters, iterations, warmup=3)
+            sql_stats = measure(sql, max(3, iterations // 5), warmup=1)
+            print(f"{name:<12}{count:>9}{grid_stats['p50_us'] / 1000:>13.2f}{grid_stats['p99_us'] / 1000:>13.2f}"
+                  f"{sql_stats['p50_us'] / 1000:>12.2f}")
+
+        bar_id = next(iter(grid.points))
+        lat, lon, score, data = grid.points[bar_id]
+        moves = iter(range(10**9))
+        move = measure(lambda: grid.upsert(bar_id, lat + (next(moves) % 2) * 0.01, lon, score, data), 2000, warmup=10)
+        print(f"\nmover un bar (actualización incremental): p50 {move['p50_us']:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+CPU de la compresión de respuestas frente a bytes ahorrados (utils/compression.py).
+
+Genera los cuerpos reales de `GET /bars/` (catálogo), `GET /bars/<id>` y
+`GET /availability/bar/<id>` contra una base SQLite temporal y, para cada
+codificación y nivel, mide el tiempo de comprimir y el tamaño resultante.
+La última fila de cada cuerpo es la ruta precomprimida: hash del cuerpo y
+acierto en el caché (ya recomprimido al nivel alto en segundo plano), lo
+que cuesta cada petición mientras los datos no cambian. brotli aparece solo si el paquete está instalado.
+
+Uso:
+    python -m benchmarks.bench_compression [bares] [iteraciones]
+"""
+import logging
+import os
+import sys
+
+from benchmarks.common import boot_app, measure, seed_dataset
+from utils import compression
+
+
+def main() -> None:
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    logging.disable(logging.CRITICAL)
+    os.environ.setdefault("COMPRESS_ENABLED", "0")
+    app = boot_app()
+    dataset = seed_dataset(app, bars=bars, users=1, days=14)
+    compression.ENABLED = False
+    client = app.test_client()
+    bar_id = dataset["bar_ids"][0]
+    bodies = {
+        f"GET /bars/ ({bars} bares)": client.get("/bars/").get_data(),
+        "GET /bars/<id>": client.get(f"/bars/{bar_id}").get_data(),
+        "GET /availability/bar/<id>": client.get(f"/availability/bar/{bar_id}").get_data(),
+    }
+
+    levels = [("gzip", 1), ("gzip", compression.COMPRESS_GZIP_LEVEL), ("gzip", 9)]
+    if compression.brotli is not None:
+        levels += [("br", 1), ("br", compression.COMPRESS_BR_QUALITY), ("br", 11)]
+    else:
+        print("brotli no instalado (pip install brotli): solo gzip\n")
+
+    for name, body in bodies.items():
+        print(f"{name}: {len(body):,} bytes")
+        print(f"  {'codificación':<14} {'bytes':>9} {'ahorro':>7} {'p50 µs':>9} {'µs/KB':>7}")
+        for encoding, level in levels:
+            function = compression.ENCODINGS[encoding][0]
+            size = len(function(body, level))
+            stats = measure(lambda: function(body, level), iterations, warmup=5)
+            print(f"  {encoding + ' ' + str(level):<14} {size:>9,} {1 - size / len(body):>7.0%} "
+                  f"{stats['p50_us']:>9.0f} {stats['p50_us'] / (len(body) / 1024):>7.1f}")
+        encoding = "br" if compression.brotli is not None else "gzip"
+        compression.compress(body, encoding, cacheable=True)
+        compression._upgrader.wait()
+        cached = compression.compress(body, encoding, cacheable=True)
+        stats = measure(lambda: compression.compress(body, encoding, cacheable=True), iterations * 10, warmup=5)
+        print(f"  {encoding + ' cacheado':<14} {len(cached):>9,} {1 - len(cached) / len(body):>7.0%} "
+              f"{stats['p50_us']:>9.1f} {stats['p50_us'] / (len(body) / 1024):>7.2f}\n")
+
+
+if __name__ == "__main__":
+    main()
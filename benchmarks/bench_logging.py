@@ -0,0 +1,91 @@
+"""
+Benchmark del costo de logging por petición.
+
+Compara la misma petición (GET /users/ con JWT, que registra logs en
+controlador, servicio y repositorio) en cuatro modos:
+    off   -> logging deshabilitado
+    sync  -> StreamHandler síncrono con formato de texto (comportamiento anterior)
+    sync-json -> StreamHandler síncrono con JsonFormatter (mismo formato, sin cola)
+    queue -> QueueHandler + escritor en segundo plano con JSON (configure_logging)
+
+Cada modo se mide en varias rondas intercaladas y se reporta la mejor, para
+reducir el ruido del calentamiento y de la máquina.
+
+El tercer argumento simula un destino lento (p. ej. un pipe hacia un colector
+saturado) añadiendo una espera en microsegundos por cada escritura; ahí es
+donde el modo con cola aísla a la petición de la E/S.
+
+Uso:
+    python -m benchmarks.bench_logging [iteraciones] [rondas] [espera_us_por_escritura]
+"""
+import logging
+import sys
+import time
+
+from benchmarks.common import auth_header, boot_app, measure
+from utils import logging_config
+
+
+class _Sink:
+    """Destino de logs que descarta la salida, opcionalmente con latencia por escritura."""
+
+    def __init__(self, delay_us: float):
+        self.delay = delay_us / 1e6
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def _set_mode(mode: str, sink) -> None:
+    logging_config.shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logging.disable(logging.NOTSET)
+
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode in ("sync", "sync-json"):
+        handler = logging.StreamHandler(sink)
+        if mode == "sync":
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        else:
+            handler.setFormatter(logging_config.JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        logging_config.configure_logging(level="INFO", fmt="json", stream=sink)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    delay_us = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    app = boot_app()
+    client = app.test_client()
+    headers = auth_header(client)
+
+    sink = _Sink(delay_us)
+    results = {}
+    for _ in range(rounds):
+        for mode in ("off", "sync", "sync-json", "queue"):
+            _set_mode(mode, sink)
+            stats = measure(lambda: client.get("/users/", headers=headers), iterations)
+            if mode not in results or stats["mean_us"] < results[mode]["mean_us"]:
+                results[mode] = stats
+    _set_mode("off", sink)
+
+    baseline = results["off"]["mean_us"]
+    print(f"{'modo':<10}{'media µs':>12}{'p50 µs':>12}{'p99 µs':>12}{'overhead':>12}")
+    for mode, stats in results.items():
+        overhead = stats["mean_us"] - baseline
+        print(f"{mode:<10}{stats['mean_us']:>12.1f}{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}{overhead:>+12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Sobrecarga con y sin control de admisión (utils/admission.py).
+
+Arranca la app contra una base SQLite temporal y añade a cada sentencia un
+tiempo de servicio fijo (simula una base de datos ocupada, con la conexión
+retenida). Las peticiones llegan a ritmo fijo (llegadas de Poisson a
+--rate por segundo, por encima de la capacidad) a una cola atendida por
+--threads hilos, como un worker gthread con su backlog: la mayoría navega
+(listado, detalle, disponibilidad) y una parte reserva.
+
+Para cada modo mide por clase el goodput (respuestas 2xx que llegan antes
+del timeout del cliente, contado desde la llegada, por segundo), las
+respuestas tardías (trabajo desperdiciado), los descartes (503) y los
+percentiles de latencia de las respuestas correctas.
+
+Uso:
+    python -m benchmarks.bench_overload [--rate 400] [--threads 64] [--duration 10] [--service-ms 5]
+"""
+import argparse
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.common import boot_app, percentile, seed_dataset
+
+BROWSE_SHARE = 0.85
+
+
+def _login(client, username: str, password: str) -> dict:
+    response = client.post("/users/login", json={"username": username, "password": password})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def _request(client, rng, dataset: dict, headers: dict):
+    bar_id = rng.choice(dataset["bar_ids"][:20])
+    if rng.random() < BROWSE_SHARE:
+        kind = rng.choice(("list", "detail", "availability"))
+        path = {"list": "/bars/?limit=50", "detail": f"/bars/{bar_id}",
+                "availability": f"/availability/bar/{bar_id}"}[kind]
+        return "browse", client.get(path, headers=headers)
+    day = date.today() + timedelta(days=rng.randrange(dataset["days"]))
+    return "booking", client.post("/reservations/", headers=headers, json={
+        "bar_id": bar_id, "full_name": "Cliente Bench", "phone": "+57 3000000000", "num_people": 2,
+        "reservation_date": day.isoformat(), "reservation_time": rng.choice(["22:00", "23:00", "00:00", "01:00"]),
+    })
+
+
+def run(app, dataset: dict, tokens: list, enabled: bool, args) -> dict:
+    from utils import admission
+    admission.ENABLED = enabled
+    pending = queue.Queue()
+    results = {"browse": [], "booking": []}  # (latencia desde la llegada, status)
+    lock = threading.Lock()
+    started = time.monotonic()
+    stop = started + args.duration
+
+    def arrivals():
+        rng = random.Random(0)
+        at = started
+        i = 0
+        while at < stop:
+            at += rng.expovariate(args.rate)
+            time.sleep(max(0.0, at - time.monotonic()))
+            pending.put((at, i))
+            i += 1
+
+    def server_thread(n):
+        rng = random.Random(n)
+        client = app.test_client()
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            arrived, i = item
+            klass, response = _request(client, rng, dataset, tokens[i % len(tokens)])
+            with lock:
+                results[klass].append((time.monotonic() - arrived, response.status_code))
+
+    threads = [threading.Thread(target=server_thread, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    arrivals()
+    # Lo que siga en cola pasado el timeout del cliente ya no le sirve a nadie
+    time.sleep(args.client_timeout)
+    abandoned = 0
+    while True:
+        try:
+            pending.get_nowait()
+            abandoned += 1
+        except queue.Empty:
+            break
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for klass, samples in results.items():
+        good = sorted(lat for lat, status in samples if status < 300 and lat <= args.client_timeout)
+        ok = sorted(lat for lat, status in samples if status < 300)
+        report[klass] = {
+            "requests": len(samples),
+            "goodput": len(good) / args.duration,
+            "late": len(ok) - len(good),
+            "shed": sum(1 for _, status in samples if status == 503),
+            "errors": sum(1 for _, status in samples if status >= 300 and status != 503),
+            "p50_ms": percentile(ok, 50) * 1000,
+            "p99_ms": percentile(ok, 99) * 1000,
+        }
+    report["abandoned"] = abandoned
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=400.0, help="peticiones por segundo")
+    parser.add_argument("--threads", type=int, default=64, help="hilos del worker")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--service-ms", type=float, default=5.0, help="tiempo de servicio añadido a cada sentencia")
+    parser.add_argument("--client-timeout", type=float, default=1.0, help="una respuesta más lenta no cuenta")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    # Todos los clientes salen de la misma IP: sin límite de peticiones
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    app = boot_app()
+    dataset = seed_dataset(app, bars=200, users=32, days=14)
+    setup = app.test_client()
+    tokens = [_login(setup, username, dataset["password"]) for username in dataset["usernames"]]
+
+    service_s = args.service_ms / 1000.0
+
+    def slow_database(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(service_s)
+    event.listen(Engine, "before_cursor_execute", slow_database)
+
+    print(f"{args.rate:g} peticiones/s sobre {args.threads} hilos, {args.duration:.0f}s por modo, {args.service_ms:g} ms por sentencia, "
+          f"timeout del cliente {args.client_timeout:g}s, {BROWSE_SHARE:.0%} navegación")
+    for enabled in (False, True):
+        report = run(app, dataset, tokens, enabled, args)
+        print(f"\nadmisión {'activada' if enabled else 'desactivada'}:")
+        print(f"  {'clase':<8} {'goodput/s':>10} {'tarde':>7} {'503':>7} {'errores':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        abandoned = report.pop("abandoned")
+        for klass, row in report.items():
+            print(f"  {klass:<8} {row['goodput']:>10.1f} {row['late']:>7} {row['shed']:>7} {row['errors']:>8} "
+                  f"{row['p50_ms']:>8.0f} {row['p99_ms']:>8.0f}")
+        print(f"  sin atender al terminar: {abandoned}")
+
+
+if __name__ == "__main__":
+    main()
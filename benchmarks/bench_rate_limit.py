@@ -0,0 +1,52 @@
+"""
+Costo del límite de peticiones (utils/rate_limit.py) y reparto entre procesos.
+
+1. Microbenchmark: tiempo de `take` sobre el archivo compartido con claves
+   repetidas (mismo bucket) y distintas (IPs de un scraper), sin HTTP.
+2. Varios procesos (como los workers de gunicorn) consumen a la vez del
+   mismo bucket: el total admitido debe ser la ráfaga, no ráfaga x procesos.
+
+Uso:
+    python -m benchmarks.bench_rate_limit [iteraciones] [procesos]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from benchmarks.common import measure
+from utils.rate_limit import SharedBuckets
+
+BURST = 100
+
+
+def _consume(path: str, attempts: int, admitted) -> None:
+    buckets = SharedBuckets(path, 4096)
+    count = sum(1 for _ in range(attempts) if buckets.take("login:ip:203.0.113.7", 1e-6, BURST) == 0)
+    with admitted.get_lock():
+        admitted.value += count
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "ratelimit.bin")
+    buckets = SharedBuckets(path, 65536)
+
+    same = measure(lambda: buckets.take("login:ip:198.51.100.1", 1000.0, 1000.0), iterations)
+    counter = iter(range(10 ** 9))
+    distinct = measure(lambda: buckets.take(f"login:ip:10.0.{next(counter)}", 1.0, 20.0), iterations)
+    print(f"take, mismo bucket:     p50 {same['p50_us']:.2f} µs  p99 {same['p99_us']:.2f} µs")
+    print(f"take, claves distintas: p50 {distinct['p50_us']:.2f} µs  p99 {distinct['p99_us']:.2f} µs")
+
+    admitted = multiprocessing.Value("i", 0)
+    workers = [multiprocessing.Process(target=_consume, args=(path, 1000, admitted)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(f"{processes} procesos x 1000 intentos sobre un bucket de {BURST}: {admitted.value} admitidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Microbenchmark de la ruta de lectura: ORM + to_dict frente a Core + filas ligeras.
+
+Para cada listado (bares activos, disponibilidad de un bar, reservas de un
+usuario) mide, dentro de un app context y sin HTTP, el tiempo de consultar y
+serializar a dicts con:
+    orm  -> consulta ORM, instancias en el identity map y Model.to_dict()
+    core -> repositories.read_repository (columnas exactas, namedtuples)
+
+Antes de medir comprueba que ambas rutas producen exactamente los mismos datos.
+
+Uso:
+    python -m benchmarks.bench_read_path [bares] [iteraciones]
+"""
+import logging
+import random
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from benchmarks.common import boot_app, measure, seed_dataset
+from models.availability import Availability
+from models.bar import Bar
+from models.db import db
+from models.reservation import Reservation
+from models.user import User
+from repositories.read_repository import ReadRepository
+
+
+def _seed_reservations(app, bar_ids: list, count: int) -> int:
+    """Crea un usuario con `count` reservas repartidas entre los bares."""
+    rng = random.Random(7)
+    with app.app_context():
+        user = User(username="reader@bench.partyfinder.com", password="x")
+        db.session.add(user)
+        db.session.flush()
+        today = date.today()
+        db.session.execute(db.insert(Reservation), [
+            {"user_id": user.id, "bar_id": rng.choice(bar_ids), "full_name": "Lector", "phone": "300",
+             "num_people": 2, "reservation_date": today + timedelta(days=i % 90), "reservation_time": "22:00",
+             "status": "confirmed"}
+            for i in range(count)
+        ])
+        db.session.commit()
+        return user.id
+
+
+def _cases(bar_id: int, user_id: int) -> dict:
+    session = db.session
+    return {
+        "bares activos": (
+            lambda: [b.to_dict() for b in Bar.query.options(selectinload(Bar.genres)).filter_by(is_active=True).all()],
+            lambda: [b.to_dict() for b in ReadRepository.active_bars(session)],
+        ),
+        "disponibilidad de un bar": (
+            lambda: [a.to_dict() for a in Availability.query.filter_by(bar_id=bar_id)
+                     .order_by(Availability.date, Availability.time_slot).all()],
+            lambda: [a.to_dict() for a in ReadRepository.bar_availability(session, bar_id)],
+        ),
+        "reservas de un usuario": (
+            lambda: [r.to_dict() for r in Reservation.query.options(joinedload(Reservation.bar))
+                     .filter_by(user_id=user_id).order_by(Reservation.reservation_date.desc()).all()],
+            lambda: [r.to_dict() for r in ReadRepository.reservations(session, user_id=user_id)],
+        ),
+    }
+
+
+def _run_in_session(fn):
+    # Cada petición real empieza con una sesión vacía: se descarta el identity map
+    def call():
+        result = fn()
+        db.session.remove()
+        return result
+    return call
+
+
+def main() -> None:
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    app = boot_app()
+    logging.disable(logging.WARNING)
+    dataset = seed_dataset(app, bars=bars, users=0, days=60)
+    user_id = _seed_reservations(app, dataset["bar_ids"], 500)
+
+    with app.app_context():
+        cases = _cases(dataset["bar_ids"][0], user_id)
+        print(f"{bars} bares, {dataset['days']} días de disponibilidad, 500 reservas; {iterations} iteraciones\n")
+        print(f"{'listado':<26}{'filas':>7}{'orm p50 ms':>12}{'core p50 ms':>13}{'aceleración':>13}")
+        for name, (orm_fn, core_fn) in cases.items():
+            expected = _run_in_session(orm_fn)()
+            if _run_in_session(core_fn)() != expected:
+                raise SystemExit(f"{name}: la ruta Core no produce los mismos datos que la ORM")
+            warmup = max(1, iterations // 10)
+            orm = measure(_run_in_session(orm_fn), iterations, warmup)
+            core = measure(_run_in_session(core_fn), iterations, warmup)
+            print(f"{name:<26}{len(expected):>7}{orm['p50_us'] / 1000:>12.2f}{core['p50_us'] / 1000:>13.2f}"
+                  f"{orm['p50_us'] / core['p50_us']:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark de la búsqueda de bares con 100k bares.
+
+Genera los bares con scripts.generate_dataset (determinista), construye el
+índice invertido midiendo tiempo y memoria, y compara la latencia de
+consultas típicas (fragmentos de nombre, barrios, prefijos) entre:
+    index -> BarSearchService (índice en memoria + carga de los resultados)
+    like  -> LIKE '%término%' sobre name/address/description (escaneo completo)
+
+También mide el costo de una actualización incremental (reindexar un bar).
+
+Uso:
+    python -m benchmarks.bench_search [bares] [iteraciones]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import and_, or_, select
+
+from benchmarks.common import boot_app, measure
+from scripts.generate_dataset import Writer, generate_bars, generate_genres
+
+QUERIES = ["candela", "la luna", "club est", "rit", "medellin", "calle 45", "barrio tropical neon", "salsa"]
+
+
+def main() -> None:
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_search_'), 'search.db')}"
+    writer = Writer(db_url=db_url)
+    generate_bars(writer, bars, seed=42, genre_ids=generate_genres(writer))
+    writer.close()
+
+    app = boot_app(db_url)
+    logging.disable(logging.WARNING)
+    from models.bar import Bar
+    from models.db import db
+    from services.bar_search_service import BarSearchService, _build
+
+    with app.test_request_context():
+        started = time.perf_counter()
+        BarSearchService.index()
+        build_s = time.perf_counter() - started
+        # Memoria retenida por un índice equivalente (tracemalloc ralentiza, por eso se construye aparte)
+        tracemalloc.start()
+        index = _build(db.session)
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        del index
+        db.session.remove()
+
+        print(f"{bars} bares: índice construido en {build_s:.2f}s, {memory_mb:.0f} MB\n")
+        print(f"{'consulta':<24}{'hits':>6}{'index p50 ms':>14}{'index p99 ms':>14}{'like p50 ms':>13}")
+
+        for query in QUERIES:
+            def search():
+                result = BarSearchService.search(query, 20)
+                db.session.remove()
+                return result
+
+            def like():
+                terms = query.split()
+                clauses = [or_(Bar.name.ilike(f"%{t}%"), Bar.address.ilike(f"%{t}%"), Bar.description.ilike(f"%{t}%"))
+                           for t in terms]
+                result = db.session.execute(
+                    select(Bar.id).where(Bar.is_active.is_(True), and_(*clauses)).limit(20)).all()
+                db.session.remove()
+                return result
+
+            hits = len(search())
+            indexed = measure(search, iterations, warmup=3)
+            scanned = measure(like, max(3, iterations // 5), warmup=1)
+            print(f"{query:<24}{hits:>6}{indexed['p50_us'] / 1000:>14.2f}{indexed['p99_us'] / 1000:>14.2f}"
+                  f"{scanned['p50_us'] / 1000:>13.2f}")
+
+        index = BarSearchService.index()
+        fields = {"name": "Nuevo Bar Candela", "address": "Calle 1 #2-3, Cali", "description": "salsa y son"}
+        update = measure(lambda: index.update(1, fields), 1000, warmup=10)
+        print(f"\nactualización incremental de un bar: p50 {update['p50_us']:.1f} µs")
+        print("(LIKE no puede buscar sin tildes: 'medellin' no encuentra 'Medellín')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Ahorro de payload y latencia de los sparse fieldsets (?fields=).
+
+Compara, vía HTTP (test client), la respuesta completa frente a las
+proyecciones que usan las pantallas de lista de la app móvil:
+    lista de bares    -> id, name, rating, image_url, min_price, music_genres
+    mis reservas      -> id, bar_name, reservation_date, reservation_time, status
+
+Reporta bytes por respuesta (sin y con gzip) y p50 de latencia.
+
+Uso:
+    python -m benchmarks.bench_sparse_fields [bares] [reservas] [iteraciones]
+"""
+import gzip
+import logging
+import sys
+from datetime import date, timedelta
+
+from benchmarks.common import auth_header, boot_app, measure, seed_dataset
+
+SCREENS = {
+    "lista de bares": ("/bars/", "id,name,rating,image_url,min_price,music_genres"),
+    "mis reservas": ("/reservations/my-reservations", "bar_name,reservation_date,reservation_time,status"),
+}
+
+
+def main() -> None:
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    reservations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    app = boot_app()
+    logging.disable(logging.ERROR)
+    dataset = seed_dataset(app, bars=bars, users=0, days=reservations // 4 + 1)
+    client = app.test_client()
+    headers = auth_header(client)
+    for i in range(reservations):
+        client.post("/reservations/", headers=headers, json={
+            "bar_id": dataset["bar_ids"][i % len(dataset["bar_ids"])], "full_name": "Bench", "phone": "300",
+            "num_people": 2, "reservation_date": (date.today() + timedelta(days=i // 4)).isoformat(),
+            "reservation_time": ["22:00", "23:00", "00:00", "01:00"][i % 4],
+        })
+
+    print(f"{bars} bares, {reservations} reservas, {iterations} iteraciones\n")
+    print(f"{'pantalla':<16}{'modo':<8}{'bytes':>10}{'gzip':>9}{'p50 ms':>9}")
+    for name, (path, fields) in SCREENS.items():
+        results = {}
+        for mode, url in (("completo", path), ("fields", f"{path}?fields={fields}")):
+            body = client.get(url, headers=headers).get_data()
+            stats = measure(lambda: client.get(url, headers=headers), iterations, warmup=max(1, iterations // 10))
+            results[mode] = (len(body), len(gzip.compress(body)), stats["p50_us"] / 1000)
+            print(f"{name:<16}{mode:<8}{results[mode][0]:>10}{results[mode][1]:>9}{results[mode][2]:>9.2f}")
+        full, sparse = results["completo"], results["fields"]
+        print(f"{'':<16}{'ahorro':<8}{1 - sparse[0] / full[0]:>10.0%}{1 - sparse[1] / full[1]:>9.0%}"
+              f"{1 - sparse[2] / full[2]:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
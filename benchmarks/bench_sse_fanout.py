@@ -0,0 +1,55 @@
+"""
+Costo del reparto de eventos de disponibilidad entre streams SSE.
+
+Crea N suscripciones repartidas entre B bares (cada cliente sigue 1-3 bares)
+en el broker de un worker, publica eventos de slots como lo hace el sondeo y
+mide el tiempo de publicación por evento y el de vaciado de las colas.
+
+Como referencia imprime cuántas consultas por segundo harían esos mismos
+clientes con polling cada 3 s frente al único sondeo por worker.
+
+Uso:
+    python -m benchmarks.bench_sse_fanout [suscriptores] [bares] [eventos]
+"""
+import random
+import sys
+import time
+
+from services.availability_stream_service import _frame
+from utils.event_broker import EventBroker
+
+POLLING_INTERVAL = 3.0
+
+
+def main() -> None:
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    bars = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    events = int(sys.argv[3]) if len(sys.argv) > 3 else 2_000
+
+    rng = random.Random(42)
+    broker = EventBroker(max_queue=10_000)
+    subscriptions = [broker.subscribe(rng.sample(range(bars), k=rng.randint(1, 3))) for _ in range(subscribers)]
+    slot = {"id": 1, "bar_id": 0, "date": "2026-11-15", "time_slot": "22:00", "total_capacity": 20,
+            "reserved_count": 7, "is_available": True, "available_capacity": 13}
+
+    started = time.perf_counter()
+    delivered = 0
+    for i in range(events):
+        bar_id = rng.randrange(bars)
+        delivered += broker.publish(bar_id, _frame("availability", dict(slot, bar_id=bar_id, reserved_count=i % 20)))[0]
+    publish_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    drained = sum(len(s.wait(0)) for s in subscriptions)
+    drain_s = time.perf_counter() - started
+
+    print(f"{subscribers} streams sobre {bars} bares, {events} eventos")
+    print(f"publicación: {publish_s / events * 1e6:.1f} µs por evento "
+          f"({delivered / events:.0f} entregas por evento, {publish_s / max(delivered, 1) * 1e9:.0f} ns por entrega)")
+    print(f"vaciado de colas: {drain_s * 1000:.1f} ms para {drained} eventos")
+    print(f"consultas/s a la base de datos: polling {subscribers / POLLING_INTERVAL:.0f} "
+          f"vs SSE 1 por worker (cada SSE_POLL_INTERVAL)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Estampida de lecturas idénticas con y sin agrupación (utils/single_flight.py).
+
+Arranca la app contra una base SQLite temporal, añade a cada sentencia un
+tiempo de servicio fijo y lanza N hilos que piden sin pausa el mismo
+`GET /bars/<id>` y `GET /availability/bar/<id>` (un bar con una promoción
+recién publicada). Para cada modo mide el throughput, las sentencias SQL
+ejecutadas por petición y los percentiles de latencia, y comprueba que las
+respuestas agrupadas son idénticas a las calculadas por separado.
+
+El control de admisión se desactiva para medir solo la agrupación.
+
+Uso:
+    python -m benchmarks.bench_thundering_herd [--clients 200] [--duration 5] [--service-ms 2]
+"""
+import argparse
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.common import boot_app, percentile, seed_dataset
+
+
+def run(app, paths: list, enabled: bool, args) -> dict:
+    from utils import single_flight
+    single_flight.ENABLED = enabled
+    statements = [0]
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+    event.listen(Engine, "before_cursor_execute", count_statement)
+
+    barrier = threading.Barrier(args.clients)
+    stop = [0.0]
+    latencies = []
+    bodies = {}
+    lock = threading.Lock()
+
+    def client_loop(i):
+        client = app.test_client()
+        path = paths[i % len(paths)]
+        samples = []
+        barrier.wait()
+        if i == 0:
+            stop[0] = time.monotonic() + args.duration
+        while not stop[0]:
+            time.sleep(0)
+        while time.monotonic() < stop[0]:
+            started = time.perf_counter()
+            response = client.get(path)
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+            bodies.setdefault(path, set()).add(response.get_data())
+        with lock:
+            latencies.extend(samples)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    event.remove(Engine, "before_cursor_execute", count_statement)
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / args.duration,
+        "statements_per_request": statements[0] / max(1, len(latencies)),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "bodies": {path: len(values) for path, values in bodies.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--service-ms", type=float, default=2.0, help="tiempo de servicio añadido a cada sentencia")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    app = boot_app()
+    dataset = seed_dataset(app, bars=200, users=1, days=14)
+    from utils import admission
+    admission.ENABLED = False
+
+    service_s = args.service_ms / 1000.0
+
+    def slow_database(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(service_s)
+    event.listen(Engine, "before_cursor_execute", slow_database)
+
+    hot_bar = dataset["bar_ids"][0]
+    paths = [f"/bars/{hot_bar}", f"/availability/bar/{hot_bar}"]
+    print(f"{args.clients} clientes sobre {', '.join(paths)}, {args.duration:g}s por modo, "
+          f"{args.service_ms:g} ms por sentencia")
+    print(f"  {'modo':<12} {'peticiones/s':>13} {'SQL/petición':>13} {'p50 ms':>8} {'p99 ms':>8}")
+    for enabled in (False, True):
+        row = run(app, paths, enabled, args)
+        # Sin escrituras durante la prueba cada ruta debe devolver siempre los mismos bytes
+        assert all(count == 1 for count in row["bodies"].values()), row["bodies"]
+        print(f"  {'agrupado' if enabled else 'sin agrupar':<12} {row['throughput']:>13.0f} "
+              f"{row['statements_per_request']:>13.3f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Utilidades compartidas por los benchmarks: arranque de la app contra una base
+SQLite temporal, datos de prueba, autenticación y cálculo de percentiles.
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from models.availability import Availability
+from models.bar import Bar
+from models.db import db
+from models.genre import bar_genres
+from models.user import User
+from services.genre_service import GenreService
+
+
+def boot_app(db_url: str = None):
+    """
+    Importa app.py apuntando a una base de datos de pruebas y devuelve la app Flask.
+
+    Si no se indica `db_url`, se usa un archivo SQLite en un directorio temporal.
+    """
+    if db_url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_")
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ["MYSQL_URL"] = db_url
+    import app as app_module
+    return app_module.app
+
+
+def auth_header(client, username: str = "bench@partyfinder.com", password: str = "bench") -> dict:
+    """Registra (si hace falta) e inicia sesión; devuelve el header Authorization."""
+    client.post("/users/register", json={"username": username, "password": password})
+    response = client.post("/users/login", json={"username": username, "password": password})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def percentile(sorted_samples: list, pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100.0 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def measure(fn, iterations: int, warmup: int = 50) -> dict:
+    """Ejecuta `fn` varias veces y devuelve estadísticas de latencia en microsegundos."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": sum(samples) / len(samples),
+        "p50_us": percentile(samples, 50),
+        "p99_us": percentile(samples, 99),
+    }
+
+
+# =========================
+# Datos de prueba
+# =========================
+CITIES = [
+    # (nombre, latitud, longitud, peso)
+    ("Bogotá", 4.6486, -74.0628, 0.45),
+    ("Medellín", 6.2088, -75.5673, 0.25),
+    ("Cali", 3.4516, -76.5320, 0.15),
+    ("Cartagena", 10.4236, -75.5518, 0.10),
+    ("Barranquilla", 10.9878, -74.8022, 0.05),
+]
+GENRES = ["Reggaetón", "Salsa", "Electrónica", "Crossover", "Vallenato", "Rock", "Hip Hop", "Techno", "Pop", "Merengue"]
+TIME_SLOTS = ["22:00", "23:00", "00:00", "01:00"]
+
+
+def seed_dataset(app, bars: int = 200, users: int = 50, days: int = 14, seed: int = 42,
+                 password: str = "bench") -> dict:
+    """
+    Puebla la base de la app con bares, disponibilidad y usuarios de prueba.
+
+    Devuelve los nombres de usuario y los IDs de los bares creados en esta
+    llamada para que los benchmarks puedan construir sus peticiones.
+    """
+    rng = random.Random(seed)
+    hashed = generate_password_hash(password)
+    today = date.today()
+
+    with app.app_context():
+        usernames = [f"user{i}@bench.partyfinder.com" for i in range(users)]
+        if usernames:
+            db.session.execute(db.insert(User), [{"username": u, "password": hashed} for u in usernames])
+
+        genres = GenreService.resolve(GENRES)
+        db.session.flush()
+        genre_ids = {g.name: g.id for g in genres}
+        first_bar_id = (db.session.execute(db.select(db.func.max(Bar.id))).scalar() or 0) + 1
+
+        bar_rows = []
+        bar_genre_names = []
+        for i in range(bars):
+            city, lat, lon, _ = rng.choices(CITIES, weights=[c[3] for c in CITIES])[0]
+            min_price = rng.choice([0, 10000, 20000, 30000, 50000])
+            bar_rows.append({
+                "name": f"{rng.choice(['La', 'El', 'Club', 'Bar'])} {city} {i}",
+                "address": f"Calle {rng.randint(1, 150)} #{rng.randint(1, 99)}-{rng.randint(1, 99)}, {city}",
+                "description": " ".join(rng.choices(GENRES, k=8)) * 4,
+                "image_url": f"https://cdn.partyfinder.com/bars/{i}.jpg",
+                "phone": f"+57 3{rng.randint(100000000, 199999999)}",
+                "opening_time": "21:00",
+                "closing_time": "03:00",
+                "min_price": min_price,
+                "max_price": min_price + rng.choice([20000, 50000, 100000]),
+                "latitude": lat + rng.gauss(0, 0.03),
+                "longitude": lon + rng.gauss(0, 0.03),
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "total_reviews": rng.randint(0, 2000),
+                "is_active": True,
+            })
+            bar_genre_names.append(rng.sample(GENRES, k=rng.randint(1, 3)))
+        db.session.execute(db.insert(Bar), bar_rows)
+        bar_ids = [row[0] for row in db.session.execute(
+            db.select(Bar.id).where(Bar.id >= first_bar_id).order_by(Bar.id))]
+        if bar_ids:
+            db.session.execute(db.insert(bar_genres), [
+                {"bar_id": bar_id, "genre_id": genre_ids[name]}
+                for bar_id, names in zip(bar_ids, bar_genre_names) for name in names
+            ])
+
+        availability_rows = [
+            {"bar_id": bar_id, "date": today + timedelta(days=d), "time_slot": slot,
+             "total_capacity": 1_000_000, "reserved_count": 0, "is_available": True}
+            for bar_id in bar_ids for d in range(days) for slot in TIME_SLOTS
+        ]
+        for start in range(0, len(availability_rows), 5000):
+            db.session.execute(db.insert(Availability), availability_rows[start:start + 5000])
+        db.session.commit()
+
+    return {"usernames": usernames, "password": password, "bar_ids": bar_ids, "days": days}
@@ -0,0 +1,398 @@
+"""
+Prueba de carga HTTP de extremo a extremo.
+
+Arranca la API contra una base SQLite temporal (o usa una URL ya levantada),
+siembra datos realistas y lanza clientes concurrentes que ejecutan un perfil
+de carga durante un tiempo fijo. Reporta throughput y percentiles de latencia
+por operación y puede guardar el resultado como baseline JSON para comparar
+entre commits.
+
+Perfiles: browse, availability, booking_burst, login, cancellations, mixed.
+
+Ejemplos:
+    python -m benchmarks.load_test --profile mixed --duration 20 --clients 16
+    python -m benchmarks.load_test --profile browse --server gunicorn --workers 4
+    python -m benchmarks.load_test --profile mixed --save benchmarks/baselines/mixed.json
+    python -m benchmarks.load_test --profile mixed --compare benchmarks/baselines/mixed.json --max-regression 15
+    python -m benchmarks.load_test --url http://localhost:6060 --db-url mysql+pymysql://... --profile browse
+
+Con --url la siembra se hace en --db-url, que debe ser la base del servidor
+indicado (o se reutiliza una siembra previa con --dataset).
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlparse
+
+from benchmarks.common import percentile, seed_dataset
+
+# Peso relativo de cada operación por perfil
+PROFILES = {
+    "browse": {"list_bars": 50, "bar_detail": 50},
+    "availability": {"availability": 100},
+    "booking_burst": {"book_hot_slot": 100},
+    "login": {"login": 100},
+    "cancellations": {"book_and_cancel": 100},
+    "mixed": {
+        "list_bars": 20, "bar_detail": 20, "availability": 25, "my_reservations": 10,
+        "book": 10, "book_hot_slot": 5, "book_and_cancel": 5, "login": 5,
+    },
+}
+
+
+class Client:
+    """Conexión HTTP keep-alive de un cliente virtual."""
+
+    def __init__(self, base_url: str):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.conn = None
+        self.token = None
+
+    def request(self, method: str, path: str, body: dict = None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    self.conn.close()
+                    self.conn = None
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        return 0, b""
+
+
+class Workload:
+    """Estado compartido del perfil: datos sembrados y generación de peticiones."""
+
+    def __init__(self, dataset: dict, seed: int):
+        self.dataset = dataset
+        self.bar_ids = dataset["bar_ids"]
+        # Popularidad sesgada (tipo Zipf): pocos bares concentran la mayoría del tráfico
+        weights = [1.0 / (rank + 1) for rank in range(len(self.bar_ids))]
+        self.cum_weights = []
+        total = 0.0
+        for w in weights:
+            total += w
+            self.cum_weights.append(total)
+        self.hot_bar = self.bar_ids[0]
+        # Los datasets de generate_dataset traen su fecha de referencia (--today);
+        # la siembra sintética de benchmarks.common parte de hoy
+        self.today = (datetime.strptime(dataset["today"], "%Y-%m-%d").date()
+                      if dataset.get("today") else date.today())
+        self.hot_date = (self.today + timedelta(days=1)).isoformat()
+        self.seed = seed
+
+    def popular_bar(self, rng) -> int:
+        return rng.choices(self.bar_ids, cum_weights=self.cum_weights)[0]
+
+    def booking(self, rng, bar_id: int = None, day: str = None, slot: str = None) -> dict:
+        return {
+            "bar_id": bar_id or self.popular_bar(rng),
+            "full_name": "Cliente Bench",
+            "phone": "+57 3000000000",
+            "num_people": rng.randint(1, 8),
+            "reservation_date": day or (self.today + timedelta(days=rng.randint(0, self.dataset["days"] - 1))).isoformat(),
+            "reservation_time": slot or rng.choice(["22:00", "23:00", "00:00", "01:00"]),
+        }
+
+    # ---- Operaciones: devuelven una lista de (nombre, método, ruta, cuerpo) ----
+    def op_list_bars(self, rng, state):
+        return [("list_bars", "GET", "/bars/", None)]
+
+    def op_bar_detail(self, rng, state):
+        return [("bar_detail", "GET", f"/bars/{self.popular_bar(rng)}", None)]
+
+    def op_availability(self, rng, state):
+        start = self.today + timedelta(days=rng.randint(0, 6))
+        path = f"/availability/bar/{self.popular_bar(rng)}?start_date={start.isoformat()}&end_date={(start + timedelta(days=7)).isoformat()}"
+        return [("availability", "GET", path, None)]
+
+    def op_my_reservations(self, rng, state):
+        return [("my_reservations", "GET", "/reservations/my-reservations", None)]
+
+    def op_book(self, rng, state):
+        return [("book", "POST", "/reservations/", self.booking(rng))]
+
+    def op_book_hot_slot(self, rng, state):
+        return [("book_hot_slot", "POST", "/reservations/", self.booking(rng, self.hot_bar, self.hot_date, "23:00"))]
+
+    def op_book_and_cancel(self, rng, state):
+        return [("book", "POST", "/reservations/", self.booking(rng)), ("cancel", "PUT", None, None)]
+
+    def op_login(self, rng, state):
+        body = {"username": state["username"], "password": self.dataset["password"]}
+        return [("login", "POST", "/users/login", body)]
+
+
+def _worker(base_url, workload, profile, username, deadline, warmup_until, results, lock, worker_id):
+    rng = random.Random(workload.seed + worker_id)
+    client = Client(base_url)
+    status, body = client.request("POST", "/users/login", {"username": username, "password": workload.dataset["password"]})
+    if status != 200:
+        raise RuntimeError(f"Login inicial fallido para {username}: {status} {body[:200]!r}")
+    client.token = json.loads(body)["access_token"]
+
+    names = list(profile)
+    weights = [profile[n] for n in names]
+    state = {"username": username, "last_reservation": None}
+    local = {}
+    while time.monotonic() < deadline:
+        steps = getattr(workload, f"op_{rng.choices(names, weights)[0]}")(rng, state)
+        for name, method, path, payload in steps:
+            if name == "cancel":
+                if not state["last_reservation"]:
+                    continue
+                path = f"/reservations/{state['last_reservation']}/cancel"
+                state["last_reservation"] = None
+            start = time.perf_counter()
+            try:
+                status, data = client.request(method, path, payload)
+            except (http.client.HTTPException, OSError):
+                status, data = 0, b""
+            elapsed = time.perf_counter() - start
+            if name == "book" and status == 201:
+                state["last_reservation"] = json.loads(data)["id"]
+            if time.monotonic() < warmup_until:
+                continue
+            samples, errors = local.setdefault(name, ([], [0]))
+            samples.append(elapsed)
+            if status == 0 or status >= 500:
+                errors[0] += 1
+
+    with lock:
+        for name, (samples, errors) in local.items():
+            merged = results.setdefault(name, ([], [0]))
+            merged[0].extend(samples)
+            merged[1][0] += errors[0]
+
+
+def _summarize(samples: list, errors: int, duration: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p90_ms": round(percentile(samples, 90) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+    }
+
+
+def run_load(base_url: str, dataset: dict, profile_name: str, clients: int, duration: float,
+             warmup: float, seed: int = 1) -> dict:
+    """Ejecuta un perfil contra `base_url` y devuelve el reporte."""
+    profile = PROFILES[profile_name]
+    workload = Workload(dataset, seed)
+    results, lock = {}, threading.Lock()
+    start = time.monotonic()
+    warmup_until = start + warmup
+    deadline = warmup_until + duration
+    threads = [
+        threading.Thread(target=_worker, args=(
+            base_url, workload, profile, dataset["usernames"][i % len(dataset["usernames"])],
+            deadline, warmup_until, results, lock, i))
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_samples = [s for samples, _ in results.values() for s in samples]
+    all_errors = sum(errors[0] for _, errors in results.values())
+    return {
+        "profile": profile_name,
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {"clients": clients, "duration_s": duration, "warmup_s": warmup, "bars": len(dataset["bar_ids"])},
+        "total": _summarize(all_samples, all_errors, duration),
+        "operations": {name: _summarize(samples, errors[0], duration) for name, (samples, errors) in sorted(results.items())},
+    }
+
+
+# =========================
+# Arranque del servidor
+# =========================
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(base_url: str, timeout: float = 30) -> None:
+    parsed = urlparse(base_url)
+    limit = time.monotonic() + timeout
+    while time.monotonic() < limit:
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {base_url}")
+
+
+def _serve_werkzeug(port: int) -> None:
+    import logging
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app as app_module
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    make_server("127.0.0.1", port, app_module.app, threaded=True).serve_forever()
+
+
+def start_server(kind: str, db_url: str, workers: int = 4):
+    """Levanta la API en otro proceso; devuelve (base_url, detener)."""
+    port = _free_port()
+    os.environ["MYSQL_URL"] = db_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Todos los clientes virtuales salen de la misma IP: sin límite de peticiones
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    if kind == "gunicorn":
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", "4",
+             "-b", f"127.0.0.1:{port}", "app:app"],
+            env=dict(os.environ),
+        )
+        stop = proc.terminate
+    else:
+        proc = multiprocessing.get_context("spawn").Process(target=_serve_werkzeug, args=(port,), daemon=True)
+        proc.start()
+        stop = proc.terminate
+    base_url = f"http://127.0.0.1:{port}"
+    _wait_until_up(base_url)
+    return base_url, stop
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# =========================
+# Reporte y comparación
+# =========================
+def print_report(report: dict) -> None:
+    print(f"Perfil: {report['profile']}  commit: {report['commit']}  config: {report['config']}")
+    print(f"{'operación':<18}{'peticiones':>11}{'errores':>9}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = list(report["operations"].items()) + [("TOTAL", report["total"])]
+    for name, s in rows:
+        print(f"{name:<18}{s['requests']:>11}{s['errors']:>9}{s['rps']:>10.1f}{s['p50_ms']:>10.2f}"
+              f"{s['p90_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+
+def compare(report: dict, baseline: dict, max_regression: float = None) -> bool:
+    """Imprime las diferencias con un baseline; devuelve False si hay regresión mayor al umbral (%)."""
+    print(f"\nComparación con baseline (commit {baseline.get('commit')}):")
+    print(f"{'operación':<18}{'rps':>10}{'Δ rps':>10}{'p99 ms':>10}{'Δ p99':>10}")
+    ok = True
+    rows = list(report["operations"].items()) + [("TOTAL", report["total"])]
+    for name, current in rows:
+        old = baseline["total"] if name == "TOTAL" else baseline["operations"].get(name)
+        if not old:
+            continue
+        d_rps = (current["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        d_p99 = (current["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100 if old["p99_ms"] else 0.0
+        print(f"{name:<18}{current['rps']:>10.1f}{d_rps:>+9.1f}%{current['p99_ms']:>10.2f}{d_p99:>+9.1f}%")
+        if max_regression is not None and name == "TOTAL" and (d_rps < -max_regression or d_p99 > max_regression):
+            ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP de la API")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos descartados al inicio")
+    parser.add_argument("--bars", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--server", choices=["werkzeug", "gunicorn"], default="werkzeug")
+    parser.add_argument("--workers", type=int, default=4, help="workers de gunicorn")
+    parser.add_argument("--db-url", help="base de datos a usar (por defecto SQLite temporal)")
+    parser.add_argument("--url", help="no arrancar servidor; usar esta URL")
+    parser.add_argument("--dataset", help="JSON con usernames/password/bar_ids/days de una siembra previa (no siembra)")
+    parser.add_argument("--save-dataset", help="guardar el JSON de la siembra para reutilizarlo con --dataset")
+    parser.add_argument("--save", help="guardar el reporte como baseline JSON")
+    parser.add_argument("--compare", help="baseline JSON contra el que comparar")
+    parser.add_argument("--max-regression", type=float, help="falla (exit 1) si el total empeora más de este %%")
+    args = parser.parse_args()
+
+    stop = None
+    if args.url and not (args.dataset or args.db_url):
+        parser.error("--url requiere --db-url (para sembrar) o --dataset")
+    if args.dataset and not (args.url or args.db_url):
+        parser.error("--dataset requiere --db-url (la base ya sembrada) o --url")
+    if args.dataset:
+        if args.db_url:
+            os.environ["MYSQL_URL"] = args.db_url
+        with open(args.dataset) as fh:
+            dataset = json.load(fh)
+    else:
+        db_url = args.db_url
+        if db_url is None:
+            import tempfile
+            db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='loadtest_'), 'load.db')}"
+        os.environ["MYSQL_URL"] = db_url
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        import app as app_module
+        dataset = seed_dataset(app_module.app, bars=args.bars, users=args.users, days=args.days, seed=args.seed)
+        with app_module.app.app_context():
+            app_module.db.engine.dispose()
+        if args.save_dataset:
+            with open(args.save_dataset, "w") as fh:
+                json.dump(dataset, fh)
+
+    base_url = args.url
+    if base_url is None:
+        base_url, stop = start_server(args.server, os.environ["MYSQL_URL"], args.workers)
+
+    try:
+        report = run_load(base_url, dataset, args.profile, args.clients, args.duration, args.warmup, args.seed)
+    finally:
+        if stop:
+            stop()
+
+    print_report(report)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nBaseline guardado en {args.save}")
+    if args.compare:
+        with open(args.compare) as fh:
+            if not compare(report, json.load(fh), args.max_regression):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Controlador de administración.
+Endpoints de diagnóstico reservados a administradores (ADMIN_USER_IDS).
+"""
+from flask import Blueprint, request, jsonify, send_file, Response
+from utils.auth import admin_required
+from utils import request_profiler
+import logging
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """
+    Listar perfiles de CPU recientes
+    ---
+    tags:
+      - Administración
+    security:
+      - Bearer: []
+    description: >
+      Para perfilar una petición, envíala con el header `X-Profile: 1` (o `?_profile=1`)
+      y un JWT de administrador; la respuesta incluye el header `X-Profile-Id`.
+    responses:
+      200:
+        description: Metadatos de los perfiles, del más reciente al más antiguo
+      401:
+        description: No autenticado
+      403:
+        description: No es administrador
+    """
+    return jsonify(request_profiler.list_profiles()), 200
+
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """
+    Obtener un perfil de CPU
+    ---
+    tags:
+      - Administración
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: profile_id
+        type: string
+        required: true
+      - in: query
+        name: format
+        type: string
+        enum: [text, raw]
+        description: "text: resumen pstats; raw: archivo .prof para snakeviz/pstats"
+      - in: query
+        name: sort
+        type: string
+        enum: [cumulative, tottime, calls, ncalls]
+      - in: query
+        name: limit
+        type: integer
+        example: 40
+    responses:
+      200:
+        description: Perfil
+      404:
+        description: Perfil no encontrado
+    """
+    if request.args.get('format') == 'raw':
+        path = request_profiler.profile_path(profile_id)
+        if path is None:
+            return jsonify({"error": "Perfil no encontrado"}), 404
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in request_profiler.SORT_KEYS:
+        return jsonify({"error": "sort inválido"}), 400
+    limit = request.args.get('limit', 40, type=int)
+
+    text = request_profiler.render_profile(profile_id, sort=sort, limit=limit)
+    if text is None:
+        return jsonify({"error": "Perfil no encontrado"}), 404
+    return Response(text, mimetype='text/plain')
@@ -2,15 +2,27 @@
 Controlador para gestionar la disponibilidad de los bares.
 Panel de administración para configurar horarios y capacidad.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required
+from models.availability import Availability
 from services.availability_service import AvailabilityService
+from services.availability_stream_service import SSE_MAX_BARS, SSE_RETRY_MS, AvailabilityStreamService
+from repositories.read_repository import parse_flag
+from utils.compression import precompressed
+from utils.deadlines import deadline
+from utils.single_flight import coalesced, invalidate_on, response_flight
 import logging
+import random
 
 logger = logging.getLogger(__name__)
 
 availability_bp = Blueprint('availability_bp', __name__, url_prefix='/availability')
 
+# Peticiones concurrentes idénticas a la disponibilidad de un bar comparten consulta y respuesta.
+# Los cambios de slots se notifican por id de slot, no de bar: invalidan todo el caché.
+_bar_availability = response_flight("bar_availability")
+invalidate_on(_bar_availability, Availability)
+
 
 @availability_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -77,11 +89,12 @@ def create_availability():
         return jsonify(result), 201
         
     except Exception as e:
-        logger.error(f"Error en create_availability: {str(e)}")
+        logger.error("Error en create_availability: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @availability_bp.route('/bulk', methods=['POST'])
+@deadline(20)
 @jwt_required()
 def create_bulk_availability():
     """
@@ -141,11 +154,14 @@ def create_bulk_availability():
         return jsonify(result), 201
         
     except Exception as e:
-        logger.error(f"Error en create_bulk_availability: {str(e)}")
+        logger.error("Error en create_bulk_availability: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @availability_bp.route('/bar/<int:bar_id>', methods=['GET'])
+@precompressed
+@deadline(5)
+@coalesced(_bar_availability)
 def get_bar_availability(bar_id):
     """
     Obtener disponibilidad de un bar
@@ -167,6 +183,10 @@ def get_bar_availability(bar_id):
         type: string
         format: date
         example: "2024-11-17"
+      - in: query
+        name: include_archived
+        type: boolean
+        description: Incluir los slots pasados ya archivados
     responses:
       200:
         description: Lista de disponibilidades
@@ -179,13 +199,76 @@ def get_bar_availability(bar_id):
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
+        include_archived = parse_flag(request.args.get('include_archived'))
+        
         availabilities = AvailabilityService.get_bar_availability(
-            bar_id, start_date, end_date
+            bar_id, start_date, end_date, include_archived
         )
         return jsonify(availabilities), 200
         
     except Exception as e:
-        logger.error(f"Error en get_bar_availability: {str(e)}")
+        logger.error("Error en get_bar_availability: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@availability_bp.route('/stream', methods=['GET'])
+@availability_bp.route('/bar/<int:bar_id>/stream', methods=['GET'])
+def stream_availability(bar_id=None):
+    """
+    Disponibilidad en vivo (Server-Sent Events)
+    ---
+    tags:
+      - Disponibilidad
+    produces:
+      - text/event-stream
+    parameters:
+      - in: path
+        name: bar_id
+        type: integer
+        required: false
+        description: Bar a seguir (en /availability/bar/<bar_id>/stream)
+      - in: query
+        name: bar_ids
+        type: string
+        description: Bares a seguir separados por comas (en /availability/stream)
+        example: "1,2,3"
+    responses:
+      200:
+        description: >
+          Stream con un evento `snapshot` por bar (slots desde hoy), un evento
+          `availability` por cada slot que cambia, comentarios de keep-alive y
+          `resync` si el cliente no consume a tiempo (debe reconectarse)
+      400:
+        description: Bares no válidos
+      503:
+        description: El worker ya tiene el máximo de streams abiertos (SSE_MAX_STREAMS); reintentar tras Retry-After
+    """
+    try:
+        if bar_id is not None:
+            bar_ids = [bar_id]
+        else:
+            try:
+                bar_ids = sorted({int(v) for v in (request.args.get('bar_ids') or '').split(',') if v.strip()})
+            except ValueError:
+                return jsonify({"error": "bar_ids debe ser una lista de enteros separados por comas"}), 400
+            if not bar_ids:
+                return jsonify({"error": "bar_ids es requerido"}), 400
+        if len(bar_ids) > SSE_MAX_BARS:
+            return jsonify({"error": f"Máximo {SSE_MAX_BARS} bares por stream"}), 400
+
+        stream = AvailabilityStreamService.open(bar_ids)
+        if stream is None:
+            response = jsonify({"error": "Demasiados streams abiertos, reintente en unos segundos"})
+            response.headers['Retry-After'] = str(max(1, round(SSE_RETRY_MS / 1000 * random.uniform(1, 3))))
+            return response, 503
+
+        return Response(stream, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # sin buffer en nginx
+        })
+
+    except Exception as e:
+        logger.error("Error en stream_availability: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -221,5 +304,5 @@ def delete_availability(availability_id):
         return jsonify(result), 200
         
     except Exception as e:
-        logger.error(f"Error en delete_availability: {str(e)}")
+        logger.error("Error en delete_availability: %s", e)
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -3,23 +3,77 @@ Controlador para bares/establecimientos.
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from models.bar import Bar
 from models.db import db
+from models.bar import Bar
+from repositories.read_repository import BarRow, ReadRepository, parse_fields
+from services.bar_cluster_service import MAX_ZOOM, BarClusterService
+from services.bar_search_service import BarSearchService
+from services.bar_stats_service import BarStatsService
+from services.bar_service import BarService
+from services.genre_service import GenreService
+from utils.auth import admin_required
+from utils.text import slugify
+from utils.compression import precompressed
+from utils.deadlines import deadline
+from utils.single_flight import coalesced, invalidate_on, response_flight
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
 bar_bp = Blueprint('bar_bp', __name__, url_prefix='/bars')
 
+# Peticiones concurrentes idénticas al detalle de un bar comparten consulta y respuesta
+_bar_detail = response_flight("bar_detail")
+invalidate_on(_bar_detail, Bar, "bar_id")
+
+
+def _filter_args() -> dict:
+    """
+    Lee los filtros ?genre=&min_price=&max_price= del listado.
+
+    `genre` puede repetirse o ir separado por comas y se compara por slug.
+    Lanza ValueError si un precio no es un entero.
+    """
+    genres = tuple(sorted({
+        slugify(value) for raw in request.args.getlist('genre') for value in raw.split(',') if value.strip()
+    }))
+    prices = {}
+    for name in ('min_price', 'max_price'):
+        raw = request.args.get(name)
+        if raw not in (None, ''):
+            try:
+                prices[name] = int(raw)
+            except ValueError:
+                raise ValueError(f"{name} debe ser un entero")
+    return {"genres": genres or None, **prices}
+
 
 @bar_bp.route('/', methods=['GET'])
+@precompressed
+@deadline(5)
 def get_bars():
     """
     Listar todos los bares activos
     ---
     tags:
       - Bares
+    parameters:
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (el id siempre se incluye)
+        example: "name,rating,image_url"
+      - in: query
+        name: genre
+        type: string
+        description: Género (slug o nombre); repetible o separado por comas, basta con uno
+        example: "reggaeton,salsa"
+      - in: query
+        name: min_price
+        type: integer
+      - in: query
+        name: max_price
+        type: integer
     responses:
       200:
         description: Lista de bares
@@ -27,16 +81,169 @@ def get_bars():
           type: array
           items:
             type: object
+      400:
+        description: Campos o filtros no válidos
     """
     try:
-        bars = Bar.query.filter_by(is_active=True).all()
+        try:
+            fields = parse_fields(BarRow, request.args.get('fields'))
+            filters = _filter_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        bars = ReadRepository.active_bars(db.session, fields, **filters)
         return jsonify([bar.to_dict() for bar in bars]), 200
     except Exception as e:
-        logger.error(f"Error al obtener bares: {str(e)}")
+        logger.error("Error al obtener bares: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@bar_bp.route('/search', methods=['GET'])
+@deadline(3)
+def search_bars():
+    """
+    Buscar bares por nombre, dirección o descripción
+    ---
+    tags:
+      - Bares
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        description: Términos (sin distinguir tildes; cada término puede ser un prefijo)
+        example: "candela chapi"
+      - in: query
+        name: limit
+        type: integer
+        default: 20
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (el id siempre se incluye)
+    responses:
+      200:
+        description: Bares ordenados por relevancia
+      400:
+        description: Parámetros no válidos
+    """
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({"error": "q es requerido"}), 400
+        try:
+            fields = parse_fields(BarRow, request.args.get('fields'))
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(BarSearchService.search(query, limit, fields)), 200
+    except Exception as e:
+        logger.error("Error en la búsqueda de bares: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@bar_bp.route('/clusters', methods=['GET'])
+@deadline(3)
+def get_bar_clusters():
+    """
+    Bares agrupados para el mapa
+    ---
+    tags:
+      - Bares
+    parameters:
+      - in: query
+        name: bbox
+        type: string
+        required: true
+        description: Rectángulo visible "oeste,sur,este,norte" en grados
+        example: "-75.65,6.15,-75.50,6.30"
+      - in: query
+        name: zoom
+        type: integer
+        required: true
+        description: Nivel de zoom del mapa (0-22)
+        example: 14
+    responses:
+      200:
+        description: Clusters con conteo, centroide y bar representativo
+      400:
+        description: Parámetros no válidos
+    """
+    try:
+        try:
+            west, south, east, north = (float(v) for v in (request.args.get('bbox') or '').split(','))
+            zoom = int(request.args.get('zoom', ''))
+        except ValueError:
+            return jsonify({"error": "bbox debe ser 'oeste,sur,este,norte' y zoom un entero"}), 400
+        if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+            return jsonify({"error": "bbox fuera de rango"}), 400
+        if not 0 <= zoom <= MAX_ZOOM:
+            return jsonify({"error": f"zoom debe estar entre 0 y {MAX_ZOOM}"}), 400
+        return jsonify(BarClusterService.clusters(west, south, east, north, zoom)), 200
+    except Exception as e:
+        logger.error("Error al agrupar bares: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@bar_bp.route('/facets', methods=['GET'])
+@precompressed
+@deadline(3)
+def get_bar_facets():
+    """
+    Conteo de bares por género y banda de precio
+    ---
+    tags:
+      - Bares
+    parameters:
+      - in: query
+        name: genre
+        type: string
+        description: Filtro de género aplicado a los conteos por precio
+      - in: query
+        name: min_price
+        type: integer
+        description: Filtro de precio aplicado a los conteos por género
+      - in: query
+        name: max_price
+        type: integer
+    responses:
+      200:
+        description: Facetas {genres, price_bands}
+      400:
+        description: Filtros no válidos
+    """
+    try:
+        try:
+            filters = _filter_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(GenreService.facets(**filters)), 200
+    except Exception as e:
+        logger.error("Error al obtener facetas: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@bar_bp.route('/genres', methods=['GET'])
+@precompressed
+def get_genres():
+    """
+    Listar los géneros musicales
+    ---
+    tags:
+      - Bares
+    responses:
+      200:
+        description: Lista de géneros {id, name, slug}
+    """
+    try:
+        return jsonify(GenreService.list_genres()), 200
+    except Exception as e:
+        logger.error("Error al obtener géneros: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @bar_bp.route('/<int:bar_id>', methods=['GET'])
+@precompressed
+@coalesced(_bar_detail)
 def get_bar(bar_id):
     """
     Obtener detalles de un bar
@@ -48,19 +255,81 @@ def get_bar(bar_id):
         name: bar_id
         type: integer
         required: true
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (el id siempre se incluye)
     responses:
       200:
         description: Detalles del bar
+      400:
+        description: Campos no válidos
       404:
         description: Bar no encontrado
     """
     try:
-        bar = Bar.query.get(bar_id)
+        try:
+            fields = parse_fields(BarRow, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        bar = ReadRepository.bar(db.session, bar_id, fields)
         if not bar:
             return jsonify({"error": "Bar no encontrado"}), 404
         return jsonify(bar.to_dict()), 200
     except Exception as e:
-        logger.error(f"Error al obtener bar: {str(e)}")
+        logger.error("Error al obtener bar: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@bar_bp.route('/<int:bar_id>/stats', methods=['GET'])
+@deadline(3)
+@admin_required
+def get_bar_stats(bar_id):
+    """
+    Estadísticas de ocupación y reservas de un bar (para administradores)
+    ---
+    tags:
+      - Bares
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: bar_id
+        type: integer
+        required: true
+      - in: query
+        name: start_date
+        type: string
+        format: date
+        description: Por defecto, end_date menos 29 días
+        example: "2024-11-01"
+      - in: query
+        name: end_date
+        type: string
+        format: date
+        description: Por defecto, hoy
+        example: "2024-11-30"
+    responses:
+      200:
+        description: Totales (occupancy_rate, bookings_per_night, cancellation_rate) y detalle por día
+      400:
+        description: Rango de fechas no válido
+      401:
+        description: No autenticado
+      403:
+        description: No es administrador
+      404:
+        description: Bar no encontrado
+    """
+    try:
+        if ReadRepository.bar(db.session, bar_id, ("id",)) is None:
+            return jsonify({"error": "Bar no encontrado"}), 404
+        stats = BarStatsService.get_stats(bar_id, request.args.get('start_date'), request.args.get('end_date'))
+        if 'error' in stats:
+            return jsonify(stats), 400
+        return jsonify(stats), 200
+    except Exception as e:
+        logger.error("Error en get_bar_stats: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -127,35 +396,18 @@ def create_bar():
         if not data.get('name') or not data.get('address'):
             return jsonify({"error": "name y address son requeridos"}), 400
         
-        # Convertir music_genres a JSON string
-        music_genres = data.get('music_genres', [])
-        if isinstance(music_genres, list):
-            music_genres = json.dumps(music_genres)
-        
-        bar = Bar(
-            name=data['name'],
-            address=data['address'],
-            description=data.get('description'),
-            image_url=data.get('image_url'),
-            phone=data.get('phone'),
-            opening_time=data.get('opening_time'),
-            closing_time=data.get('closing_time'),
-            min_price=data.get('min_price'),
-            max_price=data.get('max_price'),
-            latitude=data.get('latitude'),
-            longitude=data.get('longitude'),
-            music_genres=music_genres
-        )
+        try:
+            genre_names = GenreService.parse_names(data.get('music_genres'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        db.session.add(bar)
-        db.session.commit()
-        
-        logger.info(f"Bar creado: {bar.name} (ID: {bar.id})")
-        return jsonify(bar.to_dict()), 201
+        result = BarService.create_bar(data, genre_names)
+        if 'error' in result:
+            return jsonify(result), 500
+        return jsonify(result), 201
         
     except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error al crear bar: {str(e)}")
+        logger.error("Error al crear bar: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -181,30 +433,20 @@ def update_bar(bar_id):
         description: Bar no encontrado
     """
     try:
-        bar = Bar.query.get(bar_id)
-        if not bar:
-            return jsonify({"error": "Bar no encontrado"}), 404
-        
         data = request.get_json() or {}
         
-        # Actualizar campos
-        for field in ['name', 'address', 'description', 'image_url', 'phone',
-                     'opening_time', 'closing_time', 'min_price', 'max_price',
-                     'latitude', 'longitude', 'is_active']:
-            if field in data:
-                setattr(bar, field, data[field])
-        
+        genre_names = None
         if 'music_genres' in data:
-            music_genres = data['music_genres']
-            if isinstance(music_genres, list):
-                music_genres = json.dumps(music_genres)
-            bar.music_genres = music_genres
+            try:
+                genre_names = GenreService.parse_names(data['music_genres'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
         
-        db.session.commit()
-        logger.info(f"Bar actualizado: {bar.name}")
-        return jsonify(bar.to_dict()), 200
+        result = BarService.update_bar(bar_id, data, genre_names)
+        if 'error' in result:
+            return jsonify(result), 404 if result['error'] == "Bar no encontrado" else 500
+        return jsonify(result), 200
         
     except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error al actualizar bar: {str(e)}")
+        logger.error("Error al actualizar bar: %s", e)
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Controlador del feed incremental de cambios (sincronización de clientes y partners).
+"""
+from flask import Blueprint, request, jsonify
+from services.change_feed_service import CHANGES_MAX_LIMIT, ChangeFeedService, CursorExpired
+import logging
+
+logger = logging.getLogger(__name__)
+
+change_bp = Blueprint('change_bp', __name__, url_prefix='/changes')
+
+
+@change_bp.route('', methods=['GET'])
+def get_changes():
+    """
+    Cambios de bares y disponibilidad desde un cursor
+    ---
+    tags:
+      - Sincronización
+    description: >
+      Sin `since` devuelve solo `next_cursor`: pedirlo antes de descargar el
+      catálogo completo y sincronizar después desde él. Cada cambio trae el
+      estado actual de la entidad (`data`) si `op` es `upsert`; `delete` la
+      elimina y `resync` pide volver a descargar la disponibilidad del bar
+      `bar_id` (o toda, si es nulo). Mientras `has_more` sea true, repetir con
+      `since=next_cursor`.
+    parameters:
+      - in: query
+        name: since
+        type: integer
+        description: Último cursor recibido
+        example: 1200
+      - in: query
+        name: limit
+        type: integer
+        default: 500
+    responses:
+      200:
+        description: Cambios, siguiente cursor y si hay más
+      400:
+        description: Parámetros no válidos
+      410:
+        description: Cursor demasiado antiguo (compactado); hay que volver a descargar todo
+    """
+    try:
+        try:
+            since = request.args.get('since')
+            since = int(since) if since not in (None, '') else None
+            limit = min(max(int(request.args.get('limit', 500)), 1), CHANGES_MAX_LIMIT)
+        except ValueError:
+            return jsonify({"error": "since y limit deben ser enteros"}), 400
+        if since is not None and since < 0:
+            return jsonify({"error": "since no puede ser negativo"}), 400
+
+        if since is None:
+            return jsonify({"changes": [], "next_cursor": ChangeFeedService.current_cursor(), "has_more": False}), 200
+        try:
+            return jsonify(ChangeFeedService.changes(since, limit)), 200
+        except CursorExpired as e:
+            return jsonify({"error": str(e), "resync": True}), 410
+
+    except Exception as e:
+        logger.error("Error al obtener cambios: %s", e)
+        return jsonify({"error": str(e)}), 500
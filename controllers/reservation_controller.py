@@ -3,8 +3,13 @@ Controlador para reservas.
 Define los endpoints REST para crear, consultar y cancelar reservas.
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from services.reservation_service import ReservationService
+from repositories.read_repository import ReservationRow, parse_fields, parse_flag
+from utils.admission import priority
+from utils.auth import admin_required
+from utils.deadlines import deadline
+from utils.rate_limit import rate_limited
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,7 +18,10 @@ reservation_bp = Blueprint('reservation_bp', __name__, url_prefix='/reservations
 
 
 @reservation_bp.route('/', methods=['POST'])
+@priority("critical")
+@deadline(8)
 @jwt_required()
+@rate_limited("reservation")
 def create_reservation():
     """
     Crear nueva reserva
@@ -79,7 +87,8 @@ def create_reservation():
             num_people=data['num_people'],
             reservation_date=data['reservation_date'],
             reservation_time=data['reservation_time'],
-            notes=data.get('notes')
+            notes=data.get('notes'),
+            user_email=get_jwt().get('username')
         )
         
         if 'error' in result:
@@ -88,11 +97,12 @@ def create_reservation():
         return jsonify(result), 201
         
     except Exception as e:
-        logger.error(f"Error en create_reservation: {str(e)}")
+        logger.error("Error en create_reservation: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @reservation_bp.route('/my-reservations', methods=['GET'])
+@deadline(5)
 @jwt_required()
 def get_my_reservations():
     """
@@ -102,6 +112,16 @@ def get_my_reservations():
       - Reservas
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (el id siempre se incluye)
+        example: "bar_name,reservation_date,reservation_time,status"
+      - in: query
+        name: include_archived
+        type: boolean
+        description: Incluir las reservas pasadas ya archivadas
     responses:
       200:
         description: Lista de reservas del usuario
@@ -109,20 +129,28 @@ def get_my_reservations():
           type: array
           items:
             type: object
+      400:
+        description: Campos no válidos
       401:
         description: No autenticado
     """
     try:
+        try:
+            fields = parse_fields(ReservationRow, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         user_id = int(get_jwt_identity())
-        reservations = ReservationService.get_user_reservations(user_id)
+        reservations = ReservationService.get_user_reservations(
+            user_id, fields, include_archived=parse_flag(request.args.get('include_archived')))
         return jsonify(reservations), 200
     except Exception as e:
-        logger.error(f"Error en get_my_reservations: {str(e)}")
+        logger.error("Error en get_my_reservations: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @reservation_bp.route('/bar/<int:bar_id>', methods=['GET'])
-@jwt_required()
+@deadline(5)
+@admin_required
 def get_bar_reservations(bar_id):
     """
     Obtener reservas de un bar (para administradores)
@@ -136,22 +164,40 @@ def get_bar_reservations(bar_id):
         name: bar_id
         type: integer
         required: true
+      - in: query
+        name: fields
+        type: string
+        description: Campos a devolver separados por comas (el id siempre se incluye)
+        example: "bar_name,reservation_date,reservation_time,status"
+      - in: query
+        name: include_archived
+        type: boolean
+        description: Incluir las reservas pasadas ya archivadas
     responses:
       200:
         description: Lista de reservas del bar
+      400:
+        description: Campos no válidos
       401:
         description: No autenticado
+      403:
+        description: No es administrador
     """
     try:
-        # TODO: Agregar verificación de permisos de admin
-        reservations = ReservationService.get_bar_reservations(bar_id)
+        try:
+            fields = parse_fields(ReservationRow, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        reservations = ReservationService.get_bar_reservations(
+            bar_id, fields, include_archived=parse_flag(request.args.get('include_archived')))
         return jsonify(reservations), 200
     except Exception as e:
-        logger.error(f"Error en get_bar_reservations: {str(e)}")
+        logger.error("Error en get_bar_reservations: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @reservation_bp.route('/<int:reservation_id>/cancel', methods=['PUT'])
+@priority("critical")
 @jwt_required()
 def cancel_reservation(reservation_id):
     """
@@ -183,5 +229,5 @@ def cancel_reservation(reservation_id):
         
         return jsonify(result), 200
     except Exception as e:
-        logger.error(f"Error en cancel_reservation: {str(e)}")
+        logger.error("Error en cancel_reservation: %s", e)
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -7,6 +7,8 @@ Puedes crear más controladores siguiendo este ejemplo.
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required
 from services.user_service import UserService
+from utils.admission import priority
+from utils.rate_limit import rate_limited
 import logging
 
 logger = logging.getLogger(__name__)
@@ -81,15 +83,17 @@ def register():
         return jsonify({"msg": "username y password son requeridos"}), 400
 
     try:
-        logger.info(f'Registrando usuario: {username}')
+        logger.info('Registrando usuario: %s', username)
         user = UserService.register_user(username, password)
 
         # Soporta contrato donde el servicio devuelve dict de error
         if isinstance(user, dict) and user.get('error') == 'Usuario ya existe':
-            logger.warning(f'Usuario ya existe: {username}')
+            logger.warning('Usuario ya existe: %s', username)
             return jsonify({'msg': 'Usuario ya existe'}), 409
+        if isinstance(user, dict):
+            return jsonify({'msg': 'No se pudo completar el registro', 'detail': user['error']}), 500
 
-        logger.info(f'Usuario registrado: {user.username} (ID: {user.id})')
+        logger.info('Usuario registrado: %s (ID: %s)', user.username, user.id)
         return jsonify({'id': user.id, 'username': user.username}), 201
 
     except Exception as e:
@@ -98,6 +102,8 @@ def register():
 
 
 @user_bp.route('/login', methods=['POST'])
+@priority("critical")
+@rate_limited("login")
 def login():
     """
     Login de usuario
@@ -152,14 +158,17 @@ def login():
     if not username or not password:
         return jsonify({"msg": "username y password son requeridos"}), 400
 
-    logger.info(f'Intento de login para usuario: {username}')
+    logger.info('Intento de login para usuario: %s', username)
     user = UserService.authenticate(username, password)
     if user:
-        access_token = create_access_token(identity=str(user.id))  # identity debe ser string
-        logger.info(f'Login exitoso para usuario: {username}')
+        access_token = create_access_token(
+            identity=str(user.id),  # identity debe ser string
+            additional_claims={'username': user.username}
+        )
+        logger.info('Login exitoso para usuario: %s', username)
         return jsonify({'access_token': access_token}), 200
 
-    logger.warning(f'Login fallido para usuario: {username}')
+    logger.warning('Login fallido para usuario: %s', username)
     return jsonify({'msg': 'Credenciales inválidas'}), 401
 
 
@@ -208,10 +217,10 @@ def get_users():
     try:
         logger.info('Consultando listado de usuarios')
         users = UserService.get_all_users()
-        logger.info(f'{len(users)} usuarios encontrados')
+        logger.info('%s usuarios encontrados', len(users))
         return jsonify([{'id': u.id, 'username': u.username} for u in users]), 200
     except Exception as e:
-        logger.error(f'Error al consultar usuarios: {str(e)}')
+        logger.error('Error al consultar usuarios: %s', e)
         return jsonify({'error': 'No autenticado', 'msg': str(e)}), 401
 
 
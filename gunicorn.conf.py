@@ -0,0 +1,52 @@
+"""
+Configuración de gunicorn (se carga automáticamente desde el directorio de trabajo).
+El bind y el módulo de la app siguen definiéndose en el Procfile / Dockerfile.
+"""
+import glob
+import os
+import tempfile
+
+# Directorio compartido donde cada worker vuelca sus métricas para que
+# /metrics devuelva el agregado de todos los procesos.
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "partyfinder_metrics"))
+
+# Buckets del límite de peticiones (utils/rate_limit.py) compartidos por los
+# workers; /dev/shm evita escrituras a disco cuando existe.
+os.environ.setdefault("RATE_LIMIT_FILE", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), f"partyfinder_ratelimit_{os.getpid()}.bin"))
+
+# Los streams SSE (/availability/stream) mantienen la conexión abierta: con
+# workers sync cada cliente ocuparía un worker entero y el worker se
+# reiniciaría al superar `timeout`. Por defecto se usan hilos (gthread); con
+# GUNICORN_WORKER_CLASS=gevent (requiere `pip install gevent`) cada worker
+# atiende miles de streams con greenlets.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Streams SSE abiertos por worker antes de responder 503: con gthread, la
+# mitad de los hilos (el resto atiende las peticiones normales); con gevent,
+# la mitad de las conexiones.
+os.environ.setdefault("SSE_MAX_STREAMS", str(max(1, (worker_connections if worker_class == "gevent" else threads) // 2)))
+
+
+def on_starting(server):
+    """Limpia las instantáneas de métricas de ejecuciones anteriores del master."""
+    directory = os.environ["METRICS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics_*.json*")):
+        os.remove(path)
+
+
+def post_worker_init(worker):
+    """Arranca el planificador de tareas programadas del worker (utils/scheduler.py)."""
+    from utils.scheduler import start_scheduler
+    start_scheduler(worker.wsgi)
+
+
+def on_exit(server):
+    """Elimina el archivo de buckets del límite de peticiones de este master."""
+    try:
+        os.remove(os.environ["RATE_LIMIT_FILE"])
+    except OSError:
+        pass
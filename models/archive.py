@@ -0,0 +1,50 @@
+"""
+Tablas de archivo: historial de disponibilidad y reservas pasadas (ver services.archive_service).
+"""
+from models.db import db
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityArchive(db.Model):
+    """
+    Slots de `availabilities` con fecha anterior al horizonte de retención.
+    Mismas columnas e ids que la tabla viva, sin claves foráneas ni el índice
+    de updated_at (el historial no cambia): solo el índice de lectura por bar.
+    """
+    __tablename__ = 'availabilities_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bar_id = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time_slot = db.Column(db.String(10), nullable=False)
+    total_capacity = db.Column(db.Integer, nullable=False)
+    reserved_count = db.Column(db.Integer)
+    is_available = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_availabilities_archive_bar_date', 'bar_id', 'date'),)
+
+
+class ReservationArchive(db.Model):
+    """Reservas de `reservations` con fecha anterior al horizonte de retención (mismas columnas e ids)."""
+    __tablename__ = 'reservations_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    bar_id = db.Column(db.Integer, nullable=False, index=True)
+    availability_id = db.Column(db.Integer)
+    full_name = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    num_people = db.Column(db.Integer, nullable=False)
+    reservation_date = db.Column(db.Date, nullable=False)
+    reservation_time = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(20))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -26,7 +26,8 @@ class Availability(db.Model):
     
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexada: el stream de disponibilidad consulta los slots cambiados recientemente
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def __repr__(self):
         return f'<Availability Bar:{self.bar_id} Date:{self.date} Slot:{self.time_slot}>'
@@ -2,6 +2,7 @@
 Modelo para los bares/establecimientos.
 """
 from models.db import db
+from models.genre import bar_genres
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,7 +29,8 @@ class Bar(db.Model):
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
     
-    # Géneros musicales (JSON string)
+    # Géneros musicales: legado (JSON string). La fuente de verdad es la
+    # asociación `genres`; solo scripts/migrate_genres.py lee esta columna.
     music_genres = db.Column(db.Text, nullable=True)  # ["Reggaetón", "Electrónica"]
     
     # Rating
@@ -41,13 +43,13 @@ class Bar(db.Model):
     # Relaciones
     reservations = db.relationship('Reservation', backref='bar', lazy=True)
     availabilities = db.relationship('Availability', backref='bar', lazy=True)
+    genres = db.relationship('Genre', secondary=bar_genres, lazy=True)
 
     def __repr__(self):
         return f'<Bar {self.name}>'
 
     def to_dict(self):
         """Devuelve los datos del bar en formato JSON."""
-        import json
         return {
             "id": self.id,
             "name": self.name,
@@ -61,7 +63,7 @@ class Bar(db.Model):
             "max_price": self.max_price,
             "latitude": self.latitude,
             "longitude": self.longitude,
-            "music_genres": json.loads(self.music_genres) if self.music_genres else [],
+            "music_genres": sorted(genre.name for genre in self.genres),
             "rating": self.rating,
             "total_reviews": self.total_reviews,
             "is_active": self.is_active
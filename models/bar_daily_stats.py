@@ -0,0 +1,45 @@
+"""
+Modelo de las estadísticas diarias por bar (ver services.bar_stats_service).
+"""
+from models.db import db
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BarDailyStats(db.Model):
+    """
+    Una fila por bar y fecha, mantenida con incrementos en las mismas
+    transacciones que crean reservas, las cancelan o cambian la
+    disponibilidad. Las filas sobreviven al archivo del historial.
+    """
+    __tablename__ = 'bar_daily_stats'
+
+    bar_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, primary_key=True)
+
+    slots = db.Column(db.Integer, nullable=False, default=0)         # slots de disponibilidad
+    capacity = db.Column(db.Integer, nullable=False, default=0)      # suma de total_capacity
+    bookings = db.Column(db.Integer, nullable=False, default=0)      # reservas creadas
+    cancellations = db.Column(db.Integer, nullable=False, default=0)
+    reserved = db.Column(db.Integer, nullable=False, default=0)      # reservas vigentes (bookings - cancellations)
+    people = db.Column(db.Integer, nullable=False, default=0)        # personas de las reservas vigentes
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BarDailyStats Bar:{self.bar_id} Date:{self.date}>'
+
+    def to_dict(self):
+        """Devuelve los datos en formato JSON."""
+        return {
+            "date": self.date.isoformat(),
+            "slots": self.slots,
+            "capacity": self.capacity,
+            "bookings": self.bookings,
+            "cancellations": self.cancellations,
+            "reserved": self.reserved,
+            "people": self.people,
+            "occupancy_rate": round(self.reserved / self.capacity, 4) if self.capacity else None,
+        }
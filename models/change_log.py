@@ -0,0 +1,40 @@
+"""
+Modelos del registro de cambios (feed incremental para sincronización).
+"""
+from models.db import db
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeLog(db.Model):
+    """
+    Una fila por entidad modificada en una transacción. El id (autoincremental)
+    es el cursor del feed. entity_id nulo = cambio masivo sin ids conocidos
+    (op "resync": el cliente debe volver a descargar esa entidad, del bar
+    `bar_id` si se conoce).
+    """
+    __tablename__ = 'change_log'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)   # "bar" | "availability"
+    entity_id = db.Column(db.Integer, nullable=True)
+    bar_id = db.Column(db.Integer, nullable=True)
+    op = db.Column(db.String(10), nullable=False)       # "upsert" | "delete" | "resync"
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    # Compactación: localizar entradas anteriores de la misma entidad
+    __table_args__ = (db.Index('ix_change_log_entity', 'entity', 'entity_id', 'id'),)
+
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.entity}:{self.entity_id} {self.op}>'
+
+
+class ChangeLogHorizon(db.Model):
+    """Fila única: cursor más alto eliminado por la retención; cursores anteriores deben resincronizar."""
+    __tablename__ = 'change_log_horizon'
+
+    id = db.Column(db.Integer, primary_key=True)
+    cursor = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
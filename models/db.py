@@ -4,4 +4,7 @@ Importa este objeto en los modelos y repositorios para evitar ciclos de importac
 """
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from utils.replicas import RoutingSession
+
+# RoutingSession envía las lecturas de GET a las réplicas si hay REPLICA_URLS
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,41 @@
+"""
+Modelo para los géneros musicales y su asociación con los bares.
+"""
+from models.db import db
+from utils.text import slugify
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Asociación bar <-> género. La PK (bar_id, genre_id) sirve para listar los
+# géneros de un bar; el índice (genre_id, bar_id) para filtrar bares por género.
+bar_genres = db.Table(
+    'bar_genres',
+    db.Column('bar_id', db.Integer, db.ForeignKey('bars.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_bar_genres_genre_bar', 'genre_id', 'bar_id'),
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'genres'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(60), unique=True, nullable=False)  # ej: "Reggaetón"
+    slug = db.Column(db.String(60), unique=True, nullable=False)  # ej: "reggaeton" (filtros)
+
+    def __repr__(self):
+        return f'<Genre {self.name}>'
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """Nombre limpio de un género. Las comas se eliminan porque separan los géneros en los listados."""
+        return " ".join(name.replace(",", " ").split())
+
+    @staticmethod
+    def slug_for(name: str) -> str:
+        return slugify(Genre.normalize_name(name))
+
+    def to_dict(self):
+        """Devuelve los datos del género en formato JSON."""
+        return {"id": self.id, "name": self.name, "slug": self.slug}
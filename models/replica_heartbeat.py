@@ -0,0 +1,12 @@
+"""
+Latido para medir el retraso de las réplicas (ver utils.replicas).
+"""
+from models.db import db
+
+
+class ReplicaHeartbeat(db.Model):
+    """Fila única; el primario la actualiza y cada réplica la recibe con su retraso."""
+    __tablename__ = 'replica_heartbeat'
+
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.Float, nullable=False)  # epoch en segundos, reloj de la app
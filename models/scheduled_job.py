@@ -0,0 +1,34 @@
+"""
+Estado compartido de las tareas programadas (ver utils.scheduler).
+"""
+from models.db import db
+
+
+class ScheduledJob(db.Model):
+    """
+    Una fila por tarea. Hace de lock: un worker solo ejecuta la ejecución
+    programada `slot` si logra pasar `owner`/`lease_until` a su nombre con un
+    UPDATE condicional (done_slot < slot y sin lease vigente).
+    """
+    __tablename__ = 'scheduled_jobs'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(200))                           # host:pid del worker que la ejecuta
+    lease_until = db.Column(db.Float, nullable=False, default=0.0)  # epoch; vencido = libre
+    done_slot = db.Column(db.Float, nullable=False, default=0.0)    # última ejecución programada completada
+    started_at = db.Column(db.Float)
+    finished_at = db.Column(db.Float)
+    last_status = db.Column(db.String(20))
+    last_error = db.Column(db.Text)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "owner": self.owner,
+            "lease_until": self.lease_until,
+            "done_slot": self.done_slot,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+        }
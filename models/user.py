@@ -16,7 +16,6 @@ class User(db.Model):
     password = db.Column(db.String(255), nullable=False)
 
     def __repr__(self):
-        logger.info(f'Representación de usuario solicitada: {self.username}')
         return f'<User {self.username}>'
 
 """
@@ -0,0 +1,289 @@
+"""
+Repositorio de solo lectura para los listados grandes.
+
+Selecciona exactamente las columnas necesarias con SQLAlchemy Core y mapea
+cada fila a una tupla ligera (namedtuple con __slots__ vacío) en lugar de
+hidratar instancias ORM en el identity map. Cada fila sabe serializarse con
+`to_dict()` y produce el mismo JSON que el `to_dict()` del modelo.
+
+Los listados aceptan `fields` (sparse fieldsets, `?fields=id,name`): la
+proyección se traslada a la lista del SELECT, así que las columnas no pedidas
+nunca se leen ni se serializan.
+
+Los historiales (disponibilidad de un bar, reservas) aceptan `archived=True`
+para incluir también las tablas de archivo (models.archive) con UNION ALL.
+
+Las filas son inmutables y no están ligadas a la sesión: no deben usarse
+para escribir.
+"""
+import functools
+from collections import namedtuple
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from models.archive import AvailabilityArchive, ReservationArchive
+from models.availability import Availability
+from models.bar import Bar
+from models.genre import Genre, bar_genres
+from models.reservation import Reservation
+from utils.tracing import traced
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _genres(value):
+    return sorted(value.split(",")) if value else []
+
+
+# Géneros de cada bar como "a,b,c" en la misma consulta (subconsulta correlacionada
+# sobre el índice de bar_genres); GROUP_CONCAT existe en SQLite y MySQL.
+_genre_names = (
+    select(func.group_concat(Genre.name))
+    .select_from(bar_genres)
+    .join(Genre, Genre.id == bar_genres.c.genre_id)
+    .where(bar_genres.c.bar_id == Bar.id)
+    .correlate(Bar)
+    .scalar_subquery()
+    .label("music_genres")
+)
+
+
+class _Serializable:
+    """Serialización común de las filas: dict por campo + conversiones por campo."""
+
+    __slots__ = ()
+    converters = {}
+
+    def to_dict(self) -> dict:
+        data = dict(zip(self._fields, self))
+        for name, convert in self.converters.items():
+            if name in data:
+                data[name] = convert(data[name])
+        return data
+
+
+class BarRow(namedtuple("BarRow", [
+        "id", "name", "address", "description", "image_url", "phone", "opening_time", "closing_time",
+        "min_price", "max_price", "latitude", "longitude", "music_genres", "rating", "total_reviews",
+        "is_active"]), _Serializable):
+    __slots__ = ()
+    columns = (Bar.id, Bar.name, Bar.address, Bar.description, Bar.image_url, Bar.phone, Bar.opening_time,
+               Bar.closing_time, Bar.min_price, Bar.max_price, Bar.latitude, Bar.longitude, _genre_names,
+               Bar.rating, Bar.total_reviews, Bar.is_active)
+    converters = {"music_genres": _genres}
+
+
+class AvailabilityRow(namedtuple("AvailabilityRow", [
+        "id", "bar_id", "date", "time_slot", "total_capacity", "reserved_count", "is_available",
+        "created_at", "updated_at"]), _Serializable):
+    __slots__ = ()
+    columns = (Availability.id, Availability.bar_id, Availability.date, Availability.time_slot,
+               Availability.total_capacity, Availability.reserved_count, Availability.is_available,
+               Availability.created_at, Availability.updated_at)
+    converters = {"date": _iso, "created_at": _iso, "updated_at": _iso}
+
+    def to_dict(self) -> dict:
+        data = _Serializable.to_dict(self)
+        data["available_capacity"] = self.total_capacity - self.reserved_count
+        return data
+
+
+class ReservationRow(namedtuple("ReservationRow", [
+        "id", "user_id", "bar_id", "bar_name", "bar_address", "bar_image", "full_name", "phone", "num_people",
+        "reservation_date", "reservation_time", "status", "notes", "created_at", "updated_at"]), _Serializable):
+    __slots__ = ()
+    columns = (Reservation.id, Reservation.user_id, Reservation.bar_id, Bar.name, Bar.address, Bar.image_url,
+               Reservation.full_name, Reservation.phone, Reservation.num_people, Reservation.reservation_date,
+               Reservation.reservation_time, Reservation.status, Reservation.notes, Reservation.created_at,
+               Reservation.updated_at)
+    converters = {"reservation_date": _iso, "created_at": _iso, "updated_at": _iso}
+
+
+def parse_fields(row_class, raw: str):
+    """
+    Convierte `?fields=a,b` en una tupla de campos válida para `row_class`.
+
+    Devuelve None si no se pidió proyección. El `id` se incluye siempre.
+    Lanza ValueError con los campos desconocidos.
+    """
+    if not raw:
+        return None
+    requested = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = requested.difference(row_class._fields)
+    if unknown:
+        raise ValueError(f"Campos no válidos: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(f for f in row_class._fields if f in requested)
+
+
+def parse_flag(raw: str) -> bool:
+    """Convierte un parámetro booleano (`?include_archived=1|true|yes`)."""
+    return (raw or "").strip().lower() in ("1", "true", "yes")
+
+
+@functools.lru_cache(maxsize=128)
+def projection(row_class, fields: tuple):
+    """Subclase de `row_class` restringida a `fields`, con sus mismas columnas y conversiones."""
+    if fields is None or fields == row_class._fields:
+        return row_class
+    positions = [row_class._fields.index(f) for f in fields]
+    base = namedtuple(f"{row_class.__name__}Projection", fields)
+    return type(base.__name__, (base, _Serializable), {
+        "__slots__": (),
+        "columns": tuple(row_class.columns[i] for i in positions),
+        "converters": {k: v for k, v in row_class.converters.items() if k in fields},
+    })
+
+
+def _from_archive(columns, model, archive_model) -> list:
+    """Las mismas columnas leídas de la tabla de archivo (las de otros modelos, ej. el bar, se mantienen)."""
+    return [getattr(archive_model, c.key) if getattr(c, "class_", None) is model else c for c in columns]
+
+
+def _union(row_class, branches, order_by) -> object:
+    """
+    UNION ALL de `branches` (pares (columnas de row_class, función que completa
+    el SELECT)) ordenado por `order_by`: pares (columnas de orden de cada rama, desc).
+    """
+    selects = []
+    for index, (columns, complete) in enumerate(branches):
+        keys = [keys[index].label(f"sort_{i}") for i, (keys, _) in enumerate(order_by)]
+        selects.append(complete(select(*(c.label(f) for c, f in zip(columns, row_class._fields)), *keys)))
+    union = union_all(*selects).subquery()
+    return select(*(union.c[f] for f in row_class._fields)).order_by(
+        *(union.c[f"sort_{i}"].desc() if desc else union.c[f"sort_{i}"] for i, (_, desc) in enumerate(order_by)))
+
+
+def _fetch(session: Session, row_class, stmt) -> list:
+    # La conexión de la sesión ejecuta Core puro (sin identity map) dentro de la misma transacción
+    make = row_class._make
+    return [make(row) for row in session.connection().execute(stmt)]
+
+
+def bar_conditions(genres: tuple = None, min_price: int = None, max_price: int = None) -> list:
+    """
+    Condiciones WHERE de los filtros de bares activos.
+
+    `genres` son slugs (basta con uno). El rango de precios filtra por
+    solapamiento: bares cuya entrada mínima no supera `max_price` y cuyo
+    precio máximo alcanza `min_price`.
+    """
+    conditions = [Bar.is_active.is_(True)]
+    if genres:
+        conditions.append(Bar.id.in_(
+            select(bar_genres.c.bar_id)
+            .join(Genre, Genre.id == bar_genres.c.genre_id)
+            .where(Genre.slug.in_(genres))
+        ))
+    if min_price is not None:
+        conditions.append(Bar.max_price >= min_price)
+    if max_price is not None:
+        conditions.append(Bar.min_price <= max_price)
+    return conditions
+
+
+class ReadRepository:
+
+    @staticmethod
+    @traced("repository")
+    def active_bars(session: Session, fields: tuple = None, genres: tuple = None, min_price: int = None,
+                    max_price: int = None) -> list:
+        row_class = projection(BarRow, fields)
+        stmt = select(*row_class.columns).where(*bar_conditions(genres, min_price, max_price))
+        return _fetch(session, row_class, stmt)
+
+    @staticmethod
+    @traced("repository")
+    def bars_by_ids(session: Session, bar_ids: list, fields: tuple = None, active_only: bool = True) -> list:
+        """Bares (por defecto solo activos) con esos ids (sin orden garantizado)."""
+        row_class = projection(BarRow, fields)
+        stmt = select(*row_class.columns).where(Bar.id.in_(bar_ids))
+        if active_only:
+            stmt = stmt.where(Bar.is_active.is_(True))
+        return _fetch(session, row_class, stmt)
+
+    @staticmethod
+    @traced("repository")
+    def availability_by_ids(session: Session, availability_ids: list) -> list:
+        stmt = select(*AvailabilityRow.columns).where(Availability.id.in_(availability_ids))
+        return _fetch(session, AvailabilityRow, stmt)
+
+    @staticmethod
+    @traced("repository")
+    def bar(session: Session, bar_id: int, fields: tuple = None):
+        row_class = projection(BarRow, fields)
+        rows = _fetch(session, row_class, select(*row_class.columns).where(Bar.id == bar_id))
+        return rows[0] if rows else None
+
+    @staticmethod
+    @traced("repository")
+    def bar_availability(session: Session, bar_id: int, start=None, end=None, archived: bool = False) -> list:
+        def complete(model):
+            def where(stmt):
+                stmt = stmt.where(model.bar_id == bar_id)
+                if start is not None:
+                    stmt = stmt.where(model.date >= start)
+                if end is not None:
+                    stmt = stmt.where(model.date <= end)
+                return stmt
+            return where
+
+        if not archived:
+            stmt = complete(Availability)(select(*AvailabilityRow.columns))
+            return _fetch(session, AvailabilityRow, stmt.order_by(Availability.date, Availability.time_slot))
+        stmt = _union(AvailabilityRow, [
+            (AvailabilityRow.columns, complete(Availability)),
+            (_from_archive(AvailabilityRow.columns, Availability, AvailabilityArchive), complete(AvailabilityArchive)),
+        ], [((Availability.date, AvailabilityArchive.date), False),
+            ((Availability.time_slot, AvailabilityArchive.time_slot), False)])
+        return _fetch(session, AvailabilityRow, stmt)
+
+    @staticmethod
+    @traced("repository")
+    def bars_availability(session: Session, bar_ids: list, start=None) -> list:
+        stmt = select(*AvailabilityRow.columns).where(Availability.bar_id.in_(bar_ids))
+        if start is not None:
+            stmt = stmt.where(Availability.date >= start)
+        stmt = stmt.order_by(Availability.bar_id, Availability.date, Availability.time_slot)
+        return _fetch(session, AvailabilityRow, stmt)
+
+    @staticmethod
+    @traced("repository")
+    def availability_changes(session: Session, since, bar_ids: list = None) -> list:
+        """Slots con updated_at >= since (opcionalmente solo de esos bares)."""
+        stmt = select(*AvailabilityRow.columns).where(Availability.updated_at >= since)
+        if bar_ids is not None:
+            stmt = stmt.where(Availability.bar_id.in_(bar_ids))
+        return _fetch(session, AvailabilityRow, stmt.order_by(Availability.updated_at))
+
+    @staticmethod
+    @traced("repository")
+    def reservations(session: Session, user_id: int = None, bar_id: int = None, fields: tuple = None,
+                     archived: bool = False) -> list:
+        row_class = projection(ReservationRow, fields)
+        # Los datos del bar solo se unen si se pidió alguno
+        with_bar = any(f in ("bar_name", "bar_address", "bar_image") for f in row_class._fields)
+
+        def complete(model):
+            def where(stmt):
+                stmt = stmt.select_from(model)
+                if with_bar:
+                    stmt = stmt.outerjoin(Bar, Bar.id == model.bar_id)
+                if user_id is not None:
+                    stmt = stmt.where(model.user_id == user_id)
+                if bar_id is not None:
+                    stmt = stmt.where(model.bar_id == bar_id)
+                return stmt
+            return where
+
+        if not archived:
+            stmt = complete(Reservation)(select(*row_class.columns))
+            return _fetch(session, row_class, stmt.order_by(Reservation.reservation_date.desc()))
+        stmt = _union(row_class, [
+            (row_class.columns, complete(Reservation)),
+            (_from_archive(row_class.columns, Reservation, ReservationArchive), complete(ReservationArchive)),
+        ], [((Reservation.reservation_date, ReservationArchive.reservation_date), True)])
+        return _fetch(session, row_class, stmt)
@@ -7,35 +7,39 @@ Puedes crear más repositorios siguiendo este ejemplo.
 
 from sqlalchemy.orm import Session
 from models.user import User
+from utils.tracing import traced
 import logging
 
 logger = logging.getLogger(__name__)
 
 class UserRepository:
     @staticmethod
+    @traced("repository")
     def get_by_username(username, session: Session):
-        logger.info(f'Buscando usuario en repositorio: {username}')
+        logger.debug('Buscando usuario en repositorio: %s', username)
         user = session.query(User).filter_by(username=username).first()
         if user:
-            logger.info(f'Usuario encontrado en repositorio: {username}')
+            logger.debug('Usuario encontrado en repositorio: %s', username)
         else:
-            logger.warning(f'Usuario no encontrado en repositorio: {username}')
+            logger.debug('Usuario no encontrado en repositorio: %s', username)
         return user
 
     @staticmethod
+    @traced("repository")
     def create_user(username, password, session: Session):
-        logger.info(f'Creando usuario en repositorio: {username}')
+        logger.debug('Creando usuario en repositorio: %s', username)
         user = User(username=username, password=password)
         session.add(user)
         session.commit()
-        logger.info(f'Usuario creado en repositorio: {username} (ID: {user.id})')
+        logger.debug('Usuario creado en repositorio: %s (ID: %s)', username, user.id)
         return user
 
     @staticmethod
+    @traced("repository")
     def get_all(session: Session):
-        logger.info('Obteniendo todos los usuarios en repositorio')
+        logger.debug('Obteniendo todos los usuarios en repositorio')
         users = session.query(User).all()
-        logger.info(f'{len(users)} usuarios obtenidos en repositorio')
+        logger.debug('%s usuarios obtenidos en repositorio', len(users))
         return users
 
 """
@@ -0,0 +1,170 @@
+"""
+Verificación de presupuestos de consultas SQL por endpoint.
+
+Ejecuta cada endpoint contra un fixture pequeño, amplía los datos (más bares,
+más reservas del usuario, más días de disponibilidad) y lo vuelve a ejecutar.
+Para cada caso registra el número y tipo de sentencias SQL y falla si:
+    - supera su presupuesto declarado, o
+    - el número de sentencias crece con el tamaño de los datos.
+
+En caso de fallo imprime las sentencias responsables y termina con código 1,
+de modo que puede ejecutarse en CI:
+    python -m scripts.check_query_budgets
+"""
+import logging
+import os
+import sys
+from collections import Counter
+from datetime import date, timedelta
+
+from flask_jwt_extended import decode_token
+
+from benchmarks.common import auth_header, boot_app, seed_dataset
+from utils.sql_profiler import profile_queries
+
+SMALL = {"bars": 5, "reservations": 3, "days": 7}
+LARGE = {"bars": 200, "reservations": 60, "days": 60}
+
+# Presupuesto máximo de sentencias por caso (independiente del tamaño de los datos)
+BUDGETS = {
+    "GET /bars/": 1,
+    "GET /bars/?genre=&min_price=": 1,
+    "GET /bars/facets": 1,
+    # La primera búsqueda del proceso construye el índice (1 sentencia más)
+    "GET /bars/search": 2,
+    # Solo la primera consulta del proceso construye la grilla
+    "GET /bars/clusters": 1,
+    "GET /bars/<id>": 1,
+    "GET /availability/bar/<id>": 1,
+    "GET /reservations/my-reservations": 1,
+    "GET /reservations/bar/<id>": 1,
+    "GET /users/": 1,
+    # Existencia del bar + días pedidos de bar_daily_stats
+    "GET /bars/<id>/stats": 2,
+    # Horizonte + entradas del log + estado de bares + estado de slots
+    "GET /changes?since=": 4,
+    # Las escrituras incluyen un INSERT (executemany) en change_log por transacción
+    # y un upsert (executemany) en bar_daily_stats
+    "POST /reservations/": 7,
+    "PUT /reservations/<id>/cancel": 6,
+    "POST /availability/bulk": 4,
+}
+
+
+class Context:
+    """Estado del fixture compartido por los casos."""
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+        self.headers = auth_header(self.client, "budget@partyfinder.com", "budget")
+        # El usuario de prueba es administrador (GET /bars/<id>/stats)
+        with app.app_context():
+            user_id = decode_token(self.headers["Authorization"].split()[1])["sub"]
+        os.environ["ADMIN_USER_IDS"] = str(user_id)
+        self.bar_ids = []
+        self.reservation_ids = []
+        self.next_day = 0
+
+    def grow(self, size: dict) -> None:
+        """Amplía los datos hasta `size` bares y reservas del usuario de prueba."""
+        missing_bars = size["bars"] - len(self.bar_ids)
+        if missing_bars > 0:
+            dataset = seed_dataset(self.app, bars=missing_bars, users=0, days=3, seed=len(self.bar_ids))
+            self.bar_ids = sorted(set(self.bar_ids) | set(dataset["bar_ids"]))
+        while len(self.reservation_ids) < size["reservations"]:
+            bar_id = self.bar_ids[len(self.reservation_ids) % len(self.bar_ids)]
+            response = self.client.post("/reservations/", headers=self.headers, json=self.booking(bar_id))
+            self.reservation_ids.append(response.get_json()["id"])
+
+    def booking(self, bar_id: int) -> dict:
+        self.next_day += 1
+        return {
+            "bar_id": bar_id, "full_name": "Budget", "phone": "300", "num_people": 2,
+            "reservation_date": (date.today() + timedelta(days=self.next_day % 300)).isoformat(),
+            "reservation_time": "22:00",
+        }
+
+
+def _cases(ctx: Context, size: dict) -> dict:
+    bar_id = ctx.bar_ids[0]
+    return {
+        "GET /bars/": lambda: ctx.client.get("/bars/"),
+        "GET /bars/?genre=&min_price=": lambda: ctx.client.get("/bars/?genre=salsa,rock&min_price=20000"),
+        "GET /bars/facets": lambda: ctx.client.get("/bars/facets?genre=salsa"),
+        "GET /bars/search": lambda: ctx.client.get("/bars/search?q=calle"),
+        "GET /bars/clusters": lambda: ctx.client.get("/bars/clusters?bbox=-80,-5,-66,13&zoom=6"),
+        "GET /bars/<id>": lambda: ctx.client.get(f"/bars/{bar_id}"),
+        "GET /availability/bar/<id>": lambda: ctx.client.get(f"/availability/bar/{bar_id}"),
+        "GET /reservations/my-reservations": lambda: ctx.client.get("/reservations/my-reservations", headers=ctx.headers),
+        "GET /reservations/bar/<id>": lambda: ctx.client.get(f"/reservations/bar/{bar_id}", headers=ctx.headers),
+        "GET /users/": lambda: ctx.client.get("/users/", headers=ctx.headers),
+        "GET /bars/<id>/stats": lambda: ctx.client.get(
+            f"/bars/{bar_id}/stats?start_date={date.today()}&end_date={date.today() + timedelta(days=365)}",
+            headers=ctx.headers),
+        "GET /changes?since=": lambda: ctx.client.get("/changes?since=0&limit=500"),
+        "POST /reservations/": lambda: ctx.client.post("/reservations/", headers=ctx.headers, json=ctx.booking(bar_id)),
+        "PUT /reservations/<id>/cancel": lambda: ctx.client.put(
+            f"/reservations/{ctx.reservation_ids.pop()}/cancel", headers=ctx.headers),
+        "POST /availability/bulk": lambda: ctx.client.post(
+            "/availability/bulk", headers=ctx.headers,
+            json={"bar_id": ctx.bar_ids[-1], "days": size["days"], "capacity": 10}),
+    }
+
+
+def _measure(ctx: Context, size: dict) -> dict:
+    results = {}
+    for name, call in _cases(ctx, size).items():
+        with profile_queries() as profile:
+            response = call()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} respondió {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        kinds = Counter()
+        for fp, stats in profile.fingerprints.items():
+            kinds[fp.split(" ", 1)[0].upper()] += stats[0]
+        results[name] = {"count": profile.count, "kinds": dict(kinds), "profile": profile}
+    return results
+
+
+def _print_offenders(profile) -> None:
+    for entry in profile.summary():
+        print(f"      {entry['count']:>4}x  {entry['fingerprint'][:160]}")
+
+
+def main() -> int:
+    # Todos los casos usan el mismo usuario e IP: el límite de peticiones los cortaría
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    # Sin ventana de asentamiento el feed de cambios entrega siempre las mismas
+    # entradas; con ella, el caso de /changes dependía de cuánto tardaba el fixture
+    os.environ.setdefault("CHANGES_SETTLE_SECONDS", "0")
+    app = boot_app()
+    # Los logs de la app (p. ej. SMTP sin configurar) no aportan aquí
+    logging.disable(logging.ERROR)
+    ctx = Context(app)
+
+    ctx.grow(SMALL)
+    small = _measure(ctx, SMALL)
+    ctx.grow(LARGE)
+    large = _measure(ctx, LARGE)
+
+    failures = 0
+    print(f"{'caso':<36}{'pequeño':>9}{'grande':>9}{'presup.':>9}  tipos (grande)")
+    for name, budget in BUDGETS.items():
+        s, l = small[name], large[name]
+        problems = []
+        if l["count"] > s["count"]:
+            problems.append("crece con los datos")
+        if l["count"] > budget or s["count"] > budget:
+            problems.append("supera el presupuesto")
+        status = "FALLO: " + ", ".join(problems) if problems else "ok"
+        print(f"{name:<36}{s['count']:>9}{l['count']:>9}{budget:>9}  {l['kinds']}  {status}")
+        if problems:
+            failures += 1
+            print("    sentencias (fixture grande):")
+            _print_offenders(l["profile"])
+    print(f"\n{failures} caso(s) con regresión de consultas" if failures else "\nTodos los presupuestos se cumplen")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
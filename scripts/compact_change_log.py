@@ -0,0 +1,34 @@
+"""
+Compacta el registro de cambios (feed GET /changes).
+
+Deja solo la entrada más reciente de cada entidad y elimina las que superan
+la retención, avanzando el horizonte (los clientes con un cursor anterior
+reciben 410 y deben resincronizar). Trabaja por lotes con un commit por lote
+para no bloquear las escrituras. Usa la base de datos configurada en
+MYSQL_URL, igual que la app.
+
+Uso:
+    python -m scripts.compact_change_log [--retention-days 30] [--batch-size 5000]
+"""
+import argparse
+
+from app import app
+from services.change_feed_service import CHANGES_COMPACT_BATCH, CHANGES_RETENTION_DAYS, ChangeFeedService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compacta change_log")
+    parser.add_argument("--retention-days", type=int, default=CHANGES_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=CHANGES_COMPACT_BATCH)
+    args = parser.parse_args()
+
+    with app.app_context():
+        stats = ChangeFeedService.compact(args.retention_days, args.batch_size)
+    if "error" in stats:
+        raise SystemExit(f"Error: {stats['error']}")
+    print(f"{stats['deduplicated']} entradas superadas y {stats['expired']} expiradas eliminadas; "
+          f"horizonte {stats['horizon']}")
+
+
+if __name__ == "__main__":
+    main()
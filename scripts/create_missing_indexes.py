@@ -0,0 +1,56 @@
+"""
+Crea en una base existente los índices declarados en los modelos que aún no existen.
+
+`db.create_all()` solo crea tablas nuevas (con sus índices): los índices
+añadidos después a tablas ya existentes, como `availabilities.updated_at`
+(sondeo del stream de disponibilidad), no llegan a las bases desplegadas.
+Este script compara los índices de los modelos con los de cada tabla y
+crea los que faltan (por nombre). En MySQL/InnoDB `CREATE INDEX` no
+bloquea las escrituras mientras se construye. Puede ejecutarse varias veces.
+Usa la base de datos configurada en MYSQL_URL, igual que la app.
+
+Uso:
+    python -m scripts.create_missing_indexes [--dry-run]
+"""
+import argparse
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+
+from app import app
+from models.db import db
+
+logger = logging.getLogger(__name__)
+
+
+def missing_indexes() -> list:
+    """Índices de los modelos cuya tabla existe pero que aún no están creados."""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue  # create_all la creará con sus índices
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in sorted(table.indexes, key=lambda i: i.name) if index.name not in existing)
+    return missing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Crea los índices de los modelos que faltan")
+    parser.add_argument("--dry-run", action="store_true", help="solo muestra el DDL")
+    args = parser.parse_args()
+
+    with app.app_context():
+        indexes = missing_indexes()
+        for index in indexes:
+            ddl = str(CreateIndex(index).compile(dialect=db.engine.dialect)).strip()
+            print(f"{ddl};")
+            if not args.dry_run:
+                index.create(db.engine)
+    print(f"{len(indexes)} índices {'pendientes' if args.dry_run else 'creados'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Generador de datos sintéticos a gran escala para pruebas de rendimiento.
+
+Produce usuarios, bares, disponibilidad y reservas con:
+    - distribución geográfica realista (ciudades de Colombia ponderadas y
+      zonas de rumba con dispersión gaussiana),
+    - popularidad sesgada (Pareto): pocos bares concentran la mayoría de reservas,
+    - estacionalidad semanal (jueves a sábado con más demanda),
+    - un rango de fechas configurable (por defecto un año centrado en hoy).
+
+Es determinista a partir de --seed: la misma semilla y los mismos parámetros
+producen exactamente los mismos datos. La fecha que separa reservas pasadas
+(completadas) de futuras es --today, no el reloj: por defecto --start +
+days/2 si se indica --start, o el día de hoy si no (se imprime para poder
+repetir el mismo dataset otro día con --today o --start).
+
+Salida:
+    --db-url   Inserción masiva directa (SQLite o MySQL) con executemany por lotes.
+    --dump-dir Archivos CSV por tabla (users, bars, availabilities, reservations),
+               cargables con LOAD DATA INFILE o `.import` de sqlite3.
+
+Ejemplos:
+    python -m scripts.generate_dataset --db-url sqlite:///bench.db --users 1000000 --bars 20000
+    python -m scripts.generate_dataset --dump-dir dumps/ --bars 50000 --seed 7
+    python -m scripts.generate_dataset --db-url sqlite:///bench.db --dataset-out bench_dataset.json
+El JSON de --dataset-out puede usarse con `benchmarks.load_test --dataset`.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, insert, select
+from models.availability import Availability
+from models.bar import Bar
+from models.db import db
+from models.genre import Genre, bar_genres
+from models.reservation import Reservation
+from models.user import User
+
+CITIES = [
+    # (nombre, latitud, longitud, peso, zonas de rumba [(lat, lon)])
+    ("Bogotá", 4.6486, -74.0628, 0.40, [(4.6669, -74.0537), (4.6097, -74.0705), (4.6951, -74.0324)]),
+    ("Medellín", 6.2088, -75.5673, 0.22, [(6.2087, -75.5670), (6.2442, -75.5812)]),
+    ("Cali", 3.4516, -76.5320, 0.14, [(3.4516, -76.5320), (3.4861, -76.5131)]),
+    ("Barranquilla", 10.9878, -74.8022, 0.08, [(11.0041, -74.8070)]),
+    ("Cartagena", 10.4236, -75.5518, 0.08, [(10.4236, -75.5518)]),
+    ("Bucaramanga", 7.1193, -73.1227, 0.05, [(7.1193, -73.1227)]),
+    ("Pereira", 4.8133, -75.6961, 0.03, [(4.8133, -75.6961)]),
+]
+GENRES = ["Reggaetón", "Salsa", "Electrónica", "Crossover", "Vallenato", "Rock", "Hip Hop",
+          "Techno", "Pop", "Merengue", "Bachata", "Champeta", "House", "Jazz"]
+PREFIXES = ["La", "El", "Club", "Bar", "Casa", "Discoteca", "Terraza", "Taberna"]
+WORDS = ["Luna", "Sol", "Fuego", "Ritmo", "Noche", "Azul", "Candela", "Selva", "Tropical",
+         "Estrella", "Barrio", "Rumba", "Sabor", "Mango", "Palma", "Neón"]
+# Demanda relativa por día de la semana (lunes=0)
+WEEKDAY_FACTOR = [0.3, 0.35, 0.5, 1.0, 1.8, 2.2, 0.8]
+TIME_SLOTS = ["21:00", "22:00", "23:00", "00:00", "01:00"]
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    """Muestra de Poisson (Knuth para λ pequeño, aproximación normal para λ grande)."""
+    if lam <= 0:
+        return 0
+    if lam > 30:
+        return max(0, int(round(rng.gauss(lam, math.sqrt(lam)))))
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _password_hash(password: str, seed: int) -> str:
+    """
+    Hash scrypt en el formato de werkzeug (verificable con check_password_hash),
+    con sal derivada de la semilla para que la salida sea reproducible.
+    """
+    salt = hashlib.sha256(f"partyfinder-{seed}".encode()).hexdigest()[:16]
+    digest = hashlib.scrypt(password.encode(), salt=salt.encode(), n=2 ** 15, r=8, p=1,
+                            maxmem=132 * 1024 * 1024, dklen=64)
+    return f"scrypt:32768:8:1${salt}${digest.hex()}"
+
+
+class Writer:
+    """Destino de los lotes: base de datos o CSV."""
+
+    def __init__(self, db_url: str = None, dump_dir: str = None, batch_size: int = 10000):
+        self.batch_size = batch_size
+        self.engine = None
+        self.dump_dir = dump_dir
+        self._files = {}
+        if db_url:
+            self.engine = create_engine(db_url)
+            if self.engine.dialect.name == "sqlite":
+                event.listen(self.engine, "connect", _sqlite_bulk_pragmas)
+            db.metadata.create_all(self.engine)
+        else:
+            os.makedirs(dump_dir, exist_ok=True)
+
+    def next_id(self, model) -> int:
+        if self.engine is None:
+            return 1
+        with self.engine.connect() as conn:
+            return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def write(self, model, rows: list) -> None:
+        """Escribe `rows` en la tabla de `model` (modelo ORM o db.Table)."""
+        if not rows:
+            return
+        table = getattr(model, "__table__", model)
+        if self.engine is not None:
+            with self.engine.begin() as conn:
+                conn.execute(insert(table), rows)
+            return
+        table = table.name
+        if table not in self._files:
+            fh = open(os.path.join(self.dump_dir, f"{table}.csv"), "w", newline="", encoding="utf-8")
+            writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+            writer.writeheader()
+            self._files[table] = (fh, writer)
+        self._files[table][1].writerows(rows)
+
+    def close(self) -> None:
+        for fh, _ in self._files.values():
+            fh.close()
+        if self.engine is not None:
+            self.engine.dispose()
+
+
+def _sqlite_bulk_pragmas(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+class _Batch:
+    """
+    Acumula filas y las vuelca al Writer cada `batch_size`.
+
+    Si se indica `parent` (la tabla referenciada por clave foránea), esta se
+    vuelca antes, para que las filas hijas nunca lleguen antes que su padre.
+    """
+
+    def __init__(self, writer: Writer, model, parent: "_Batch" = None):
+        self.writer, self.model, self.parent, self.rows, self.total = writer, model, parent, [], 0
+
+    def add(self, row: dict) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.writer.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.parent is not None:
+            self.parent.flush()
+        self.writer.write(self.model, self.rows)
+        self.total += len(self.rows)
+        self.rows = []
+
+
+def generate_users(writer: Writer, count: int, seed: int, password: str) -> tuple:
+    """Inserta usuarios; devuelve (primer_id, nombres de usuario de muestra)."""
+    first_id = writer.next_id(User)
+    hashed = _password_hash(password, seed)  # un solo hash: hashear millones sería prohibitivo
+    batch = _Batch(writer, User)
+    for i in range(count):
+        batch.add({"id": first_id + i, "username": f"user{seed}_{first_id + i}@partyfinder.test", "password": hashed})
+    batch.flush()
+    sample = [f"user{seed}_{first_id + i}@partyfinder.test" for i in range(min(count, 200))]
+    return first_id, sample
+
+
+def generate_genres(writer: Writer) -> dict:
+    """Inserta los géneros que falten; devuelve {nombre: id}."""
+    existing = {}
+    if writer.engine is not None:
+        with writer.engine.connect() as conn:
+            existing = {slug: genre_id for genre_id, slug in conn.execute(select(Genre.id, Genre.slug))}
+    next_id = writer.next_id(Genre)
+    ids, rows = {}, []
+    for name in GENRES:
+        slug = Genre.slug_for(name)
+        if slug not in existing:
+            existing[slug] = next_id
+            rows.append({"id": next_id, "name": name, "slug": slug})
+            next_id += 1
+        ids[name] = existing[slug]
+    writer.write(Genre, rows)
+    return ids
+
+
+def generate_bars(writer: Writer, count: int, seed: int, genre_ids: dict) -> list:
+    """Inserta bares y sus géneros; devuelve [(id, popularidad, capacidad)]."""
+    rng = random.Random(f"{seed}-bars")
+    first_id = writer.next_id(Bar)
+    weights = [c[3] for c in CITIES]
+    bars = []
+    batch = _Batch(writer, Bar)
+    genre_batch = _Batch(writer, bar_genres, parent=batch)
+    for i in range(count):
+        name, lat, lon, _, zones = rng.choices(CITIES, weights=weights)[0]
+        # 70% de los bares se concentran en zonas de rumba; el resto se dispersa por la ciudad
+        if rng.random() < 0.7:
+            lat, lon = rng.choice(zones)
+            spread = 0.006
+        else:
+            spread = 0.04
+        popularity = rng.paretovariate(1.3)
+        capacity = rng.choice([20, 30, 50, 80, 120, 200])
+        min_price = rng.choice([0, 10000, 15000, 20000, 30000, 50000])
+        bar_id = first_id + i
+        bars.append((bar_id, popularity, capacity))
+        batch.add({
+            "id": bar_id,
+            "name": f"{rng.choice(PREFIXES)} {rng.choice(WORDS)} {rng.choice(WORDS)}",
+            "address": f"Calle {rng.randint(1, 170)} #{rng.randint(1, 99)}-{rng.randint(1, 99)}, {name}",
+            "description": " ".join(rng.choices(WORDS + GENRES, k=rng.randint(15, 60))),
+            "image_url": f"https://cdn.partyfinder.com/bars/{bar_id}.jpg",
+            "phone": f"+57 3{rng.randint(100000000, 199999999)}",
+            "opening_time": rng.choice(["20:00", "21:00", "22:00"]),
+            "closing_time": rng.choice(["02:00", "03:00", "04:00"]),
+            "min_price": min_price,
+            "max_price": min_price + rng.choice([20000, 50000, 100000, 200000]),
+            "latitude": round(rng.gauss(lat, spread), 6),
+            "longitude": round(rng.gauss(lon, spread), 6),
+            "rating": round(min(5.0, 3.0 + math.log1p(popularity) * 0.8 + rng.uniform(-0.3, 0.3)), 1),
+            "total_reviews": int(popularity * rng.randint(5, 60)),
+            "is_active": rng.random() > 0.03,
+        })
+        for name in rng.sample(GENRES, k=rng.randint(1, 4)):
+            genre_batch.add({"bar_id": bar_id, "genre_id": genre_ids[name]})
+    genre_batch.flush()
+    return bars
+
+
+def generate_calendar(writer: Writer, bars: list, start: date, days: int, users: tuple, mean_per_slot: float,
+                      seed: int, today: date) -> tuple:
+    """Inserta disponibilidad y reservas para cada bar, día y franja; antes de `today` son pasadas."""
+    rng = random.Random(f"{seed}-calendar")
+    first_user, user_count = users
+    availability_id = writer.next_id(Availability)
+    reservation_id = writer.next_id(Reservation)
+    availabilities = _Batch(writer, Availability)
+    reservations = _Batch(writer, Reservation, parent=availabilities)
+    mean_popularity = sum(p for _, p, _ in bars) / len(bars) if bars else 1.0
+
+    for bar_id, popularity, capacity in bars:
+        slots = TIME_SLOTS[rng.randint(0, 1):rng.randint(3, len(TIME_SLOTS))]
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            factor = WEEKDAY_FACTOR[day.weekday()] * popularity / mean_popularity
+            created = datetime.combine(day - timedelta(days=rng.randint(1, 30)), datetime.min.time())
+            for slot in slots:
+                wanted = min(capacity, _poisson(rng, mean_per_slot * factor))
+                reserved = 0
+                slot_reservations = []
+                for _ in range(wanted):
+                    past = day < today
+                    roll = rng.random()
+                    status = "cancelled" if roll < 0.12 else ("completed" if past else "confirmed")
+                    if status != "cancelled":
+                        reserved += 1
+                    # Usuarios sesgados: una minoría reserva con mucha frecuencia
+                    user_id = first_user + int(user_count * rng.random() ** 2) if user_count else first_user
+                    slot_reservations.append({
+                        "id": reservation_id, "user_id": user_id, "bar_id": bar_id,
+                        "availability_id": availability_id, "full_name": f"Cliente {user_id}",
+                        "phone": f"+57 3{rng.randint(100000000, 199999999)}", "num_people": rng.randint(1, 10),
+                        "reservation_date": day, "reservation_time": slot, "status": status, "notes": None,
+                        "created_at": created, "updated_at": created,
+                    })
+                    reservation_id += 1
+                availabilities.add({
+                    "id": availability_id, "bar_id": bar_id, "date": day, "time_slot": slot,
+                    "total_capacity": capacity, "reserved_count": reserved, "is_available": reserved < capacity,
+                    "created_at": created, "updated_at": created,
+                })
+                for row in slot_reservations:
+                    reservations.add(row)
+                availability_id += 1
+    reservations.flush()
+    return availabilities.total, reservations.total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos de PartyFinder")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db-url", help="URL SQLAlchemy destino (sqlite:///x.db, mysql+pymysql://...)")
+    target.add_argument("--dump-dir", help="directorio donde escribir los CSV")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--bars", type=int, default=2_000)
+    parser.add_argument("--days", type=int, default=365, help="días de calendario a generar")
+    parser.add_argument("--start", help="fecha inicial YYYY-MM-DD (por defecto: --today - days/2)")
+    parser.add_argument("--today", help="fecha de referencia YYYY-MM-DD para pasado/futuro "
+                                        "(por defecto: --start + days/2, o hoy sin --start)")
+    parser.add_argument("--mean-per-slot", type=float, default=2.0, help="reservas medias por franja de un bar medio")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="bench", help="contraseña de todos los usuarios")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--dataset-out", help="JSON para benchmarks.load_test --dataset")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
+    if args.today:
+        today = datetime.strptime(args.today, "%Y-%m-%d").date()
+    else:
+        today = start + timedelta(days=args.days // 2) if start else date.today()
+    if start is None:
+        start = today - timedelta(days=args.days // 2)
+    print(f"calendario: {start} + {args.days} días, referencia --today {today}")
+    writer = Writer(args.db_url, args.dump_dir, args.batch_size)
+    started = time.perf_counter()
+    try:
+        first_user, sample_users = generate_users(writer, args.users, args.seed, args.password)
+        print(f"usuarios: {args.users} ({time.perf_counter() - started:.1f}s)")
+        bars = generate_bars(writer, args.bars, args.seed, generate_genres(writer))
+        print(f"bares: {len(bars)} ({time.perf_counter() - started:.1f}s)")
+        n_avail, n_res = generate_calendar(writer, bars, start, args.days, (first_user, args.users),
+                                           args.mean_per_slot, args.seed, today)
+        print(f"disponibilidades: {n_avail}, reservas: {n_res} ({time.perf_counter() - started:.1f}s)")
+    finally:
+        writer.close()
+
+    if args.dataset_out:
+        future_days = max(1, (start + timedelta(days=args.days) - today).days)
+        with open(args.dataset_out, "w") as fh:
+            json.dump({
+                "usernames": sample_users,
+                "password": args.password,
+                # Ordenados de más a menos popular: load_test concentra el tráfico en los primeros
+                "bar_ids": [bar_id for bar_id, _, _ in sorted(bars, key=lambda b: b[1], reverse=True)],
+                "days": min(future_days, 14),
+                # Fecha de referencia del calendario: load_test reserva y consulta a partir de ella
+                "today": today.isoformat(),
+            }, fh)
+        print(f"dataset para load_test: {args.dataset_out}")
+
+
+if __name__ == "__main__":
+    main()
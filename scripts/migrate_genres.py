@@ -0,0 +1,100 @@
+"""
+Migra los géneros musicales de la columna legada `bars.music_genres` (JSON
+en texto) a la tabla `genres` y la asociación indexada `bar_genres`.
+
+Recorre los bares por lotes de id, crea los géneros que falten (comparados
+por slug: "Reggaeton" y "Reggaetón" son el mismo) y añade solo las
+asociaciones que no existan, así que puede ejecutarse varias veces.
+Usa la base de datos configurada en MYSQL_URL, igual que la app.
+
+Uso:
+    python -m scripts.migrate_genres [--batch-size 1000] [--dry-run] [--clear-legacy]
+
+--clear-legacy deja `music_genres` en NULL en los bares ya migrados.
+"""
+import argparse
+import json
+import logging
+
+from sqlalchemy import select, update
+
+from app import app
+from models.bar import Bar
+from models.db import db
+from models.genre import Genre, bar_genres
+from services.genre_service import GenreService
+
+logger = logging.getLogger(__name__)
+
+
+def _parse(raw: str, bar_id: int) -> list:
+    try:
+        return GenreService.parse_names(raw)
+    except ValueError:
+        logger.warning("music_genres no válido en bar %s: %r", bar_id, raw)
+        return []
+
+
+def migrate(batch_size: int, dry_run: bool, clear_legacy: bool) -> dict:
+    stats = {"bars": 0, "links": 0, "genres_before": 0, "genres_after": 0}
+    last_id = 0
+    with app.app_context():
+        stats["genres_before"] = db.session.query(Genre).count()
+        while True:
+            rows = db.session.execute(
+                select(Bar.id, Bar.music_genres)
+                .where(Bar.id > last_id, Bar.music_genres.is_not(None), Bar.music_genres != "")
+                .order_by(Bar.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            names_by_bar = {bar_id: _parse(raw, bar_id) for bar_id, raw in rows}
+            all_names = [name for names in names_by_bar.values() for name in names]
+            genres = {Genre.slug_for(g.name): g for g in GenreService.resolve(all_names)}
+            db.session.flush()
+
+            existing = set(db.session.execute(
+                select(bar_genres.c.bar_id, bar_genres.c.genre_id)
+                .where(bar_genres.c.bar_id.in_(list(names_by_bar)))
+            ).all())
+            links = set()
+            for bar_id, names in names_by_bar.items():
+                for name in names:
+                    genre = genres.get(Genre.slug_for(name))
+                    if genre is not None and (bar_id, genre.id) not in existing:
+                        links.add((bar_id, genre.id))
+            if links:
+                db.session.execute(bar_genres.insert(), [{"bar_id": b, "genre_id": g} for b, g in sorted(links)])
+            if clear_legacy:
+                db.session.execute(update(Bar).where(Bar.id.in_(list(names_by_bar))).values(music_genres=None))
+
+            stats["bars"] += len(rows)
+            stats["links"] += len(links)
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            logger.info("Migrados %s bares (hasta id %s)", stats["bars"], last_id)
+
+        stats["genres_after"] = db.session.query(Genre).count()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migra music_genres (JSON) a genres/bar_genres")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="no confirmar los cambios")
+    parser.add_argument("--clear-legacy", action="store_true", help="vaciar music_genres tras migrar")
+    args = parser.parse_args()
+
+    stats = migrate(args.batch_size, args.dry_run, args.clear_legacy)
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(f"{prefix}{stats['bars']} bares, {stats['links']} asociaciones nuevas, "
+          f"géneros {stats['genres_before']} -> {stats['genres_after']}")
+
+
+if __name__ == "__main__":
+    main()
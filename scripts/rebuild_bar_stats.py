@@ -0,0 +1,31 @@
+"""
+Recalcula las estadísticas diarias por bar (bar_daily_stats) desde la
+disponibilidad y las reservas, vivas y archivadas.
+
+Para el backfill inicial, tras cargar datos sin pasar por los servicios
+(ej. scripts/generate_dataset.py) o tras corregir datos a mano. Un bar por
+transacción. Usa la base de datos configurada en MYSQL_URL, igual que la app.
+
+Uso:
+    python -m scripts.rebuild_bar_stats [--bar 12 --bar 15]
+"""
+import argparse
+
+from app import app
+from services.bar_stats_service import BarStatsService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula bar_daily_stats")
+    parser.add_argument("--bar", type=int, action="append", dest="bar_ids", help="bar a recalcular (repetible)")
+    args = parser.parse_args()
+
+    with app.app_context():
+        stats = BarStatsService.rebuild(args.bar_ids)
+    if "error" in stats:
+        raise SystemExit(f"Error: {stats['error']}")
+    print(f"{stats['bars']} bares y {stats['days']} días recalculados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Lista las tareas programadas o ejecuta una ya (utils/scheduler.py).
+
+La ejecución usa el mismo lock en la base de datos que el planificador de
+los workers: si la tarea ya está corriendo en otro proceso, no se repite.
+Usa la base de datos configurada en MYSQL_URL, igual que la app.
+
+Uso:
+    python -m scripts.run_job                 # estado de las tareas
+    python -m scripts.run_job maintenance.nightly
+"""
+import argparse
+from datetime import datetime
+
+from app import app
+from utils.scheduler import SCHEDULER_TZ, scheduler
+
+
+def _format(timestamp) -> str:
+    return datetime.fromtimestamp(timestamp, SCHEDULER_TZ).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "-"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tareas programadas")
+    parser.add_argument("job", nargs="?", choices=sorted(scheduler.jobs), help="tarea a ejecutar ahora")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.job is None:
+            for status in scheduler.status():
+                print(f"{status['name']:<32} {status['cron']:<14} última: {_format(status.get('finished_at'))} "
+                      f"{status.get('last_status') or '-'} {status.get('last_error') or ''}")
+            return
+        state = scheduler.run_now(args.job)
+        if state != "claimed":
+            raise SystemExit(f"{args.job} se está ejecutando en {scheduler.status_of(args.job)['owner']}")
+        status = scheduler.status_of(args.job)
+    if status["last_status"] != "ok":
+        raise SystemExit(f"Error: {status['last_error']}")
+    print(f"{args.job}: ok")
+
+
+if __name__ == "__main__":
+    main()
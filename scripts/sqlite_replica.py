@@ -0,0 +1,65 @@
+"""
+Simula una réplica de lectura con dos bases SQLite para probar el
+enrutamiento de utils.replicas en local.
+
+Copia periódicamente la base primaria sobre la réplica con la API de backup
+de SQLite (la copia es consistente y la app ve la réplica actualizada sin
+reabrir conexiones). --lag retrasa cada copia para simular retraso de
+replicación; detener el script deja la réplica congelada y, pasados
+REPLICA_MAX_LAG segundos, la app deja de leer de ella.
+
+Uso:
+    python -m scripts.sqlite_replica primary.db replica.db [--interval 0.5] [--lag 0]
+
+    MYSQL_URL=sqlite:////ruta/primary.db REPLICA_URLS=sqlite:////ruta/replica.db gunicorn app:app
+"""
+import argparse
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def copy(primary: str, replica: str) -> None:
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replica una base SQLite sobre otra periódicamente")
+    parser.add_argument("primary")
+    parser.add_argument("replica")
+    parser.add_argument("--interval", type=float, default=0.5, help="segundos entre copias")
+    parser.add_argument("--lag", type=float, default=0.0, help="retraso añadido antes de cada copia")
+    parser.add_argument("--once", action="store_true", help="copiar una vez y salir")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logger.info("Replicando %s -> %s cada %.1fs (retraso %.1fs)", args.primary, args.replica, args.interval, args.lag)
+    while True:
+        if args.lag:
+            # La copia refleja el primario de hace `lag` segundos (aprox.): se toma ahora y se publica después
+            snapshot = sqlite3.connect(":memory:")
+            source = sqlite3.connect(args.primary)
+            source.backup(snapshot)
+            source.close()
+            time.sleep(args.lag)
+            target = sqlite3.connect(args.replica, timeout=30)
+            snapshot.backup(target)
+            target.close()
+            snapshot.close()
+        else:
+            copy(args.primary, args.replica)
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
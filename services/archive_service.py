@@ -0,0 +1,79 @@
+"""
+Retención del historial: mueve la disponibilidad y las reservas pasadas a
+las tablas de archivo (models.archive).
+
+Las filas con fecha anterior a hoy - ARCHIVE_AFTER_DAYS se copian al
+archivo y se borran de la tabla viva por lotes de ARCHIVE_BATCH ids, cada
+lote en su propia transacción corta (INSERT ... SELECT + DELETE por clave
+primaria), así que no se retienen locks largos sobre las tablas que usan
+las reservas. Primero las reservas y después los slots sin reservas vivas
+que los referencien. Repetirlo es seguro: cada lote es atómico.
+
+Las lecturas solo incluyen el archivo si se pide (`include_archived`).
+"""
+from models.db import db
+from models.archive import AvailabilityArchive, ReservationArchive
+from models.availability import Availability
+from models.reservation import Reservation
+from utils.tracing import traced
+from utils.transactions import transactional
+from sqlalchemy import delete, exists, insert, literal, select
+from datetime import datetime, timedelta
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "1000"))
+
+
+class ArchiveService:
+
+    @staticmethod
+    @traced("service")
+    def archive(after_days: int = None, batch_size: int = None) -> dict:
+        """Archiva las reservas y los slots con fecha anterior a hoy - `after_days`."""
+        after_days = ARCHIVE_AFTER_DAYS if after_days is None else after_days
+        batch_size = batch_size or ARCHIVE_BATCH
+        cutoff = datetime.now().date() - timedelta(days=after_days)
+        stats = {"cutoff": cutoff.isoformat(), "reservations": 0, "availabilities": 0}
+
+        referenced = exists().where(Reservation.availability_id == Availability.id)
+        for key, model, archive_model, condition in (
+                ("reservations", Reservation, ReservationArchive, Reservation.reservation_date < cutoff),
+                ("availabilities", Availability, AvailabilityArchive, (Availability.date < cutoff) & ~referenced)):
+            while True:
+                try:
+                    ids = db.session.execute(
+                        select(model.id).where(condition).order_by(model.id).limit(batch_size)
+                    ).scalars().all()
+                    db.session.rollback()
+                except Exception as e:
+                    logger.error("Error al buscar %s por archivar: %s", key, e)
+                    return {"error": str(e), **stats}
+                if not ids:
+                    break
+                result = ArchiveService._move(model, archive_model, ids)
+                if "error" in result:
+                    return {**result, **stats}
+                stats[key] += len(ids)
+
+        logger.info("Historial archivado: %s", stats)
+        return stats
+
+    @staticmethod
+    @transactional("archive.move")
+    def _move(model, archive_model, ids: list) -> dict:
+        """Copia las filas `ids` de `model` al archivo y las borra, en una transacción."""
+        columns = [column.name for column in model.__table__.columns]
+        source = select(*(model.__table__.c[name] for name in columns),
+                        literal(datetime.utcnow(), db.DateTime).label("archived_at"))
+        db.session.execute(
+            insert(archive_model).from_select(columns + ["archived_at"], source.where(model.id.in_(ids)))
+        )
+        # El historial archivado no interesa al feed de cambios: sin esto cada lote
+        # registraría un "resync" de toda la entidad para todos los clientes
+        db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(skip_change_log=True))
+        db.session.commit()
+        return {"count": len(ids)}
@@ -3,57 +3,68 @@ Servicio para gestionar la disponibilidad de los bares.
 """
 from models.db import db
 from models.availability import Availability
+from models.bar import Bar
+from repositories.read_repository import ReadRepository
+from services.bar_stats_service import BarStatsService
+from utils.tracing import traced
+from utils.transactions import transactional
+from sqlalchemy import func, insert, select
 from datetime import datetime, timedelta
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Días hacia adelante que la tarea programada mantiene con disponibilidad
+AVAILABILITY_HORIZON_DAYS = int(os.getenv("AVAILABILITY_HORIZON_DAYS", "30"))
+AVAILABILITY_HORIZON_BATCH = int(os.getenv("AVAILABILITY_HORIZON_BATCH", "5000"))
+
 class AvailabilityService:
     
     @staticmethod
+    @traced("service")
+    @transactional("availability.upsert")
     def create_or_update_availability(bar_id: int, date: str, time_slot: str, 
                                      total_capacity: int, is_available: bool = True) -> dict:
         """
         Crea o actualiza la disponibilidad para un bar en una fecha/hora específica.
         """
-        try:
-            date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-            
-            # Buscar disponibilidad existente
-            availability = Availability.query.filter_by(
+        date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+        
+        # Buscar disponibilidad existente
+        availability = Availability.query.filter_by(
+            bar_id=bar_id,
+            date=date_obj,
+            time_slot=time_slot
+        ).first()
+        
+        if availability:
+            # Actualizar existente
+            BarStatsService.record(bar_id, date_obj, capacity=total_capacity - availability.total_capacity)
+            availability.total_capacity = total_capacity
+            availability.is_available = is_available
+            availability.updated_at = datetime.utcnow()
+            logger.info("Disponibilidad actualizada: Bar %s, %s, %s", bar_id, date, time_slot)
+        else:
+            # Crear nueva
+            availability = Availability(
                 bar_id=bar_id,
                 date=date_obj,
-                time_slot=time_slot
-            ).first()
-            
-            if availability:
-                # Actualizar existente
-                availability.total_capacity = total_capacity
-                availability.is_available = is_available
-                availability.updated_at = datetime.utcnow()
-                logger.info(f"Disponibilidad actualizada: Bar {bar_id}, {date}, {time_slot}")
-            else:
-                # Crear nueva
-                availability = Availability(
-                    bar_id=bar_id,
-                    date=date_obj,
-                    time_slot=time_slot,
-                    total_capacity=total_capacity,
-                    reserved_count=0,
-                    is_available=is_available
-                )
-                db.session.add(availability)
-                logger.info(f"Disponibilidad creada: Bar {bar_id}, {date}, {time_slot}")
-            
-            db.session.commit()
-            return availability.to_dict()
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error al crear/actualizar disponibilidad: {str(e)}")
-            return {"error": str(e)}
+                time_slot=time_slot,
+                total_capacity=total_capacity,
+                reserved_count=0,
+                is_available=is_available
+            )
+            db.session.add(availability)
+            BarStatsService.record(bar_id, date_obj, slots=1, capacity=total_capacity)
+            logger.info("Disponibilidad creada: Bar %s, %s, %s", bar_id, date, time_slot)
+        
+        db.session.commit()
+        return availability.to_dict()
     
     @staticmethod
+    @traced("service")
+    @transactional("availability.create_weekly")
     def create_weekly_availability(bar_id: int, days: int = 7, time_slots: list = None, 
                                   capacity: int = 20) -> dict:
         """
@@ -65,87 +76,164 @@ class AvailabilityService:
             time_slots: Lista de horarios (ej: ["22:00", "23:00", "00:00"])
             capacity: Capacidad por slot
         """
-        try:
-            if not time_slots:
-                time_slots = ["22:00", "23:00", "00:00", "01:00"]
-            
-            created_count = 0
-            start_date = datetime.now().date()
-            
-            for day in range(days):
-                current_date = start_date + timedelta(days=day)
-                
-                for time_slot in time_slots:
-                    # Verificar si ya existe
-                    exists = Availability.query.filter_by(
-                        bar_id=bar_id,
-                        date=current_date,
-                        time_slot=time_slot
-                    ).first()
-                    
-                    if not exists:
-                        availability = Availability(
-                            bar_id=bar_id,
-                            date=current_date,
-                            time_slot=time_slot,
-                            total_capacity=capacity,
-                            reserved_count=0,
-                            is_available=True
-                        )
-                        db.session.add(availability)
-                        created_count += 1
-            
-            db.session.commit()
-            logger.info(f"Creadas {created_count} disponibilidades para bar {bar_id}")
-            return {"message": f"Creadas {created_count} disponibilidades", "count": created_count}
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error al crear disponibilidad semanal: {str(e)}")
-            return {"error": str(e)}
+        if not time_slots:
+            time_slots = ["22:00", "23:00", "00:00", "01:00"]
+        
+        start_date = datetime.now().date()
+        end_date = start_date + timedelta(days=days - 1)
+        
+        # Slots ya existentes en el rango, en una sola consulta
+        existing = set(
+            db.session.query(Availability.date, Availability.time_slot).filter(
+                Availability.bar_id == bar_id,
+                Availability.date >= start_date,
+                Availability.date <= end_date
+            )
+        )
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                "bar_id": bar_id,
+                "date": current_date,
+                "time_slot": time_slot,
+                "total_capacity": capacity,
+                "reserved_count": 0,
+                "is_available": True,
+                "created_at": now,
+                "updated_at": now
+            }
+            for current_date in (start_date + timedelta(days=day) for day in range(days))
+            for time_slot in time_slots
+            if (current_date, time_slot) not in existing
+        ]
+        
+        # Inserción masiva (executemany) en lugar de un INSERT por slot
+        if rows:
+            db.session.execute(insert(Availability), rows)
+            BarStatsService.record_slots(rows)
+        created_count = len(rows)
+        
+        db.session.commit()
+        logger.info("Creadas %s disponibilidades para bar %s", created_count, bar_id)
+        return {"message": f"Creadas {created_count} disponibilidades", "count": created_count}
     
     @staticmethod
-    def get_bar_availability(bar_id: int, start_date: str = None, end_date: str = None) -> list:
+    @traced("service")
+    def get_bar_availability(bar_id: int, start_date: str = None, end_date: str = None,
+                             include_archived: bool = False) -> list:
         """
-        Obtiene la disponibilidad de un bar en un rango de fechas.
+        Obtiene la disponibilidad de un bar en un rango de fechas
+        (con include_archived, también los slots pasados ya archivados).
         """
         try:
-            query = Availability.query.filter_by(bar_id=bar_id)
+            start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
             
-            if start_date:
-                start = datetime.strptime(start_date, '%Y-%m-%d').date()
-                query = query.filter(Availability.date >= start)
-            
-            if end_date:
-                end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                query = query.filter(Availability.date <= end)
-            
-            availabilities = query.order_by(Availability.date, Availability.time_slot).all()
+            availabilities = ReadRepository.bar_availability(db.session, bar_id, start, end, archived=include_archived)
             return [a.to_dict() for a in availabilities]
             
         except Exception as e:
-            logger.error(f"Error al obtener disponibilidad: {str(e)}")
+            logger.error("Error al obtener disponibilidad: %s", e)
             return []
     
     @staticmethod
+    @traced("service")
+    @transactional("availability.delete")
     def delete_availability(availability_id: int) -> dict:
         """Elimina una disponibilidad (solo si no tiene reservas)."""
+        availability = Availability.query.get(availability_id)
+        
+        if not availability:
+            return {"error": "Disponibilidad no encontrada"}
+        
+        if availability.reserved_count > 0:
+            return {"error": "No se puede eliminar: tiene reservas activas"}
+        
+        BarStatsService.record(availability.bar_id, availability.date, slots=-1, capacity=-availability.total_capacity)
+        db.session.delete(availability)
+        db.session.commit()
+        
+        logger.info("Disponibilidad eliminada: %s", availability_id)
+        return {"message": "Disponibilidad eliminada exitosamente"}
+
+    @staticmethod
+    @traced("service")
+    def extend_horizon(days: int = None, batch_size: int = None) -> dict:
+        """
+        Extiende la disponibilidad de los bares activos hasta hoy + `days`.
+
+        Cada bar repite la plantilla de su último día con slots (horarios y
+        capacidad) en los días posteriores a ese último día; no se rellenan
+        huecos anteriores (días que el dueño eliminó a propósito). Los bares
+        sin ninguna disponibilidad no se tocan. Inserta por lotes, con un
+        commit por lote; repetirla no duplica nada.
+        """
+        days = AVAILABILITY_HORIZON_DAYS if days is None else days
+        batch_size = batch_size or AVAILABILITY_HORIZON_BATCH
+        today = datetime.now().date()
+        horizon = today + timedelta(days=days - 1)
         try:
-            availability = Availability.query.get(availability_id)
-            
-            if not availability:
-                return {"error": "Disponibilidad no encontrada"}
-            
-            if availability.reserved_count > 0:
-                return {"error": "No se puede eliminar: tiene reservas activas"}
-            
-            db.session.delete(availability)
-            db.session.commit()
-            
-            logger.info(f"Disponibilidad eliminada: {availability_id}")
-            return {"message": "Disponibilidad eliminada exitosamente"}
-            
-        except Exception as e:
+            latest = (
+                select(Availability.bar_id, func.max(Availability.date).label("date"))
+                .join(Bar, Bar.id == Availability.bar_id)
+                .where(Bar.is_active.is_(True))
+                .group_by(Availability.bar_id)
+                .having(func.max(Availability.date) < horizon)
+                .subquery()
+            )
+            templates = db.session.execute(
+                select(Availability.bar_id, Availability.date, Availability.time_slot, Availability.total_capacity)
+                .join(latest, (latest.c.bar_id == Availability.bar_id) & (latest.c.date == Availability.date))
+                .order_by(Availability.bar_id, Availability.time_slot)
+            ).all()
             db.session.rollback()
-            logger.error(f"Error al eliminar disponibilidad: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+        except Exception as e:
+            logger.error("Error al leer las plantillas de disponibilidad: %s", e)
+            return {"error": str(e)}
+
+        by_bar = {}
+        for row in templates:
+            by_bar.setdefault((row.bar_id, row.date), []).append(row)
+
+        now = datetime.utcnow()
+        created = 0
+        batch = []
+        for (bar_id, latest_date), slots in by_bar.items():
+            first = max(latest_date + timedelta(days=1), today)
+            for offset in range((horizon - first).days + 1):
+                current_date = first + timedelta(days=offset)
+                batch.extend({
+                    "bar_id": bar_id,
+                    "date": current_date,
+                    "time_slot": slot.time_slot,
+                    "total_capacity": slot.total_capacity,
+                    "reserved_count": 0,
+                    "is_available": True,
+                    "created_at": now,
+                    "updated_at": now
+                } for slot in slots)
+                # Los lotes solo se cortan entre días completos: si el proceso muere a
+                # mitad, el último día insertado sigue siendo una plantilla válida
+                if len(batch) >= batch_size:
+                    result = AvailabilityService._insert_batch(batch)
+                    if "error" in result:
+                        return result
+                    created += len(batch)
+                    batch = []
+        if batch:
+            result = AvailabilityService._insert_batch(batch)
+            if "error" in result:
+                return result
+            created += len(batch)
+
+        logger.info("Horizonte de disponibilidad hasta %s: %s slots creados en %s bares", horizon, created, len(by_bar))
+        return {"horizon": horizon.isoformat(), "bars": len(by_bar), "count": created}
+
+    @staticmethod
+    @transactional("availability.extend_horizon")
+    def _insert_batch(rows: list) -> dict:
+        db.session.execute(insert(Availability), rows)
+        BarStatsService.record_slots(rows)
+        db.session.commit()
+        return {"count": len(rows)}
@@ -0,0 +1,184 @@
+"""
+Stream de disponibilidad en vivo (Server-Sent Events).
+
+En lugar de que la app consulte GET /availability/bar/<id> cada pocos
+segundos, abre un stream por bar (o conjunto de bares) y recibe cada slot
+cuando cambia su capacidad.
+
+Por worker:
+    - un broker en memoria (utils.event_broker) reparte cada evento, ya
+      serializado, entre los streams suscritos a ese bar;
+    - un único hilo sondea la base de datos (slots con updated_at reciente de
+      los bares con suscriptores, índice en availabilities.updated_at), así
+      que el costo en la base de datos no depende del número de clientes y
+      recoge también los cambios hechos por otros workers y hosts. Los
+      commits de este proceso (reservas, cancelaciones, cambios de
+      capacidad) despiertan al sondeo en el momento vía utils.change_events.
+      Solo corre mientras hay streams abiertos.
+
+Cada sondeo relee una ventana de SSE_POLL_OVERLAP segundos hacia atrás para
+no perder commits lentos, desfase de relojes ni la precisión de segundos de
+DATETIME en MySQL; los slots ya enviados con el mismo estado no se repiten.
+
+El stream no usa la base de datos: la foto inicial se carga en la petición y
+la conexión se libera antes de empezar a emitir. Pero con workers gthread
+cada stream ocupa un hilo del worker hasta SSE_MAX_DURATION: por encima de
+SSE_MAX_STREAMS streams abiertos en el worker los nuevos se rechazan (503
+con Retry-After) para que queden hilos para el resto de peticiones.
+gunicorn.conf.py lo fija en la mitad de los hilos, o mucho más con gevent.
+"""
+from models.db import db
+from models.availability import Availability
+from repositories.read_repository import ReadRepository
+from utils import change_events
+from utils.event_broker import EventBroker
+from utils.metrics import SSE_EVENTS, SSE_STREAMS
+from utils.replicas import use_primary
+from flask import current_app
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SSE_POLL_INTERVAL = float(os.getenv("SSE_POLL_INTERVAL", "1.0"))
+SSE_POLL_OVERLAP = float(os.getenv("SSE_POLL_OVERLAP", "5"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+# Al cumplirse, el stream se cierra y el cliente se reconecta (EventSource lo hace solo)
+SSE_MAX_DURATION = float(os.getenv("SSE_MAX_DURATION", "600"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+SSE_MAX_QUEUE = int(os.getenv("SSE_MAX_QUEUE", "256"))
+SSE_MAX_BARS = int(os.getenv("SSE_MAX_BARS", "50"))
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "16"))
+# Con más bares suscritos que esto, el sondeo no filtra por bar_id
+_POLL_FILTER_MAX_BARS = 500
+
+_broker = EventBroker(SSE_MAX_QUEUE)
+_open_lock = threading.Lock()
+
+
+def _frame(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class _Poller:
+    """Hilo de sondeo del worker; arranca con el primer stream y termina cuando no queda ninguno."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_started = None
+        self._sent = {}  # id de slot -> (estado enviado, updated_at)
+
+    def ensure_running(self, app) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._last_started = datetime.utcnow()
+                self._thread = threading.Thread(target=self._run, args=(app,), name="availability-poller",
+                                                 daemon=True)
+                self._thread.start()
+
+    def wake(self, changes=None) -> None:
+        self._wake.set()
+
+    def _run(self, app) -> None:
+        logger.info("Sondeo de disponibilidad iniciado")
+        with app.app_context():
+            while True:
+                with self._lock:
+                    bar_ids = _broker.topics()
+                    if not bar_ids:
+                        self._thread = None
+                        self._sent.clear()
+                        logger.info("Sondeo de disponibilidad detenido: sin streams")
+                        return
+                try:
+                    self._poll(bar_ids)
+                except Exception as e:
+                    logger.error("Error sondeando la disponibilidad: %s", e)
+                finally:
+                    db.session.remove()
+                self._wake.wait(SSE_POLL_INTERVAL)
+                self._wake.clear()
+
+    def _poll(self, bar_ids: list) -> None:
+        started = datetime.utcnow()
+        since = self._last_started - timedelta(seconds=SSE_POLL_OVERLAP)
+        rows = ReadRepository.availability_changes(
+            db.session, since, bar_ids if len(bar_ids) <= _POLL_FILTER_MAX_BARS else None)
+        db.session.remove()  # no retener la conexión entre sondeos
+        self._last_started = started
+        for row in rows:
+            state = (row.total_capacity, row.reserved_count, row.is_available)
+            previous = self._sent.get(row.id)
+            if previous is not None and previous[0] == state:
+                continue
+            self._sent[row.id] = (state, row.updated_at)
+            delivered, dropped = _broker.publish(row.bar_id, _frame("availability", row.to_dict()))
+            if delivered:
+                SSE_EVENTS.inc(delivered, stream="availability", result="delivered")
+            if dropped:
+                SSE_EVENTS.inc(dropped, stream="availability", result="dropped")
+        # Lo que sale de la ventana ya no puede volver a leerse con el mismo updated_at
+        self._sent = {k: v for k, v in self._sent.items() if v[1] is None or v[1] >= since}
+
+
+_poller = _Poller()
+change_events.subscribe(Availability, _poller.wake)
+
+
+class AvailabilityStreamService:
+
+    @staticmethod
+    def open(bar_ids: list):
+        """
+        Suscribe a los bares y devuelve el generador del stream, o None si el
+        worker ya tiene SSE_MAX_STREAMS streams abiertos. La suscripción se hace
+        antes de leer la foto inicial para no perder cambios intermedios.
+        """
+        with _open_lock:
+            if _broker.subscriber_count() >= SSE_MAX_STREAMS:
+                SSE_STREAMS.inc(stream="availability", event="rejected")
+                return None
+            subscription = _broker.subscribe(bar_ids)
+        try:
+            _poller.ensure_running(current_app._get_current_object())
+            # Del primario: el sondeo lee del primario y solo relee una ventana corta hacia atrás
+            with use_primary():
+                rows = ReadRepository.bars_availability(db.session, bar_ids, start=datetime.utcnow().date())
+        except Exception:
+            _broker.unsubscribe(subscription)
+            raise
+        by_bar = {bar_id: [] for bar_id in bar_ids}
+        for row in rows:
+            by_bar[row.bar_id].append(row.to_dict())
+        snapshot = [_frame("snapshot", {"bar_id": bar_id, "availability": slots}) for bar_id, slots in by_bar.items()]
+        SSE_STREAMS.inc(stream="availability", event="opened")
+        return AvailabilityStreamService._stream(subscription, snapshot)
+
+    @staticmethod
+    def _stream(subscription, snapshot: list):
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n" + "".join(snapshot)
+            deadline = time.monotonic() + SSE_MAX_DURATION
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                events = subscription.wait(min(SSE_HEARTBEAT, remaining))
+                if subscription.overflowed:
+                    # Cliente demasiado lento: que se reconecte y reciba una foto nueva
+                    yield _frame("resync", {})
+                    return
+                yield "".join(events) if events else ": ping\n\n"
+        finally:
+            _broker.unsubscribe(subscription)
+            SSE_STREAMS.inc(stream="availability", event="closed")
+
+    @staticmethod
+    def subscriber_count() -> int:
+        return _broker.subscriber_count()
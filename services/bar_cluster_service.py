@@ -0,0 +1,96 @@
+"""
+Servicio de agrupación de bares para el mapa.
+
+Mantiene por proceso una grilla jerárquica (utils.geo_grid) con los bares
+activos geolocalizados, gestionada por un IncrementalView igual que el índice
+de búsqueda: se construye en el primer uso, los cambios de bares de este
+proceso se aplican en la siguiente consulta y se reconstruye en segundo plano
+cada CLUSTERS_MAX_AGE segundos. Una consulta solo recorre las celdas del
+nivel pedido dentro del rectángulo visible, sin tocar la base de datos.
+"""
+from models.bar import Bar
+from utils.geo_grid import MAX_LEVEL, MIN_LEVEL, ClusterGrid
+from utils.incremental_view import IncrementalView
+from utils.tracing import traced
+from sqlalchemy import select
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CLUSTERS_MAX_AGE = float(os.getenv("CLUSTERS_MAX_AGE", "300"))
+# Nivel de la grilla = zoom del mapa + CLUSTER_LEVEL_OFFSET: con 3, una tesela de
+# 256 px se divide en 8x8 celdas de 32 px
+CLUSTER_LEVEL_OFFSET = int(os.getenv("CLUSTER_LEVEL_OFFSET", "3"))
+MAX_ZOOM = 22
+
+
+def _rows(session, ids=None):
+    stmt = select(Bar.id, Bar.name, Bar.latitude, Bar.longitude, Bar.rating, Bar.total_reviews, Bar.is_active)
+    if ids is None:
+        stmt = stmt.where(Bar.is_active.is_(True), Bar.latitude.is_not(None), Bar.longitude.is_not(None))
+    else:
+        stmt = stmt.where(Bar.id.in_(ids))
+    return session.connection().execute(stmt)
+
+
+def _upsert(grid: ClusterGrid, row) -> bool:
+    if not row.is_active or row.latitude is None or row.longitude is None:
+        return False
+    # Representativo: mejor calificación; a igual calificación, más reseñas
+    score = (row.rating or 0.0) * 1e6 + (row.total_reviews or 0)
+    grid.upsert(row.id, row.latitude, row.longitude, score, row.name)
+    return True
+
+
+def _build(session) -> ClusterGrid:
+    grid = ClusterGrid()
+    for row in _rows(session):
+        _upsert(grid, row)
+    logger.info("Grilla de clusters: %s bares", len(grid))
+    return grid
+
+
+def _apply(grid: ClusterGrid, session, bar_ids: set) -> None:
+    missing = set(bar_ids)
+    for row in _rows(session, list(bar_ids)):
+        missing.discard(row.id)
+        if not _upsert(grid, row):
+            grid.remove(row.id)
+    for bar_id in missing:  # ya no existen
+        grid.remove(bar_id)
+
+
+_view = IncrementalView("grilla de clusters", Bar, _build, _apply, CLUSTERS_MAX_AGE)
+
+
+class BarClusterService:
+
+    @staticmethod
+    def level_for_zoom(zoom: int) -> int:
+        return max(MIN_LEVEL, min(MAX_LEVEL, zoom + CLUSTER_LEVEL_OFFSET))
+
+    @staticmethod
+    @traced("service")
+    def clusters(west: float, south: float, east: float, north: float, zoom: int) -> dict:
+        """
+        Clusters de bares dentro del rectángulo para el zoom dado. Un rectángulo
+        que cruza el antimeridiano (west > east) se consulta en dos partes.
+        """
+        grid = _view.get()
+        level = BarClusterService.level_for_zoom(zoom)
+        if west <= east:
+            cells = grid.clusters(level, west, south, east, north)
+        else:
+            cells = grid.clusters(level, west, south, 180.0, north) + grid.clusters(level, -180.0, south, east, north)
+        cells.sort(key=lambda cell: -cell[0])
+        return {
+            'zoom': zoom,
+            'total': sum(cell[0] for cell in cells),
+            'clusters': [{
+                'count': count,
+                'latitude': round(lat, 6),
+                'longitude': round(lon, 6),
+                'bar': {'id': bar_id, 'name': name},
+            } for count, lat, lon, bar_id, name in cells],
+        }
@@ -0,0 +1,72 @@
+"""
+Servicio de búsqueda de texto sobre nombre, dirección y descripción de los bares.
+
+Usa un índice invertido en memoria por proceso (utils.search_index) mantenido
+por un IncrementalView: se construye en la primera búsqueda, los cambios de
+bares de este proceso se reindexan en la siguiente búsqueda y se reconstruye
+en segundo plano cada SEARCH_INDEX_MAX_AGE segundos o cuando el delta supera
+SEARCH_DELTA_MAX documentos.
+"""
+from models.db import db
+from models.bar import Bar
+from repositories.read_repository import ReadRepository
+from utils.incremental_view import IncrementalView
+from utils.search_index import InvertedIndex, Segment
+from utils.tracing import traced
+from sqlalchemy import select
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada campo en la relevancia
+FIELD_WEIGHTS = {"name": 3, "address": 2, "description": 1}
+SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+SEARCH_DELTA_MAX = int(os.getenv("SEARCH_DELTA_MAX", "5000"))
+
+
+def _documents(session, ids=None):
+    stmt = select(Bar.id, Bar.name, Bar.address, Bar.description, Bar.is_active)
+    if ids is None:
+        stmt = stmt.where(Bar.is_active.is_(True)).order_by(Bar.id)
+    else:
+        stmt = stmt.where(Bar.id.in_(ids))
+    for bar_id, name, address, description, is_active in session.connection().execute(stmt):
+        yield bar_id, ({"name": name, "address": address, "description": description} if is_active else None)
+
+
+def _build(session) -> InvertedIndex:
+    index = InvertedIndex(Segment(_documents(session), FIELD_WEIGHTS), FIELD_WEIGHTS)
+    logger.info("Índice de búsqueda: %s bares, %s términos", index.segment.doc_count, len(index.segment.vocabulary))
+    return index
+
+
+def _apply(index: InvertedIndex, session, bar_ids: set) -> None:
+    missing = set(bar_ids)
+    for bar_id, fields in _documents(session, list(bar_ids)):
+        index.update(bar_id, fields)
+        missing.discard(bar_id)
+    for bar_id in missing:  # ya no existen
+        index.update(bar_id, None)
+
+
+_view = IncrementalView("índice de búsqueda", Bar, _build, _apply, SEARCH_INDEX_MAX_AGE,
+                        needs_rebuild=lambda index: index.delta_size > SEARCH_DELTA_MAX)
+
+
+class BarSearchService:
+
+    @staticmethod
+    def index() -> InvertedIndex:
+        """Índice vigente, con los cambios pendientes aplicados."""
+        return _view.get()
+
+    @staticmethod
+    @traced("service")
+    def search(query: str, limit: int = 20, fields: tuple = None) -> list:
+        """Bares activos que contienen todos los términos (como prefijo), por relevancia."""
+        hits = BarSearchService.index().search(query, limit)
+        if not hits:
+            return []
+        rows = {row.id: row for row in ReadRepository.bars_by_ids(db.session, [doc for doc, _ in hits], fields)}
+        return [rows[doc].to_dict() for doc, _ in hits if doc in rows]
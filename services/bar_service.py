@@ -0,0 +1,65 @@
+"""
+Servicio para crear y actualizar bares.
+"""
+from models.db import db
+from models.bar import Bar
+from services.genre_service import GenreService
+from utils.tracing import traced
+from utils.transactions import transactional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campos que se pueden actualizar directamente desde la API
+UPDATABLE_FIELDS = ['name', 'address', 'description', 'image_url', 'phone',
+                    'opening_time', 'closing_time', 'min_price', 'max_price',
+                    'latitude', 'longitude', 'is_active']
+
+
+class BarService:
+
+    @staticmethod
+    @traced("service")
+    @transactional("bar.create")
+    def create_bar(data: dict, genre_names: list) -> dict:
+        """Crea un bar con sus géneros (los que no existan se crean)."""
+        bar = Bar(
+            name=data['name'],
+            address=data['address'],
+            description=data.get('description'),
+            image_url=data.get('image_url'),
+            phone=data.get('phone'),
+            opening_time=data.get('opening_time'),
+            closing_time=data.get('closing_time'),
+            min_price=data.get('min_price'),
+            max_price=data.get('max_price'),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
+            genres=GenreService.resolve(genre_names)
+        )
+        
+        db.session.add(bar)
+        db.session.commit()
+        
+        logger.info("Bar creado: %s (ID: %s)", bar.name, bar.id)
+        return bar.to_dict()
+
+    @staticmethod
+    @traced("service")
+    @transactional("bar.update")
+    def update_bar(bar_id: int, data: dict, genre_names: list = None) -> dict:
+        """Actualiza los campos presentes en `data`; los géneros solo si `genre_names` no es None."""
+        bar = Bar.query.get(bar_id)
+        if not bar:
+            return {"error": "Bar no encontrado"}
+        
+        for field in UPDATABLE_FIELDS:
+            if field in data:
+                setattr(bar, field, data[field])
+        
+        if genre_names is not None:
+            bar.genres = GenreService.resolve(genre_names)
+        
+        db.session.commit()
+        logger.info("Bar actualizado: %s", bar.name)
+        return bar.to_dict()
@@ -0,0 +1,198 @@
+"""
+Estadísticas de ocupación y reservas por bar (GET /bars/<id>/stats).
+
+`bar_daily_stats` guarda una fila por bar y fecha con contadores que se
+incrementan (`record`) dentro de las transacciones que los cambian:
+crear o cancelar una reserva y crear, cambiar o eliminar disponibilidad.
+El incremento es un upsert atómico (INSERT ... ON CONFLICT / ON DUPLICATE
+KEY UPDATE contador = contador + delta), así que las escrituras
+concurrentes sobre el mismo día no se pisan y una transacción reintentada
+por @transactional no cuenta dos veces (el rollback deshace el incremento).
+
+Las consultas leen solo los días pedidos por clave primaria: el costo no
+depende del tamaño del historial. `rebuild` (scripts/rebuild_bar_stats.py)
+recalcula las filas desde las reservas y la disponibilidad, vivas y
+archivadas, para el backfill inicial o tras una corrección.
+"""
+from models.db import db
+from models.archive import AvailabilityArchive, ReservationArchive
+from models.availability import Availability
+from models.bar import Bar
+from models.bar_daily_stats import BarDailyStats
+from models.reservation import Reservation
+from utils.tracing import traced
+from utils.transactions import transactional
+from sqlalchemy import case, delete, func, insert, select, union_all, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from datetime import datetime, timedelta
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+STATS_DEFAULT_DAYS = int(os.getenv("STATS_DEFAULT_DAYS", "30"))
+STATS_MAX_DAYS = int(os.getenv("STATS_MAX_DAYS", "366"))
+
+COUNTERS = ("slots", "capacity", "bookings", "cancellations", "reserved", "people")
+
+
+def _upsert_statement(dialect: str):
+    """INSERT que, si la fila (bar_id, date) ya existe, suma los contadores."""
+    table = BarDailyStats.__table__
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(
+            updated_at=stmt.inserted.updated_at,
+            **{name: table.c[name] + stmt.inserted[name] for name in COUNTERS})
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.bar_id, table.c.date],
+            set_={"updated_at": stmt.excluded.updated_at,
+                  **{name: table.c[name] + stmt.excluded[name] for name in COUNTERS}})
+    return None
+
+
+class BarStatsService:
+
+    @staticmethod
+    def record(bar_id: int, date, **deltas) -> None:
+        """Suma `deltas` (contadores de COUNTERS) al día `date` del bar, en la transacción en curso."""
+        BarStatsService.record_many({(bar_id, date): deltas})
+
+    @staticmethod
+    def record_many(changes: dict) -> None:
+        """Como `record` para varios días: {(bar_id, date): {contador: delta}}, en una sola sentencia."""
+        now = datetime.utcnow()
+        rows = [dict({name: deltas.get(name, 0) for name in COUNTERS}, bar_id=bar_id, date=date, updated_at=now)
+                for (bar_id, date), deltas in changes.items() if any(deltas.values())]
+        if not rows:
+            return
+        stmt = _upsert_statement(db.engine.dialect.name)
+        if stmt is not None:
+            db.session.execute(stmt, rows)
+            return
+        # Otros motores: UPDATE y, si no existía la fila, INSERT
+        table = BarDailyStats.__table__
+        for row in rows:
+            updated = db.session.execute(
+                update(table).where(table.c.bar_id == row["bar_id"], table.c.date == row["date"])
+                .values(updated_at=now, **{name: table.c[name] + row[name] for name in COUNTERS})
+            ).rowcount
+            if not updated:
+                db.session.execute(insert(table), [row])
+
+    @staticmethod
+    def record_slots(rows: list) -> None:
+        """Registra slots de disponibilidad nuevos (dicts con bar_id, date y total_capacity)."""
+        changes = {}
+        for row in rows:
+            deltas = changes.setdefault((row["bar_id"], row["date"]), {"slots": 0, "capacity": 0})
+            deltas["slots"] += 1
+            deltas["capacity"] += row["total_capacity"]
+        BarStatsService.record_many(changes)
+
+    @staticmethod
+    @traced("service")
+    def get_stats(bar_id: int, start_date: str = None, end_date: str = None) -> dict:
+        """
+        Estadísticas de un bar entre dos fechas (por defecto los últimos
+        STATS_DEFAULT_DAYS días): una entrada por día con datos y los totales
+        con la tasa de ocupación, reservas por noche y tasa de cancelación.
+        """
+        try:
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+            start = (datetime.strptime(start_date, '%Y-%m-%d').date() if start_date
+                     else end - timedelta(days=STATS_DEFAULT_DAYS - 1))
+        except ValueError:
+            return {"error": "Formato de fecha inválido. Use YYYY-MM-DD"}
+        if start > end:
+            return {"error": "start_date debe ser anterior o igual a end_date"}
+        if (end - start).days + 1 > STATS_MAX_DAYS:
+            return {"error": f"El rango no puede superar {STATS_MAX_DAYS} días"}
+
+        try:
+            rows = db.session.execute(
+                select(BarDailyStats)
+                .where(BarDailyStats.bar_id == bar_id, BarDailyStats.date >= start, BarDailyStats.date <= end)
+                .order_by(BarDailyStats.date)
+            ).scalars().all()
+        except Exception as e:
+            logger.error("Error al obtener estadísticas del bar %s: %s", bar_id, e)
+            return {"error": str(e)}
+
+        totals = {name: sum(getattr(row, name) for row in rows) for name in COUNTERS}
+        nights = sum(1 for row in rows if row.slots)
+        totals.update({
+            "nights": nights,
+            "occupancy_rate": round(totals["reserved"] / totals["capacity"], 4) if totals["capacity"] else None,
+            "bookings_per_night": round(totals["bookings"] / nights, 2) if nights else None,
+            "cancellation_rate": (round(totals["cancellations"] / totals["bookings"], 4)
+                                  if totals["bookings"] else None),
+        })
+        return {
+            "bar_id": bar_id,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "totals": totals,
+            "days": [row.to_dict() for row in rows],
+        }
+
+    @staticmethod
+    @traced("service")
+    def rebuild(bar_ids: list = None) -> dict:
+        """
+        Recalcula las estadísticas de `bar_ids` (todos los bares si es None)
+        desde la disponibilidad y las reservas, vivas y archivadas. Un bar por
+        transacción; los incrementos concurrentes de ese bar durante su
+        recálculo pueden perderse, así que conviene ejecutarlo con poco tráfico.
+        """
+        if bar_ids is None:
+            bar_ids = db.session.execute(select(Bar.id).order_by(Bar.id)).scalars().all()
+            db.session.rollback()
+        stats = {"bars": 0, "days": 0}
+        for bar_id in bar_ids:
+            result = BarStatsService._rebuild_bar(bar_id)
+            if "error" in result:
+                return {**result, **stats}
+            stats["bars"] += 1
+            stats["days"] += result["days"]
+        logger.info("Estadísticas recalculadas: %s", stats)
+        return stats
+
+    @staticmethod
+    @transactional("stats.rebuild")
+    def _rebuild_bar(bar_id: int) -> dict:
+        slots = union_all(*(
+            select(model.date.label("date"), model.total_capacity.label("capacity")).where(model.bar_id == bar_id)
+            for model in (Availability, AvailabilityArchive)
+        )).subquery()
+        reservations = union_all(*(
+            select(model.reservation_date.label("date"), model.status.label("status"),
+                   model.num_people.label("num_people")).where(model.bar_id == bar_id)
+            for model in (Reservation, ReservationArchive)
+        )).subquery()
+        cancelled = reservations.c.status == 'cancelled'
+
+        days = {}
+        for row in db.session.execute(
+                select(slots.c.date, func.count(), func.sum(slots.c.capacity)).group_by(slots.c.date)):
+            days[row[0]] = {"slots": row[1], "capacity": row[2] or 0}
+        for row in db.session.execute(
+                select(reservations.c.date, func.count(),
+                       func.sum(case((cancelled, 1), else_=0)),
+                       func.sum(case((cancelled, 0), else_=reservations.c.num_people)))
+                .group_by(reservations.c.date)):
+            day = days.setdefault(row[0], {"slots": 0, "capacity": 0})
+            day.update(bookings=row[1], cancellations=row[2] or 0, reserved=row[1] - (row[2] or 0),
+                       people=row[3] or 0)
+
+        db.session.execute(delete(BarDailyStats).where(BarDailyStats.bar_id == bar_id))
+        now = datetime.utcnow()
+        if days:
+            db.session.execute(insert(BarDailyStats), [
+                dict({name: counters.get(name, 0) for name in COUNTERS}, bar_id=bar_id, date=date, updated_at=now)
+                for date, counters in days.items()
+            ])
+        db.session.commit()
+        return {"days": len(days)}
@@ -0,0 +1,172 @@
+"""
+Feed incremental de cambios de bares y disponibilidad (GET /changes).
+
+Los cambios se registran en `change_log` en la misma transacción que los
+modifica (utils.change_log). Un cliente descarga el catálogo una vez,
+guarda el cursor y después solo pide lo cambiado desde ese cursor; cada
+entrada trae el estado actual de la entidad, así que aplicar una entrada
+dos veces o fuera de orden es inofensivo.
+
+Los ids autoincrementales no se hacen visibles en orden de commit: el feed
+no entrega entradas de los últimos CHANGES_SETTLE_SECONDS segundos ni
+ninguna posterior a la primera de ellas, para que un commit algo más lento
+no quede detrás del cursor de un cliente.
+
+Compactación (`compact`, vía scripts/compact_change_log.py):
+    - por entidad solo se conserva la entrada más reciente;
+    - las entradas con más de CHANGES_RETENTION_DAYS días se eliminan y el
+      horizonte avanza: un cursor anterior recibe 410 y debe resincronizar.
+"""
+from models.db import db
+from models.availability import Availability
+from models.bar import Bar
+from models.change_log import ChangeLog, ChangeLogHorizon
+from repositories.read_repository import ReadRepository
+from utils import change_log
+from utils.tracing import traced
+from sqlalchemy import and_, delete, exists, func, or_, select
+from sqlalchemy.orm import aliased
+from datetime import datetime, timedelta
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "1"))
+CHANGES_RETENTION_DAYS = int(os.getenv("CHANGES_RETENTION_DAYS", "30"))
+CHANGES_COMPACT_BATCH = int(os.getenv("CHANGES_COMPACT_BATCH", "5000"))
+CHANGES_MAX_LIMIT = 1000
+
+change_log.track(Bar, "bar", lambda bar: bar.id)
+change_log.track(Availability, "availability", lambda availability: availability.bar_id)
+
+
+class CursorExpired(Exception):
+    """El cursor es anterior al horizonte de retención."""
+
+
+def _unsettled(since: int):
+    """Primer id aún en la ventana de asentamiento (None si no hay)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    return (select(func.min(ChangeLog.id))
+            .where(ChangeLog.id > since, ChangeLog.created_at > cutoff)
+            .scalar_subquery())
+
+
+class ChangeFeedService:
+
+    @staticmethod
+    @traced("service")
+    def current_cursor() -> int:
+        """Cursor desde el que sincronizar tras una descarga completa (pedirlo antes de descargar)."""
+        unsettled = _unsettled(0)
+        stmt = select(func.coalesce(
+            unsettled - 1,
+            select(func.max(ChangeLog.id)).scalar_subquery(),
+            select(ChangeLogHorizon.cursor).where(ChangeLogHorizon.id == 1).scalar_subquery(),
+            0,
+        ))
+        return int(db.session.execute(stmt).scalar())
+
+    @staticmethod
+    @traced("service")
+    def changes(since: int, limit: int = 500) -> dict:
+        """
+        Cambios con cursor > since (como máximo `limit` entradas del log,
+        sin repetir entidad). Lanza CursorExpired si since es anterior al horizonte.
+        """
+        horizon = db.session.execute(
+            select(ChangeLogHorizon.cursor).where(ChangeLogHorizon.id == 1)).scalar() or 0
+        if since < horizon:
+            raise CursorExpired(f"El cursor {since} es anterior al horizonte {horizon}")
+
+        unsettled = _unsettled(since)
+        entries = db.session.execute(
+            select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.bar_id, ChangeLog.op)
+            .where(ChangeLog.id > since, or_(unsettled.is_(None), ChangeLog.id < unsettled))
+            .order_by(ChangeLog.id)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        next_cursor = entries[-1].id if entries else since
+
+        # Solo la última entrada de cada entidad (el estado se lee ahora)
+        latest = {}
+        for entry in entries:
+            key = (entry.entity, entry.entity_id, entry.bar_id if entry.entity_id is None else None)
+            latest.pop(key, None)
+            latest[key] = entry
+        entries = list(latest.values())
+
+        wanted = {"bar": set(), "availability": set()}
+        for entry in entries:
+            if entry.op == "upsert":
+                wanted[entry.entity].add(entry.entity_id)
+        bars = {row.id: row for row in ReadRepository.bars_by_ids(db.session, list(wanted["bar"]),
+                                                                    active_only=False)} if wanted["bar"] else {}
+        slots = ({row.id: row for row in ReadRepository.availability_by_ids(db.session, list(wanted["availability"]))}
+                 if wanted["availability"] else {})
+
+        changes = []
+        for entry in entries:
+            change = {"cursor": entry.id, "entity": entry.entity, "id": entry.entity_id, "bar_id": entry.bar_id,
+                      "op": entry.op}
+            if entry.op == "upsert":
+                row = (bars if entry.entity == "bar" else slots).get(entry.entity_id)
+                # Eliminado después (su entrada llegará en otra página) o bar desactivado
+                if row is None or (entry.entity == "bar" and not row.is_active):
+                    change["op"] = "delete"
+                else:
+                    change["data"] = row.to_dict()
+            changes.append(change)
+
+        return {"changes": changes, "next_cursor": next_cursor, "has_more": has_more}
+
+    @staticmethod
+    def compact(retention_days: int = None, batch_size: int = None) -> dict:
+        """Elimina entradas superadas por otras más recientes y las que exceden la retención, por lotes."""
+        retention_days = CHANGES_RETENTION_DAYS if retention_days is None else retention_days
+        batch_size = batch_size or CHANGES_COMPACT_BATCH
+        stats = {"deduplicated": 0, "expired": 0, "horizon": 0}
+        try:
+            newer = aliased(ChangeLog)
+            superseded = exists().where(
+                newer.entity == ChangeLog.entity,
+                newer.id > ChangeLog.id,
+                or_(newer.entity_id == ChangeLog.entity_id,
+                    and_(ChangeLog.entity_id.is_(None), newer.entity_id.is_(None), newer.bar_id == ChangeLog.bar_id)),
+            )
+            while True:
+                ids = db.session.execute(select(ChangeLog.id).where(superseded).limit(batch_size)).scalars().all()
+                if not ids:
+                    break
+                db.session.execute(delete(ChangeLog).where(ChangeLog.id.in_(ids)))
+                db.session.commit()
+                stats["deduplicated"] += len(ids)
+
+            cutoff = datetime.utcnow() - timedelta(days=retention_days)
+            horizon = db.session.get(ChangeLogHorizon, 1)
+            if horizon is None:
+                horizon = ChangeLogHorizon(id=1, cursor=0)
+                db.session.add(horizon)
+            while True:
+                ids = db.session.execute(
+                    select(ChangeLog.id).where(ChangeLog.created_at < cutoff).order_by(ChangeLog.id).limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                db.session.execute(delete(ChangeLog).where(ChangeLog.id.in_(ids)))
+                horizon.cursor = max(horizon.cursor, ids[-1])
+                db.session.commit()
+                stats["expired"] += len(ids)
+            db.session.commit()
+            stats["horizon"] = horizon.cursor
+
+            logger.info("Registro de cambios compactado: %s", stats)
+            return stats
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error al compactar el registro de cambios: %s", e)
+            return {"error": str(e), **stats}
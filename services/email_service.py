@@ -8,12 +8,18 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import logging
+import time
+
+from utils.deadlines import DeadlineExceeded, expired, smtp_timeout
+from utils.metrics import EMAIL_SEND_SECONDS
+from utils.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
 class EmailService:
     
     @staticmethod
+    @traced("email")
     def send_reservation_confirmation(reservation_data: dict, user_email: str) -> bool:
         """
         Envía email de confirmación de reserva con diseño estético.
@@ -25,6 +31,7 @@ class EmailService:
         Returns:
             bool: True si se envió correctamente
         """
+        started = time.perf_counter()
         try:
             # Configuración SMTP desde variables de entorno
             smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
@@ -50,17 +57,27 @@ class EmailService:
             html_part = MIMEText(html_content, 'html')
             msg.attach(html_part)
             
-            # Enviar email
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
+            # Enviar email (timeout de socket acotado por el plazo de la petición)
+            timeout = smtp_timeout()
+            with span("smtp.send", "email", server=smtp_server), \
+                    smtplib.SMTP(smtp_server, smtp_port, timeout=timeout) as server:
                 server.starttls()
                 server.login(smtp_user, smtp_password)
                 server.send_message(msg)
             
-            logger.info(f"Email enviado a {user_email} para reserva {reservation_data['id']}")
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, result="sent")
+            logger.info("Email enviado a %s para reserva %s", user_email, reservation_data['id'])
             return True
             
+        except (TimeoutError, DeadlineExceeded) as e:
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, result="timeout")
+            if isinstance(e, TimeoutError):
+                expired("smtp", status=None)
+            logger.error("Timeout al enviar email: %s", e)
+            return False
         except Exception as e:
-            logger.error(f"Error al enviar email: {str(e)}")
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, result="error")
+            logger.error("Error al enviar email: %s", e)
             return False
     
     @staticmethod
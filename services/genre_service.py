@@ -0,0 +1,170 @@
+"""
+Servicio para los géneros musicales y las facetas del listado de bares.
+"""
+from models.db import db
+from models.bar import Bar
+from models.genre import Genre, bar_genres
+from repositories.read_repository import bar_conditions
+from utils import change_events
+from utils.replicas import use_primary
+from utils.tracing import traced
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bandas de precio por entrada mínima: (clave, desde, hasta) en pesos, ambos inclusive
+PRICE_BANDS = [
+    ("gratis", 0, 0),
+    ("hasta-20000", 1, 20000),
+    ("20000-50000", 20001, 50000),
+    ("mas-de-50000", 50001, None),
+]
+NO_PRICE_BAND = "sin-precio"
+
+# Invalidación en este proceso vía change_events; el TTL acota lo desactualizado
+# que puede quedar el caché de otros workers.
+FACETS_CACHE_TTL = float(os.getenv("FACETS_CACHE_TTL", "300"))
+_FACETS_CACHE_MAX = 256
+_facets_cache = {}
+_facets_lock = threading.Lock()
+_facets_generation = 0
+
+
+def _invalidate_facets(changes) -> None:
+    global _facets_generation
+    with _facets_lock:
+        _facets_generation += 1
+        _facets_cache.clear()
+
+
+change_events.subscribe(Bar, _invalidate_facets)
+change_events.subscribe(Genre, _invalidate_facets)
+
+
+def _price_band():
+    whens = []
+    for key, low, high in PRICE_BANDS:
+        if high is None:
+            whens.append((Bar.min_price >= low, key))
+        else:
+            whens.append((Bar.min_price.between(low, high), key))
+    return case(*whens, else_=NO_PRICE_BAND)
+
+
+class GenreService:
+
+    @staticmethod
+    def parse_names(value) -> list:
+        """Acepta una lista, un JSON de lista o un texto separado por comas."""
+        if not value:
+            return []
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = value.split(",")
+        if not isinstance(value, list):
+            raise ValueError("music_genres debe ser una lista de textos")
+        return [str(name) for name in value]
+
+    @staticmethod
+    @traced("service")
+    def resolve(names: list) -> list:
+        """
+        Devuelve los Genre de `names`, creando los que no existan (sin commit).
+
+        Los nombres se comparan por slug: "reggaeton" y "Reggaetón" son el mismo género.
+        Cada género nuevo se inserta en un savepoint: si otra transacción lo
+        creó a la vez (slug único), se deshace solo el savepoint y se usa el
+        existente, sin perder el resto de la transacción en curso.
+        """
+        by_slug = {}
+        for name in names:
+            clean = Genre.normalize_name(name)
+            slug = Genre.slug_for(clean)
+            if slug and slug not in by_slug:
+                by_slug[slug] = clean
+        if not by_slug:
+            return []
+
+        existing = {g.slug: g for g in Genre.query.filter(Genre.slug.in_(by_slug)).all()}
+        for slug, name in by_slug.items():
+            if slug not in existing:
+                genre = Genre(name=name, slug=slug)
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(genre)
+                    logger.info("Género creado: %s", name)
+                except IntegrityError:
+                    # Otra petición lo creó entre el SELECT y el INSERT
+                    genre = db.session.execute(select(Genre).where(Genre.slug == slug)).scalar_one()
+                existing[slug] = genre
+        return [existing[slug] for slug in by_slug]
+
+    @staticmethod
+    @traced("service")
+    def list_genres() -> list:
+        return [g.to_dict() for g in Genre.query.order_by(Genre.name).all()]
+
+    @staticmethod
+    @traced("service")
+    def facets(genres: tuple = None, min_price: int = None, max_price: int = None) -> dict:
+        """
+        Conteo de bares activos por género y por banda de precio.
+
+        Facetas disyuntivas: los conteos por género aplican solo el filtro de
+        precio y los de precio solo el de género, para que el cliente pueda
+        mostrar cuántos resultados daría cambiar cada filtro. Ambos conteos
+        salen de una sola consulta (UNION ALL de dos agregados) y se cachean
+        hasta que cambian los bares o los géneros.
+        """
+        key = (tuple(sorted(genres or ())), min_price, max_price)
+        now = time.monotonic()
+        cached = _facets_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        generation = _facets_generation
+
+        by_genre = (
+            select(literal("genre").label("facet"), Genre.slug.label("value"), Genre.name.label("label"),
+                   func.count(Bar.id).label("count"))
+            .select_from(bar_genres)
+            .join(Genre, Genre.id == bar_genres.c.genre_id)
+            .join(Bar, Bar.id == bar_genres.c.bar_id)
+            .where(*bar_conditions(None, min_price, max_price))
+            .group_by(Genre.slug, Genre.name)
+        )
+        band = _price_band()
+        by_price = (
+            select(literal("price").label("facet"), band.label("value"), band.label("label"),
+                   func.count(Bar.id).label("count"))
+            .where(*bar_conditions(genres))
+            .group_by(band)
+        )
+        result = {"genres": [], "price_bands": []}
+        # Del primario: con una réplica atrasada el resultado se cachearía ya desactualizado
+        with use_primary():
+            rows = db.session.execute(union_all(by_genre, by_price)).all()
+        for facet, value, label, count in rows:
+            if facet == "genre":
+                result["genres"].append({"slug": value, "name": label, "count": count})
+            else:
+                result["price_bands"].append({"band": value, "count": count})
+        result["genres"].sort(key=lambda g: (-g["count"], g["slug"]))
+        order = [band_key for band_key, _, _ in PRICE_BANDS] + [NO_PRICE_BAND]
+        result["price_bands"].sort(key=lambda b: order.index(b["band"]))
+
+        with _facets_lock:
+            # Si los bares cambiaron mientras se calculaba, el resultado no se cachea
+            if generation != _facets_generation:
+                return result
+            if len(_facets_cache) >= _FACETS_CACHE_MAX:
+                _facets_cache.clear()
+            _facets_cache[key] = (now + FACETS_CACHE_TTL, result)
+        return result
@@ -6,7 +6,11 @@ from models.reservation import Reservation
 from models.availability import Availability
 from models.bar import Bar
 from models.user import User
+from services.bar_stats_service import BarStatsService
 from services.email_service import EmailService
+from utils.tracing import traced
+from utils.transactions import transactional
+from repositories.read_repository import ReadRepository
 from datetime import datetime
 import logging
 
@@ -15,139 +19,156 @@ logger = logging.getLogger(__name__)
 class ReservationService:
     
     @staticmethod
+    @traced("service")
     def create_reservation(user_id: int, bar_id: int, full_name: str, phone: str, 
                           num_people: int, reservation_date: str, reservation_time: str,
-                          notes: str = None) -> dict:
+                          notes: str = None, user_email: str = None) -> dict:
         """
         Crea una nueva reserva y actualiza la disponibilidad.
         
+        Args:
+            user_email: Email del usuario para la confirmación (claim `username`
+                del JWT). Si no se indica, se consulta el usuario.
+        
         Returns:
             dict: Datos de la reserva creada o error
         """
+        reservation_data = ReservationService._book(user_id, bar_id, full_name, phone, num_people,
+                                                    reservation_date, reservation_time, notes)
+        if 'error' in reservation_data:
+            return reservation_data
+        
+        logger.info("Reserva creada: %s para usuario %s", reservation_data['id'], user_id)
+        
+        # Enviar email de confirmación (fuera de la transacción: un reintento no lo repite)
         try:
-            # Validar que el bar existe
-            bar = Bar.query.get(bar_id)
-            if not bar:
-                return {"error": "Bar no encontrado"}
-            
-            # Buscar disponibilidad
-            date_obj = datetime.strptime(reservation_date, '%Y-%m-%d').date()
-            availability = Availability.query.filter_by(
+            if user_email is None:
+                user = db.session.get(User, user_id)
+                user_email = user.username if user else None  # Asumiendo que username es el email
+            if user_email:
+                EmailService.send_reservation_confirmation(reservation_data, user_email)
+        except Exception as e:
+            # No bloquear la reserva si falla
+            logger.warning("No se pudo enviar email: %s", e)
+        
+        return reservation_data
+    
+    @staticmethod
+    @transactional("reservation.create")
+    def _book(user_id: int, bar_id: int, full_name: str, phone: str, num_people: int,
+              reservation_date: str, reservation_time: str, notes: str = None) -> dict:
+        """Crea la reserva y ocupa la disponibilidad en una transacción."""
+        # Validar que el bar existe
+        bar = Bar.query.get(bar_id)
+        if not bar:
+            return {"error": "Bar no encontrado"}
+        
+        # Buscar disponibilidad
+        date_obj = datetime.strptime(reservation_date, '%Y-%m-%d').date()
+        availability = Availability.query.filter_by(
+            bar_id=bar_id,
+            date=date_obj,
+            time_slot=reservation_time
+        ).first()
+        
+        # Si no existe disponibilidad, crearla automáticamente
+        new_slot = availability is None
+        if not availability:
+            availability = Availability(
                 bar_id=bar_id,
                 date=date_obj,
-                time_slot=reservation_time
-            ).first()
-            
-            # Si no existe disponibilidad, crearla automáticamente
-            if not availability:
-                availability = Availability(
-                    bar_id=bar_id,
-                    date=date_obj,
-                    time_slot=reservation_time,
-                    total_capacity=20,  # Capacidad por defecto
-                    reserved_count=0
-                )
-                db.session.add(availability)
-                db.session.flush()
-            
-            # Verificar capacidad
-            if availability.reserved_count >= availability.total_capacity:
-                return {"error": "No hay disponibilidad para esta fecha y hora"}
-            
-            # Crear la reserva
-            reservation = Reservation(
-                user_id=user_id,
-                bar_id=bar_id,
-                availability_id=availability.id,
-                full_name=full_name,
-                phone=phone,
-                num_people=num_people,
-                reservation_date=date_obj,
-                reservation_time=reservation_time,
-                status='confirmed',
-                notes=notes
+                time_slot=reservation_time,
+                total_capacity=20,  # Capacidad por defecto
+                reserved_count=0
             )
-            
-            # Actualizar disponibilidad
-            availability.reserved_count += 1
-            if availability.reserved_count >= availability.total_capacity:
-                availability.is_available = False
-            
-            db.session.add(reservation)
-            db.session.commit()
-            
-            logger.info(f"Reserva creada: {reservation.id} para usuario {user_id}")
-            
-            # Enviar email de confirmación
-            user = User.query.get(user_id)
-            if user and hasattr(user, 'username'):
-                reservation_data = reservation.to_dict()
-                # Intentar enviar email (no bloquear si falla)
-                try:
-                    EmailService.send_reservation_confirmation(
-                        reservation_data, 
-                        user.username  # Asumiendo que username es el email
-                    )
-                except Exception as e:
-                    logger.warning(f"No se pudo enviar email: {str(e)}")
-            
-            return reservation.to_dict()
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error al crear reserva: {str(e)}")
-            return {"error": str(e)}
+            db.session.add(availability)
+            db.session.flush()
+        
+        # Verificar capacidad
+        if availability.reserved_count >= availability.total_capacity:
+            return {"error": "No hay disponibilidad para esta fecha y hora"}
+        
+        # Crear la reserva
+        reservation = Reservation(
+            user_id=user_id,
+            bar_id=bar_id,
+            availability_id=availability.id,
+            full_name=full_name,
+            phone=phone,
+            num_people=num_people,
+            reservation_date=date_obj,
+            reservation_time=reservation_time,
+            status='confirmed',
+            notes=notes
+        )
+        
+        # Actualizar disponibilidad
+        availability.reserved_count += 1
+        if availability.reserved_count >= availability.total_capacity:
+            availability.is_available = False
+        
+        db.session.add(reservation)
+        db.session.flush()
+        BarStatsService.record(bar_id, date_obj, bookings=1, reserved=1, people=num_people,
+                               slots=1 if new_slot else 0, capacity=availability.total_capacity if new_slot else 0)
+        # Serializar antes del commit: tras él los atributos expiran y
+        # to_dict() volvería a consultar la reserva y el bar
+        reservation_data = reservation.to_dict()
+        db.session.commit()
+        return reservation_data
     
     @staticmethod
-    def get_user_reservations(user_id: int) -> list:
-        """Obtiene todas las reservas de un usuario."""
+    @traced("service")
+    def get_user_reservations(user_id: int, fields: tuple = None, include_archived: bool = False) -> list:
+        """Obtiene todas las reservas de un usuario (opcionalmente solo los campos `fields` y con el archivo)."""
         try:
-            reservations = Reservation.query.filter_by(user_id=user_id).order_by(
-                Reservation.reservation_date.desc()
-            ).all()
+            reservations = ReadRepository.reservations(db.session, user_id=user_id, fields=fields,
+                                                       archived=include_archived)
             return [r.to_dict() for r in reservations]
         except Exception as e:
-            logger.error(f"Error al obtener reservas: {str(e)}")
+            logger.error("Error al obtener reservas: %s", e)
             return []
     
     @staticmethod
-    def get_bar_reservations(bar_id: int) -> list:
+    @traced("service")
+    def get_bar_reservations(bar_id: int, fields: tuple = None, include_archived: bool = False) -> list:
         """Obtiene todas las reservas de un bar (para admin)."""
         try:
-            reservations = Reservation.query.filter_by(bar_id=bar_id).order_by(
-                Reservation.reservation_date.desc()
-            ).all()
+            reservations = ReadRepository.reservations(db.session, bar_id=bar_id, fields=fields,
+                                                       archived=include_archived)
             return [r.to_dict() for r in reservations]
         except Exception as e:
-            logger.error(f"Error al obtener reservas del bar: {str(e)}")
+            logger.error("Error al obtener reservas del bar: %s", e)
             return []
     
     @staticmethod
+    @traced("service")
+    @transactional("reservation.cancel")
     def cancel_reservation(reservation_id: int, user_id: int) -> dict:
         """Cancela una reserva y libera la disponibilidad."""
-        try:
-            reservation = Reservation.query.get(reservation_id)
-            
-            if not reservation:
-                return {"error": "Reserva no encontrada"}
-            
-            if reservation.user_id != user_id:
-                return {"error": "No autorizado"}
-            
-            # Actualizar disponibilidad
-            if reservation.availability_id:
-                availability = Availability.query.get(reservation.availability_id)
-                if availability:
-                    availability.reserved_count = max(0, availability.reserved_count - 1)
-                    availability.is_available = True
-            
-            reservation.status = 'cancelled'
-            db.session.commit()
-            
-            logger.info(f"Reserva cancelada: {reservation_id}")
-            return {"message": "Reserva cancelada exitosamente"}
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error al cancelar reserva: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+        reservation = Reservation.query.get(reservation_id)
+        
+        if not reservation:
+            return {"error": "Reserva no encontrada"}
+        
+        if reservation.user_id != user_id:
+            return {"error": "No autorizado"}
+        
+        if reservation.status == 'cancelled':
+            # Cancelar dos veces (ej. un reintento del cliente) no vuelve a liberar cupo
+            return {"message": "La reserva ya estaba cancelada"}
+        
+        # Actualizar disponibilidad
+        if reservation.availability_id:
+            availability = Availability.query.get(reservation.availability_id)
+            if availability:
+                availability.reserved_count = max(0, availability.reserved_count - 1)
+                availability.is_available = True
+        
+        BarStatsService.record(reservation.bar_id, reservation.reservation_date,
+                               cancellations=1, reserved=-1, people=-reservation.num_people)
+        reservation.status = 'cancelled'
+        db.session.commit()
+        
+        logger.info("Reserva cancelada: %s", reservation_id)
+        return {"message": "Reserva cancelada exitosamente"}
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Tareas programadas de la app (ver utils.scheduler).
+
+Se ejecutan fuera de las peticiones, una sola vez por ejecución programada
+entre todos los workers. Los horarios se configuran con variables de
+entorno (cron de 5 campos en SCHEDULER_TZ).
+"""
+import logging
+import os
+
+from services.archive_service import ArchiveService
+from services.availability_service import AvailabilityService
+from services.change_feed_service import ChangeFeedService
+from utils.scheduler import job
+
+logger = logging.getLogger(__name__)
+
+
+@job("availability.extend_horizon", os.getenv("JOB_EXTEND_HORIZON_CRON", "15 4 * * *"))
+def extend_availability_horizon() -> dict:
+    """Mantiene AVAILABILITY_HORIZON_DAYS días de disponibilidad futura en cada bar activo."""
+    return AvailabilityService.extend_horizon()
+
+
+@job("maintenance.nightly", os.getenv("JOB_MAINTENANCE_CRON", "30 5 * * *"))
+def nightly_maintenance() -> dict:
+    """Mantenimiento nocturno: compacta el registro de cambios (feed GET /changes)."""
+    stats = ChangeFeedService.compact()
+    if "error" in stats:
+        return {"error": f"change_log: {stats['error']}"}
+    return {"change_log": stats}
+
+
+@job("retention.archive", os.getenv("JOB_ARCHIVE_CRON", "0 5 * * *"))
+def archive_history() -> dict:
+    """Mueve la disponibilidad y las reservas de más de ARCHIVE_AFTER_DAYS días a las tablas de archivo."""
+    return ArchiveService.archive()
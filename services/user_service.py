@@ -6,6 +6,8 @@ Puedes crear más servicios siguiendo este ejemplo.
 
 from repositories.user_repository import UserRepository
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.tracing import traced
+from utils.transactions import transactional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,38 +15,47 @@ logger = logging.getLogger(__name__)
 class UserService:
 
     @staticmethod
+    @traced("service")
     def register_user(username, password):
+        logger.info('Registrando usuario en servicio: %s', username)
+        # El hash (costoso) se calcula fuera de la transacción para no repetirlo en los reintentos
+        hashed_password = generate_password_hash(password)
+        return UserService._create_user(username, hashed_password)
+
+    @staticmethod
+    @transactional("user.register")
+    def _create_user(username, hashed_password):
         from models.db import db
-        logger.info(f'Registrando usuario en servicio: {username}')
         # Validar si el usuario ya existe
         existing_user = UserRepository.get_by_username(username, db.session)
         if existing_user:
-            logger.warning(f'Intento de registro con usuario existente: {username}')
+            logger.warning('Intento de registro con usuario existente: %s', username)
             return {'error': 'Usuario ya existe', 'username': username}
-        hashed_password = generate_password_hash(password)
         user = UserRepository.create_user(username, hashed_password, db.session)
-        logger.info(f'Usuario creado en servicio: {user.username} (ID: {user.id})')
+        logger.info('Usuario creado en servicio: %s (ID: %s)', user.username, user.id)
         return user
 
 
     @staticmethod
+    @traced("service")
     def authenticate(username, password):
         from models.db import db
-        logger.info(f'Autenticando usuario en servicio: {username}')
+        logger.info('Autenticando usuario en servicio: %s', username)
         user = UserRepository.get_by_username(username, db.session)
         if user and check_password_hash(user.password, password):
-            logger.info(f'Autenticación exitosa en servicio: {username}')
+            logger.info('Autenticación exitosa en servicio: %s', username)
             return user
-        logger.warning(f'Autenticación fallida en servicio: {username}')
+        logger.warning('Autenticación fallida en servicio: %s', username)
         return None
 
 
     @staticmethod
+    @traced("service")
     def get_all_users():
         from models.db import db
         logger.info('Obteniendo todos los usuarios en servicio')
         users = UserRepository.get_all(db.session)
-        logger.info(f'{len(users)} usuarios obtenidos en servicio')
+        logger.info('%s usuarios obtenidos en servicio', len(users))
         return users
 
 """
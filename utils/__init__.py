@@ -0,0 +1,2 @@
+# Este archivo permite que la carpeta utils sea tratada como un módulo.
+# Aquí se ubican utilidades transversales (logging, instrumentación, etc.) usadas por la aplicación.
@@ -0,0 +1,241 @@
+"""
+Control de admisión: descarta pronto las peticiones de baja prioridad
+cuando el pool de conexiones se satura.
+
+Cada worker lleva la cuenta de las peticiones en curso y de la espera para
+obtener una conexión del pool (media móvil que se desvanece en
+ADMISSION_DECAY_SECONDS). Cada petición tiene una clase:
+
+    - critical: reservas, cancelaciones y login (`@priority("critical")`);
+    - normal: el resto de escrituras;
+    - low: lecturas (GET/HEAD), la navegación.
+
+Una clase se admite mientras las peticiones en curso no pasen de su cuota
+de ADMISSION_MAX_INFLIGHT (low 50 %, normal 80 %, critical 100 %) y la
+espera del pool no pase de su umbral (low ADMISSION_POOL_WAIT, normal 4
+veces ese valor, critical sin umbral). Si no se admite, responde al
+instante 503 con Retry-After, antes de tocar la base de datos: las
+reservas siguen encontrando conexiones libres en lugar de hacer cola
+detrás de los listados. Para que una avalancha de reservas no deje sin
+servicio a la navegación, cada clase conserva un mínimo de peticiones en
+curso (10 % de ADMISSION_MAX_INFLIGHT) que solo limita el máximo total.
+
+La clase de una vista se puede cambiar con ADMISSION_PRIORITIES
+("bar_bp.get_bar=normal,..."). /health, /metrics y la documentación no pasan
+por el control. ADMISSION_ENABLED=0 lo desactiva.
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from utils.metrics import ADMISSION_DECISIONS, DB_POOL_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("ADMISSION_ENABLED", "1") != "0"
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "0"))  # 0: 2 x capacidad del pool
+ADMISSION_POOL_WAIT = float(os.getenv("ADMISSION_POOL_WAIT", "0.05"))
+ADMISSION_DECAY_SECONDS = float(os.getenv("ADMISSION_DECAY_SECONDS", "1.0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+CRITICAL, NORMAL, LOW = "critical", "normal", "low"
+# clase -> (fracción de ADMISSION_MAX_INFLIGHT, múltiplo de ADMISSION_POOL_WAIT o None, Retry-After base)
+_CLASSES = {
+    CRITICAL: (1.0, None, 1),
+    NORMAL: (0.8, 4.0, 1),
+    LOW: (0.5, 1.0, 2),
+}
+_EXEMPT = frozenset(("health", "metrics_endpoint", "static"))
+_EXEMPT_PREFIXES = ("flasgger.",)
+_DEFAULT_MAX_INFLIGHT = 30
+_RESERVED_SHARE = 0.1
+_EWMA_WEIGHT = 0.2
+
+
+def _overrides() -> dict:
+    overrides = {}
+    for item in os.getenv("ADMISSION_PRIORITIES", "").split(","):
+        if "=" in item:
+            endpoint, klass = (part.strip() for part in item.split("=", 1))
+            if klass in _CLASSES:
+                overrides[endpoint] = klass
+            else:
+                logger.warning("ADMISSION_PRIORITIES: clase desconocida para %s: %r", endpoint, klass)
+    return overrides
+
+
+_OVERRIDES = _overrides()
+
+
+def priority(klass: str):
+    """Fija la clase de admisión de una vista (critical, normal o low)."""
+    if klass not in _CLASSES:
+        raise ValueError(f"Clase de admisión desconocida: {klass}")
+
+    def decorator(view):
+        view.admission_priority = klass
+        return view
+    return decorator
+
+
+class _PoolWait:
+    """Media móvil de la espera del pool que decae hacia cero sin checkouts nuevos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._at = time.monotonic()
+        self.waiting = 0  # hilos esperando una conexión ahora mismo
+
+    def enter(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self._value = self._decayed() * (1 - _EWMA_WEIGHT) + seconds * _EWMA_WEIGHT
+            self._at = time.monotonic()
+
+    def _decayed(self) -> float:
+        return self._value * math.exp(-(time.monotonic() - self._at) / ADMISSION_DECAY_SECONDS)
+
+    def value(self) -> float:
+        with self._lock:
+            return self._decayed()
+
+
+class _Controller:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.by_class = dict.fromkeys(_CLASSES, 0)
+        self.max_in_flight = ADMISSION_MAX_INFLIGHT or _DEFAULT_MAX_INFLIGHT
+        self.pool_wait = _PoolWait()
+        self._view_functions = {}
+
+    def classify(self):
+        """Clase de la petición actual, o None si no pasa por el control."""
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in _EXEMPT or endpoint.startswith(_EXEMPT_PREFIXES):
+            return None
+        if endpoint in _OVERRIDES:
+            return _OVERRIDES[endpoint]
+        view = self._view_functions.get(endpoint)
+        default = LOW if request.method in ("GET", "HEAD") else NORMAL
+        return getattr(view, "admission_priority", default)
+
+    def try_admit(self, klass: str) -> bool:
+        share, wait_factor, _ = _CLASSES[klass]
+        pool_wait = self.pool_wait.value()
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            # Con el worker vacío siempre se admite: la espera medida puede ser de otra ráfaga
+            reserved = self.by_class[klass] < max(1, int(self.max_in_flight * _RESERVED_SHARE))
+            if self.in_flight and not reserved and (
+                    self.in_flight >= max(1, int(self.max_in_flight * share))
+                    or (wait_factor is not None and pool_wait > ADMISSION_POOL_WAIT * wait_factor)):
+                return False
+            self.in_flight += 1
+            self.by_class[klass] += 1
+            return True
+
+    def release(self, klass: str) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.by_class[klass] -= 1
+
+    def status(self) -> dict:
+        return {"in_flight": self.in_flight, "in_flight_by_class": dict(self.by_class), "max_in_flight": self.max_in_flight,
+                "pool_wait_ms": round(self.pool_wait.value() * 1000, 2), "pool_waiting": self.pool_wait.waiting}
+
+
+_controller = _Controller()
+
+
+def _timed_connect(pool, name: str):
+    connect = pool.connect
+
+    def wrapper():
+        started = time.perf_counter()
+        _controller.pool_wait.enter()
+        try:
+            return connect()
+        finally:
+            elapsed = time.perf_counter() - started
+            _controller.pool_wait.observe(elapsed)
+            DB_POOL_WAIT_SECONDS.observe(elapsed, pool=name)
+    return wrapper
+
+
+def _pool_capacity(pool) -> int:
+    size = getattr(pool, "size", None)
+    overflow = getattr(pool, "_max_overflow", 0)
+    if not callable(size):
+        return 0
+    return size() + max(overflow, 0)
+
+
+# =========================
+# Flask
+# =========================
+def _admit():
+    if not ENABLED:
+        return None
+    klass = _controller.classify()
+    if klass is None:
+        return None
+    if _controller.try_admit(klass):
+        g.admission_class = klass
+        ADMISSION_DECISIONS.inc(priority=klass, result="admitted")
+        return None
+    ADMISSION_DECISIONS.inc(priority=klass, result="shed")
+    retry_after = _CLASSES[klass][2] * ADMISSION_RETRY_AFTER
+    response = jsonify({"error": "Servidor ocupado, intenta de nuevo"})
+    response.status_code = 503
+    # Jitter para que los clientes descartados no vuelvan todos a la vez
+    response.headers["Retry-After"] = str(retry_after + random.randint(0, retry_after))
+    return response
+
+
+def _release(*_):
+    # after_request libera antes de enviar el cuerpo (los streams SSE no ocupan cupo);
+    # teardown cubre las peticiones que terminaron con excepción
+    klass = g.pop("admission_class", None)
+    if klass is not None:
+        _controller.release(klass)
+
+
+def _release_response(response):
+    _release()
+    return response
+
+
+def admission_status() -> dict:
+    """Estado del control de admisión de este worker (para /health)."""
+    return _controller.status()
+
+
+def init_admission(app, db) -> None:
+    """Instala el control de admisión (llamar tras db.init_app y las métricas)."""
+    _controller._view_functions = app.view_functions
+    with app.app_context():
+        engines = db.engines
+        capacity = 0
+        for bind, engine in engines.items():
+            engine.pool.connect = _timed_connect(engine.pool, bind or "primary")
+            if bind is None:
+                capacity = _pool_capacity(engine.pool)
+    if not ADMISSION_MAX_INFLIGHT and capacity:
+        _controller.max_in_flight = 2 * capacity
+    app.before_request(_admit)
+    app.after_request(_release_response)
+    app.teardown_request(_release)
+    logger.info("Control de admisión: hasta %s peticiones en curso por worker", _controller.max_in_flight)
@@ -0,0 +1,31 @@
+"""
+Utilidades de autorización basadas en JWT.
+
+Los administradores se definen por ID de usuario en la variable de entorno
+ADMIN_USER_IDS (lista separada por comas, ej: "1,7").
+"""
+import os
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+
+def admin_ids() -> set:
+    """IDs de usuario (como string, igual que la identidad del JWT) con rol de administrador."""
+    return {value.strip() for value in os.getenv("ADMIN_USER_IDS", "").split(",") if value.strip()}
+
+
+def is_admin_identity(identity) -> bool:
+    return identity is not None and str(identity) in admin_ids()
+
+
+def admin_required(fn):
+    """Como `jwt_required()`, pero además exige que el usuario sea administrador."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        if not is_admin_identity(get_jwt_identity()):
+            return jsonify({"error": "No autorizado"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,89 @@
+"""
+Notificación de cambios confirmados en los modelos.
+
+Los cachés e índices en memoria (facetas, búsqueda, clusters de mapa) se
+suscriben a un modelo y reciben, tras cada commit que lo modifica, la lista
+de cambios `(operación, id)`:
+    ("insert" | "update" | "delete", id)  cambios hechos a través de la sesión ORM
+    ("bulk", None)                        INSERT/UPDATE/DELETE masivo (session.execute);
+                                          no se conocen los ids, el suscriptor debe
+                                          invalidar o reconstruir todo
+
+Los cambios se acumulan en `session.info` durante los flush y solo se
+publican en `after_commit`; un rollback los descarta. Los callbacks se
+ejecutan después del commit y no deben emitir SQL en esa sesión.
+
+Solo se observan los cambios de este proceso: con varios workers, cada uno
+debe complementar la invalidación con un TTL o una fuente compartida.
+"""
+import logging
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_subscribers = {}
+_lock = threading.Lock()
+_PENDING_KEY = "change_events"
+
+
+def subscribe(model, callback) -> None:
+    """Registra `callback(changes: list)` para los commits que modifican `model`."""
+    _install()
+    with _lock:
+        _subscribers.setdefault(model, []).append(callback)
+
+
+def _pending(session) -> dict:
+    return session.info.setdefault(_PENDING_KEY, {})
+
+
+def _after_flush(session, flush_context):
+    if not _subscribers:
+        return
+    pending = None
+    for op, instances in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for instance in instances:
+            model = type(instance)
+            if model in _subscribers:
+                if op == "update" and not session.is_modified(instance, include_collections=True):
+                    continue
+                if pending is None:
+                    pending = _pending(session)
+                pending.setdefault(model, []).append((op, instance.id))
+
+
+def _do_orm_execute(orm_execute_state):
+    if not _subscribers or not (orm_execute_state.is_insert or orm_execute_state.is_update
+                                or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model in _subscribers:
+        _pending(orm_execute_state.session).setdefault(model, []).append(("bulk", None))
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for model, changes in pending.items():
+        for callback in list(_subscribers.get(model, ())):
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error("Error notificando cambios de %s: %s", model.__name__, e)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _install() -> None:
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_soft_rollback", _after_rollback)
@@ -0,0 +1,92 @@
+"""
+Escritura del registro de cambios (models.change_log) en la misma transacción
+que los cambios.
+
+`track(model, entity, bar_of)` registra un modelo. Durante los flush se
+acumulan en `session.info` las entidades insertadas/modificadas/eliminadas
+(sin repetir) y en `before_commit` se escriben todas con un único INSERT en
+la conexión de la sesión, justo antes del COMMIT: la entrada del log existe
+si y solo si el cambio se confirmó, y el id se asigna milisegundos antes de
+hacerse visible.
+
+Las sentencias masivas (session.execute(insert/update/delete(Modelo))) no
+tienen ids: se registran como "resync" del bar si los parámetros lo indican
+(ej. inserción masiva de slots) o de toda la entidad si no. Las que no
+interesan a los clientes del feed (ej. archivar slots pasados) se excluyen
+con `.execution_options(skip_change_log=True)`.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from models.change_log import ChangeLog
+
+logger = logging.getLogger(__name__)
+
+_tracked = {}  # modelo -> (entidad, función que devuelve el bar_id de una instancia)
+_PENDING_KEY = "change_log"
+
+
+def track(model, entity: str, bar_of) -> None:
+    _tracked[model] = (entity, bar_of)
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_soft_rollback", _after_rollback)
+
+
+def _pending(session) -> dict:
+    return session.info.setdefault(_PENDING_KEY, {})
+
+
+def _after_flush(session, flush_context):
+    for op, instances in (("upsert", session.new), ("upsert", session.dirty), ("delete", session.deleted)):
+        for instance in instances:
+            tracked = _tracked.get(type(instance))
+            if tracked is None:
+                continue
+            if instance in session.dirty and not session.is_modified(instance, include_collections=True):
+                continue
+            entity, bar_of = tracked
+            # La última operación de la transacción sobre la entidad es la que cuenta
+            _pending(session)[(entity, instance.id)] = (entity, instance.id, bar_of(instance), op)
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get("skip_change_log"):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tracked = _tracked.get(mapper.class_) if mapper is not None else None
+    if tracked is None:
+        return
+    entity = tracked[0]
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters or {}]
+    bar_ids = {row.get("bar_id") for row in rows}
+    pending = _pending(orm_execute_state.session)
+    for bar_id in (bar_ids if orm_execute_state.is_insert and None not in bar_ids else (None,)):
+        pending[(entity, None, bar_id)] = (entity, None, bar_id, "resync")
+
+
+def _before_commit(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()  # los cambios que aún no se enviaron también deben quedar en el log
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    now = datetime.utcnow()
+    rows = [{"entity": entity, "entity_id": entity_id, "bar_id": bar_id, "op": op, "created_at": now}
+            for entity, entity_id, bar_id, op in pending.values()]
+    session.connection().execute(insert(ChangeLog), rows)
+
+
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.nested:
+        # Un savepoint deshecho deja el resto de la transacción; una entrada de más solo provoca una relectura
+        return
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,240 @@
+"""
+Compresión de respuestas con negociación gzip / brotli.
+
+Las respuestas JSON o de texto de al menos COMPRESS_MIN_SIZE bytes (1024)
+se comprimen con la mejor codificación que acepte el cliente
+(Accept-Encoding): brotli si el paquete `brotli` está instalado (está en
+requirements.txt; si falta, solo gzip), si no gzip. No se comprimen los streams (SSE ni
+ninguna respuesta en streaming: el cuerpo aún no existe y comprimirlo
+retrasaría los eventos), las respuestas ya codificadas ni las que no son 200.
+
+Las vistas cacheables marcadas con `@precompressed` (catálogo, detalle y
+disponibilidad de un bar, ...) guardan cada cuerpo comprimido en un LRU
+indexado por el hash del cuerpo (COMPRESS_CACHE_BYTES, 16 MiB): mientras los
+datos no cambian, el costo por petición es un hash del cuerpo en lugar de
+una compresión. En un fallo del caché la petición comprime con el nivel
+normal (el mismo costo que sin caché) y un hilo de fondo sustituye la
+entrada por la versión de nivel alto (COMPRESS_GZIP_CACHED_LEVEL,
+COMPRESS_BR_CACHED_QUALITY) para las peticiones siguientes; si la cola de
+mejoras está llena, la entrada se queda en el nivel normal.
+"""
+import functools
+import gzip
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, request
+
+from utils.metrics import COMPRESSION_BYTES, COMPRESSION_CACHE, COMPRESSION_SECONDS
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("COMPRESS_ENABLED", "1") != "0"
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "4"))
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+_COMPRESSIBLE = ("application/json", "text/")
+# Niveles de las versiones cacheadas, que se recomprimen fuera de la petición
+# (brotli 11 es decenas de veces más lento que 9 para un ahorro marginal)
+COMPRESS_GZIP_CACHED_LEVEL = int(os.getenv("COMPRESS_GZIP_CACHED_LEVEL", "9"))
+COMPRESS_BR_CACHED_QUALITY = int(os.getenv("COMPRESS_BR_CACHED_QUALITY", "9"))
+COMPRESS_UPGRADE_QUEUE = int(os.getenv("COMPRESS_UPGRADE_QUEUE", "64"))
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data: bytes, quality: int) -> bytes:
+    return brotli.compress(data, quality=quality)
+
+
+# codificación -> (función, nivel por petición, nivel cacheado)
+ENCODINGS = {"gzip": (_gzip, COMPRESS_GZIP_LEVEL, COMPRESS_GZIP_CACHED_LEVEL)}
+if brotli is not None:
+    ENCODINGS["br"] = (_brotli, COMPRESS_BR_QUALITY, COMPRESS_BR_CACHED_QUALITY)
+_PREFERENCE = ("br", "gzip")
+
+
+def negotiate(accept_encoding: str):
+    """Codificación a usar según Accept-Encoding (q > 0), o None."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    candidates = [(accepted.get(name, wildcard), -rank, name)
+                  for rank, name in enumerate(_PREFERENCE) if name in ENCODINGS]
+    best = max(candidates, default=None)
+    return best[2] if best and best[0] > 0 else None
+
+
+class CompressedCache:
+    """LRU de cuerpos comprimidos por (codificación, hash del cuerpo), acotado en bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+_cache = CompressedCache(COMPRESS_CACHE_BYTES)
+
+
+class _Upgrader:
+    """Hilo de fondo que recomprime al nivel alto las entradas del caché guardadas con el nivel normal."""
+
+    def __init__(self, max_pending: int):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, key, data: bytes) -> None:
+        with self._lock:
+            if key in self._pending:
+                return
+            # Tras el fork el hilo del master no existe en el worker
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pending.clear()
+                threading.Thread(target=self._run, args=(self._queue,), name="compression-upgrade",
+                                 daemon=True).start()
+            try:
+                self._queue.put_nowait((key, data))
+            except queue.Full:
+                COMPRESSION_CACHE.inc(result="upgrade_skipped")
+                return
+            self._pending.add(key)
+
+    def _run(self, jobs: queue.Queue) -> None:
+        while True:
+            key, data = jobs.get()
+            encoding = key[0]
+            function, _, cached_level = ENCODINGS[encoding]
+            try:
+                _cache.put(key, _timed(function, data, cached_level, encoding))
+                COMPRESSION_CACHE.inc(result="upgraded")
+            except Exception as e:
+                logger.warning("No se pudo recomprimir una respuesta (%s): %s", encoding, e)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                jobs.task_done()
+
+    def wait(self) -> None:
+        """Espera a que terminen las recompresiones encargadas (benchmarks)."""
+        self._queue.join()
+
+
+_upgrader = _Upgrader(COMPRESS_UPGRADE_QUEUE)
+
+
+def compress(data: bytes, encoding: str, cacheable: bool = False) -> bytes:
+    """
+    Comprime `data` con el nivel normal. Si es cacheable reutiliza la versión
+    guardada o guarda esta y encarga al hilo de fondo la de nivel alto.
+    """
+    function, level, cached_level = ENCODINGS[encoding]
+    if not cacheable:
+        return _timed(function, data, level, encoding)
+    key = (encoding, hashlib.blake2b(data, digest_size=16).digest())
+    body = _cache.get(key)
+    if body is not None:
+        COMPRESSION_CACHE.inc(result="hit")
+        return body
+    COMPRESSION_CACHE.inc(result="miss")
+    body = _timed(function, data, level, encoding)
+    _cache.put(key, body)
+    if cached_level > level:
+        _upgrader.submit(key, data)
+    return body
+
+
+def _timed(function, data: bytes, level: int, encoding: str) -> bytes:
+    started = time.perf_counter()
+    body = function(data, level)
+    COMPRESSION_SECONDS.observe(time.perf_counter() - started, encoding=encoding)
+    return body
+
+
+def precompressed(view):
+    """Marca una vista cuya respuesta comprimida se guarda y reutiliza mientras no cambie."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.compress_cacheable = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _compress_response(response):
+    if (not ENABLED or request.method == "HEAD" or response.status_code != 200 or response.is_streamed
+            or response.direct_passthrough or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(_COMPRESSIBLE)):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    body = compress(data, encoding, cacheable=g.get("compress_cacheable", False))
+    if len(body) >= len(data):
+        return response
+    COMPRESSION_BYTES.inc(len(data), encoding=encoding, stage="original")
+    COMPRESSION_BYTES.inc(len(body), encoding=encoding, stage="compressed")
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app) -> None:
+    """
+    Registra la compresión. Flask ejecuta los after_request en orden inverso
+    al registro: llamar antes que los hooks que pueden reemplazar la
+    respuesta (plazos, admisión, perfiladores) para comprimir la definitiva.
+    """
+    app.after_request(_compress_response)
+    logger.info("Compresión de respuestas: %s", ", ".join(sorted(ENCODINGS)))
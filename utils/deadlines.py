@@ -0,0 +1,232 @@
+"""
+Plazos por petición que se propagan a la base de datos y al SMTP.
+
+Cada petición recibe un plazo: el de la vista (`@deadline(segundos)`), el de
+REQUEST_DEADLINES ("bar_bp.get_bars=3,reservation_bp.get_bar_reservations=5",
+por endpoint de Flask) o REQUEST_DEADLINE (10 s por defecto; 0 lo desactiva).
+
+Propagación:
+    - MySQL: cada SELECT lleva el hint MAX_EXECUTION_TIME con el tiempo que
+      queda; las esperas de bloqueo se acotan con innodb_lock_wait_timeout
+      (DB_LOCK_WAIT_TIMEOUT) en cada conexión nueva;
+    - SQLite: un progress handler interrumpe la sentencia al vencer el plazo;
+    - SMTP: timeout de socket = min(SMTP_TIMEOUT, tiempo restante)
+      (`smtp_timeout()`);
+    - si el plazo ya venció, la sentencia ni se envía (DeadlineExceeded).
+
+Respuesta: como los controladores convierten las excepciones en errores
+genéricos, el plazo vencido se marca en `g` y la respuesta se reemplaza por
+504 (una sentencia cortada por el plazo) o 503 con Retry-After (no quedaba
+tiempo ni para empezar: el worker está saturado). Si la petición ya confirmó
+una escritura la respuesta no se toca, para que el cliente no reintente algo
+que sí se hizo.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+from utils.metrics import REQUEST_DEADLINE_EXCEEDED
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "10"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+DB_LOCK_WAIT_TIMEOUT = int(os.getenv("DB_LOCK_WAIT_TIMEOUT", "5"))
+# Sentencias de SQLite entre comprobaciones del plazo (instrucciones de la VM)
+_SQLITE_PROGRESS_STEPS = 2000
+_MYSQL_QUERY_TIMEOUT = 3024  # ER_QUERY_TIMEOUT (MAX_EXECUTION_TIME)
+_HANDLER_KEY = "deadline_progress_handler"  # info de la conexión: hay progress handler instalado
+_WROTE_KEY = "deadline_wrote"               # session.info: la transacción escribió
+
+
+class DeadlineExceeded(Exception):
+    """No queda tiempo del plazo de la petición para empezar la operación."""
+
+
+def _overrides() -> dict:
+    overrides = {}
+    for item in os.getenv("REQUEST_DEADLINES", "").split(","):
+        if "=" in item:
+            endpoint, seconds = item.split("=", 1)
+            try:
+                overrides[endpoint.strip()] = float(seconds)
+            except ValueError:
+                logger.warning("REQUEST_DEADLINES: valor no válido para %s: %r", endpoint, seconds)
+    return overrides
+
+
+_OVERRIDES = _overrides()
+
+
+def deadline(seconds: float):
+    """Fija el plazo de una vista (REQUEST_DEADLINES puede sobrescribirlo)."""
+    def decorator(view):
+        view.deadline_seconds = seconds
+        return view
+    return decorator
+
+
+def remaining():
+    """Segundos que quedan del plazo de la petición actual; None si no hay plazo."""
+    if not has_request_context() or g.get("deadline_suspended"):
+        return None
+    expires_at = g.get("deadline_expires_at")
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+@contextmanager
+def without_deadline():
+    """
+    Suspende el plazo dentro del bloque (ej. construir una estructura
+    compartida que, cortada a medias, habría que repetir en cada petición).
+    """
+    suspended = has_request_context() and not g.get("deadline_suspended")
+    if suspended:
+        g.deadline_suspended = True
+    try:
+        yield
+    finally:
+        if suspended:
+            g.deadline_suspended = False
+
+
+def smtp_timeout() -> float:
+    """Timeout para las operaciones SMTP; lanza DeadlineExceeded si ya no queda tiempo."""
+    left = remaining()
+    if left is None:
+        return SMTP_TIMEOUT
+    if left <= 0:
+        expired("smtp", status=None)
+        raise DeadlineExceeded("Sin tiempo para enviar el email")
+    return min(SMTP_TIMEOUT, left)
+
+
+def expired(stage: str, status=504) -> None:
+    """Registra un plazo vencido; con `status` la respuesta se reemplazará por ese código."""
+    if not has_request_context():
+        return
+    REQUEST_DEADLINE_EXCEEDED.inc(endpoint=request.endpoint or "unmatched", stage=stage)
+    if status is not None and g.get("deadline_status") is None:
+        g.deadline_status = status
+
+
+# =========================
+# Base de datos
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    left = remaining()
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        _sqlite_handler(conn, left)
+    if left is None:
+        return statement, parameters
+    if left <= 0:
+        expired("before_statement", status=503)
+        raise DeadlineExceeded("Plazo de la petición vencido antes de ejecutar la sentencia")
+    if dialect == "mysql":
+        stripped = statement.lstrip()
+        if stripped[:6].upper() == "SELECT":
+            statement = f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(left * 1000))}) */{stripped[6:]}"
+    return statement, parameters
+
+
+def _sqlite_handler(conn, left) -> None:
+    raw = conn.connection.dbapi_connection
+    if left is None:
+        if conn.info.pop(_HANDLER_KEY, False):
+            raw.set_progress_handler(None, 0)
+        return
+    expires_at = time.monotonic() + left
+    raw.set_progress_handler(lambda: 1 if time.monotonic() > expires_at else 0, _SQLITE_PROGRESS_STEPS)
+    conn.info[_HANDLER_KEY] = True
+
+
+def _handle_error(context):
+    orig = context.original_exception
+    code = orig.args[0] if getattr(orig, "args", None) else None
+    if code == _MYSQL_QUERY_TIMEOUT or (context.engine is not None and context.engine.dialect.name == "sqlite"
+                                        and "interrupted" in str(orig)):
+        expired("db_statement")
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    if connection_record.info.pop(_HANDLER_KEY, False):
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+def _on_connect(dbapi_connection, connection_record):
+    # Solo MySQL tiene innodb_lock_wait_timeout; se detecta por el módulo del driver
+    if type(dbapi_connection).__module__.startswith(("pymysql", "MySQLdb")):
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"SET SESSION innodb_lock_wait_timeout = {DB_LOCK_WAIT_TIMEOUT}")
+
+
+def _after_flush(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+def _after_commit(session):
+    if session.info.pop(_WROTE_KEY, False) and has_request_context():
+        g.deadline_committed = True
+
+
+def _after_rollback(session):
+    session.info.pop(_WROTE_KEY, None)
+
+
+# =========================
+# Flask
+# =========================
+_view_functions = {}
+
+
+def _start_deadline():
+    view = request.endpoint and _view_functions.get(request.endpoint)
+    seconds = _OVERRIDES.get(request.endpoint, getattr(view, "deadline_seconds", REQUEST_DEADLINE))
+    if seconds and seconds > 0:
+        g.deadline_seconds = seconds
+        g.deadline_expires_at = time.monotonic() + seconds
+
+
+def _finish_deadline(response):
+    status = g.pop("deadline_status", None)
+    if status is None or g.get("deadline_committed"):
+        return response
+    if status == 503:
+        response = jsonify({"error": "Servidor ocupado, intenta de nuevo", "deadline_seconds": g.deadline_seconds})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+    else:
+        response = jsonify({"error": "La petición excedió su tiempo límite", "deadline_seconds": g.deadline_seconds})
+        response.status_code = 504
+    logger.warning("Plazo de %ss vencido en %s", g.deadline_seconds, request.endpoint)
+    return response
+
+
+def init_deadlines(app) -> None:
+    """Registra los plazos por petición y su propagación a los engines."""
+    global _view_functions
+    _view_functions = app.view_functions
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute, retval=True)
+        event.listen(Engine, "handle_error", _handle_error)
+        event.listen(Pool, "checkin", _on_checkin)
+        event.listen(Pool, "connect", _on_connect)
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+    app.before_request(_start_deadline)
+    app.after_request(_finish_deadline)
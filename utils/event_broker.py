@@ -0,0 +1,92 @@
+"""
+Broker de eventos en memoria para los streams (Server-Sent Events).
+
+Cada suscripción escucha un conjunto de temas (ej. ids de bar) y tiene una
+cola acotada. `publish` busca los suscriptores del tema en un dict
+tema -> suscripciones y encola el mismo objeto (el frame SSE ya serializado)
+en cada uno, así que el costo por evento es O(suscriptores del tema) sin
+volver a serializar.
+
+Un suscriptor lento no frena al resto: si su cola se llena se descartan sus
+eventos y se marca `overflowed`, para que el stream le pida al cliente
+resincronizarse.
+
+Funciona con workers sync/gthread (hilos) y con gevent (con monkey patching
+threading.Event coopera con el resto de greenlets).
+"""
+import threading
+from collections import deque
+
+
+class Subscription:
+    """Cola de eventos de un cliente. Solo la consume el hilo/greenlet de su stream."""
+
+    __slots__ = ("topics", "max_queue", "overflowed", "_queue", "_ready")
+
+    def __init__(self, topics, max_queue: int):
+        self.topics = frozenset(topics)
+        self.max_queue = max_queue
+        self.overflowed = False
+        self._queue = deque()
+        self._ready = threading.Event()
+
+    def _push(self, event) -> bool:
+        if len(self._queue) >= self.max_queue:
+            self.overflowed = True
+            self._ready.set()
+            return False
+        self._queue.append(event)
+        self._ready.set()
+        return True
+
+    def wait(self, timeout: float) -> list:
+        """Eventos pendientes; espera hasta `timeout` segundos si no hay ninguno."""
+        if not self._queue and not self._ready.wait(timeout):
+            return []
+        self._ready.clear()
+        events = []
+        while self._queue:
+            events.append(self._queue.popleft())
+        return events
+
+
+class EventBroker:
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._by_topic = {}  # tema -> set de suscripciones
+
+    def subscribe(self, topics) -> Subscription:
+        subscription = Subscription(topics, self.max_queue)
+        with self._lock:
+            for topic in subscription.topics:
+                self._by_topic.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._by_topic.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_topic[topic]
+
+    def topics(self) -> list:
+        """Temas con al menos un suscriptor."""
+        with self._lock:
+            return list(self._by_topic)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(set().union(*self._by_topic.values())) if self._by_topic else 0
+
+    def publish(self, topic, event) -> tuple:
+        """Encola `event` a los suscriptores del tema. Devuelve (entregados, descartados)."""
+        with self._lock:
+            subscribers = list(self._by_topic.get(topic, ()))
+        delivered = 0
+        for subscription in subscribers:
+            delivered += subscription._push(event)
+        return delivered, len(subscribers) - delivered
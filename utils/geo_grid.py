@@ -0,0 +1,147 @@
+"""
+Grilla jerárquica para agrupar puntos del mapa por nivel de zoom.
+
+Usa las celdas de las teselas Web Mercator: en el nivel L el mundo se divide
+en 2^L x 2^L celdas y cada celda contiene exactamente 4 celdas del nivel
+L + 1. Para cada nivel entre MIN_LEVEL y MAX_LEVEL se mantiene, por celda no
+vacía, el conteo, la suma de coordenadas (centroide) y el punto
+representativo (el de mayor puntaje).
+
+Añadir, mover o quitar un punto actualiza una celda por nivel (O(niveles));
+solo si se quita el representativo de una celda se recalcula el de esa celda
+a partir de sus 4 hijas.
+"""
+import math
+import threading
+
+MIN_LEVEL = 2
+MAX_LEVEL = 20
+_MAX_LAT = 85.05112878
+_Y_BITS = MAX_LEVEL + 1  # las celdas se indexan con un entero x << _Y_BITS | y (más compacto que una tupla)
+_Y_MASK = (1 << _Y_BITS) - 1
+
+
+def cell_xy(lat: float, lon: float, level: int) -> tuple:
+    """Celda (x, y) que contiene el punto en el nivel indicado."""
+    n = 1 << level
+    lat = max(-_MAX_LAT, min(_MAX_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    rad = math.radians(lat)
+    y = int((1.0 - math.log(math.tan(rad) + 1.0 / math.cos(rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+class _Cell:
+    __slots__ = ("count", "sum_lat", "sum_lon", "rep")
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+        self.rep = None  # id del punto representativo
+
+
+class ClusterGrid:
+    """Celdas por nivel con conteo, centroide y representativo. Seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.points = {}  # id -> (lat, lon, puntaje, datos)
+        self.levels = {level: {} for level in range(MIN_LEVEL, MAX_LEVEL + 1)}
+        self._members = {}  # celda del nivel más fino -> ids
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def upsert(self, point_id: int, lat: float, lon: float, score: float, data=None) -> None:
+        with self._lock:
+            if point_id in self.points:
+                self._remove(point_id)
+            self._add(point_id, lat, lon, score, data)
+
+    def remove(self, point_id: int) -> None:
+        with self._lock:
+            if point_id in self.points:
+                self._remove(point_id)
+
+    def _add(self, point_id, lat, lon, score, data) -> None:
+        self.points[point_id] = (lat, lon, score, data)
+        x, y = cell_xy(lat, lon, MAX_LEVEL)
+        self._members.setdefault(x << _Y_BITS | y, set()).add(point_id)
+        for level in range(MAX_LEVEL, MIN_LEVEL - 1, -1):
+            shift = MAX_LEVEL - level
+            cells = self.levels[level]
+            key = (x >> shift) << _Y_BITS | (y >> shift)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = _Cell()
+            cell.count += 1
+            cell.sum_lat += lat
+            cell.sum_lon += lon
+            if cell.rep is None or self._better(point_id, cell.rep):
+                cell.rep = point_id
+
+    def _remove(self, point_id) -> None:
+        lat, lon, _, _ = self.points[point_id]
+        x, y = cell_xy(lat, lon, MAX_LEVEL)
+        members = self._members[x << _Y_BITS | y]
+        members.discard(point_id)
+        if not members:
+            del self._members[x << _Y_BITS | y]
+        del self.points[point_id]
+        # De la celda más fina a la más gruesa: las hijas ya tienen su representativo recalculado
+        for level in range(MAX_LEVEL, MIN_LEVEL - 1, -1):
+            shift = MAX_LEVEL - level
+            cells = self.levels[level]
+            key = (x >> shift) << _Y_BITS | (y >> shift)
+            cell = cells[key]
+            cell.count -= 1
+            if cell.count == 0:
+                del cells[key]
+                continue
+            cell.sum_lat -= lat
+            cell.sum_lon -= lon
+            if cell.rep == point_id:
+                cell.rep = self._best_of(level, key)
+
+    def _better(self, a: int, b: int) -> bool:
+        """Mayor puntaje; a igual puntaje, menor id (determinista)."""
+        score_a, score_b = self.points[a][2], self.points[b][2]
+        return score_a > score_b or (score_a == score_b and a < b)
+
+    def _best_of(self, level: int, key: int):
+        if level == MAX_LEVEL:
+            candidates = self._members.get(key, ())
+        else:
+            children = self.levels[level + 1]
+            x, y = key >> _Y_BITS, key & _Y_MASK
+            candidates = [children[(2 * x + dx) << _Y_BITS | (2 * y + dy)].rep
+                          for dx in (0, 1) for dy in (0, 1) if ((2 * x + dx) << _Y_BITS | (2 * y + dy)) in children]
+        best = None
+        for candidate in candidates:
+            if best is None or self._better(candidate, best):
+                best = candidate
+        return best
+
+    def clusters(self, level: int, west: float, south: float, east: float, north: float) -> list:
+        """
+        Celdas del nivel que intersectan el rectángulo, como
+        [(conteo, lat_centroide, lon_centroide, id_representativo, datos_representativo)].
+        """
+        level = max(MIN_LEVEL, min(MAX_LEVEL, level))
+        x0, y0 = cell_xy(north, west, level)
+        x1, y1 = cell_xy(south, east, level)
+        with self._lock:
+            cells = self.levels[level]
+            # Con zoom muy alejado hay más celdas en el rectángulo que celdas ocupadas
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+                keys = [k for k in cells if x0 <= k >> _Y_BITS <= x1 and y0 <= k & _Y_MASK <= y1]
+            else:
+                keys = [x << _Y_BITS | y for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)
+                        if x << _Y_BITS | y in cells]
+            result = []
+            for key in keys:
+                cell = cells[key]
+                result.append((cell.count, cell.sum_lat / cell.count, cell.sum_lon / cell.count,
+                               cell.rep, self.points[cell.rep][3]))
+        return result
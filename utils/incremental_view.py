@@ -0,0 +1,113 @@
+"""
+Estructuras en memoria derivadas de un modelo y mantenidas al día.
+
+Un IncrementalView envuelve una estructura por proceso (índice de búsqueda,
+grilla de clusters, ...) con el ciclo de vida común:
+    - se construye en el primer uso con `build(session)`;
+    - build y apply leen siempre del primario (una réplica atrasada dejaría
+      la estructura desactualizada hasta la siguiente reconstrucción);
+    - la construcción en una petición no respeta el plazo de la petición
+      (utils.deadlines): cortada a medias se repetiría en cada petición;
+    - los registros creados/modificados/eliminados en este proceso (vía
+      utils.change_events) se aplican en el siguiente uso con
+      `apply(estructura, session, ids)`;
+    - se reconstruye en segundo plano cuando supera `max_age` segundos (para
+      recoger cambios de otros workers), tras un cambio masivo o cuando
+      `needs_rebuild(estructura)` lo pide. Mientras tanto se sigue usando la
+      estructura anterior.
+"""
+import logging
+import threading
+import time
+
+from flask import current_app
+
+from models.db import db
+from utils import change_events
+from utils.deadlines import without_deadline
+from utils.replicas import use_primary
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalView:
+
+    def __init__(self, name: str, model, build, apply, max_age: float, needs_rebuild=None):
+        self.name = name
+        self._build = build
+        self._apply = apply
+        self._needs_rebuild = needs_rebuild
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._value = None
+        self._built_at = 0.0
+        self._pending = set()    # ids a aplicar en el próximo uso
+        self._stale = False      # cambio masivo: hace falta reconstruir
+        self._rebuilding = False
+        self._touched = set()    # ids cambiados durante una reconstrucción en curso
+        change_events.subscribe(model, self._on_change)
+
+    def _on_change(self, changes) -> None:
+        with self._lock:
+            for op, record_id in changes:
+                if op == "bulk":
+                    self._stale = True
+                else:
+                    self._pending.add(record_id)
+                    if self._rebuilding:
+                        self._touched.add(record_id)
+
+    def get(self):
+        """Estructura vigente (requiere app context): la construye si no existe y aplica lo pendiente."""
+        if self._value is None:
+            with self._lock:
+                self._stale = False
+                self._pending.clear()
+            with use_primary(), without_deadline():
+                value = self._timed_build(db.session)
+            with self._lock:
+                if self._value is None:
+                    self._value, self._built_at = value, time.monotonic()
+        with self._lock:
+            value, pending, self._pending = self._value, self._pending, set()
+        if pending:
+            with use_primary():
+                self._apply(value, db.session, pending)
+        self._maybe_schedule_rebuild(value)
+        return value
+
+    def _timed_build(self, session):
+        started = time.perf_counter()
+        value = self._build(session)
+        logger.info("%s construido en %.2fs", self.name, time.perf_counter() - started)
+        return value
+
+    def _maybe_schedule_rebuild(self, value) -> None:
+        with self._lock:
+            due = (self._stale or time.monotonic() - self._built_at > self.max_age
+                   or (self._needs_rebuild is not None and self._needs_rebuild(value)))
+            if not due or self._rebuilding:
+                return
+            self._rebuilding = True
+            self._stale = False
+        threading.Thread(target=self._rebuild_in_background, args=(current_app._get_current_object(),),
+                         name=f"rebuild-{self.name}", daemon=True).start()
+
+    def _rebuild_in_background(self, app) -> None:
+        try:
+            with app.app_context():
+                try:
+                    value = self._timed_build(db.session)
+                finally:
+                    db.session.remove()
+            with self._lock:
+                self._value = value
+                self._built_at = time.monotonic()
+                # Lo cambiado durante la construcción puede no estar en la estructura nueva
+                self._pending |= self._touched
+        except Exception as e:
+            logger.error("Error reconstruyendo %s: %s", self.name, e)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+                self._touched = set()
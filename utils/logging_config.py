@@ -0,0 +1,216 @@
+"""
+Configuración centralizada de logging.
+
+Los registros se encolan en el hilo de la petición (QueueHandler) y un hilo en
+segundo plano (QueueListener) se encarga de formatearlos y escribirlos, de modo
+que el costo de formateo y de E/S no recae sobre la petición.
+
+Cada registro emitido durante una petición incluye su `request_id`
+(ID de correlación asignado por utils/tracing.py).
+
+Variables de entorno:
+    LOG_LEVEL       Nivel raíz (por defecto INFO).
+    LOG_FORMAT      "json" (por defecto) o "text".
+    LOG_SAMPLING    Muestreo por logger, ej: "repositories=0.1,services.user_service=0.5".
+    LOG_RATE_LIMITS Máximo de registros por segundo por logger, ej: "repositories=50".
+
+El muestreo y los límites solo aplican a registros por debajo de WARNING;
+las advertencias y errores siempre se emiten.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+# Atributos estándar de LogRecord; el resto se considera "extra" y va al JSON
+_RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({})).keys()) | {"message", "asctime"}
+_PRIMITIVES = (str, int, float, bool, type(None))
+
+_listener = None
+_extra_listeners = []
+
+# ID de correlación de la petición en curso (lo fija utils/tracing.py)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON."""
+
+    def format(self, record):
+        payload = {
+            "ts": "%s.%03dZ" % (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)), record.msecs),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value if isinstance(value, _PRIMITIVES) else repr(value)
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def _parse_logger_map(raw: str) -> dict:
+    """Convierte "a=0.1,b.c=2" en {"a": 0.1, "b.c": 2.0}."""
+    result = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        try:
+            result[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return result
+
+
+def _match_prefix(name: str, rules: dict):
+    """Devuelve la regla del prefijo de logger más específico que coincide con `name`."""
+    while name:
+        if name in rules:
+            return name, rules[name]
+        name = name.rpartition(".")[0]
+    return None, None
+
+
+class RequestIdFilter(logging.Filter):
+    """Añade el ID de correlación de la petición en curso al registro."""
+
+    def filter(self, record):
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar solo una fracción de los registros de los loggers configurados."""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._random = random.random
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        _, rate = _match_prefix(record.name, self.rates)
+        return rate is None or self._random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket por prefijo de logger: limita registros por segundo."""
+
+    def __init__(self, limits: dict):
+        super().__init__()
+        self.limits = limits
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.limits:
+            return True
+        prefix, limit = _match_prefix(record.name, self.limits)
+        if prefix is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(prefix, (limit, now))
+            tokens = min(limit, tokens + (now - last) * limit)
+            allowed = tokens >= 1
+            self._buckets[prefix] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo de la petición.
+
+    El QueueHandler estándar formatea el mensaje antes de encolarlo. Aquí solo
+    se resuelve el mensaje de forma anticipada cuando los argumentos no son
+    primitivos (p. ej. objetos ORM), para no acceder a ellos desde otro hilo.
+    """
+
+    def prepare(self, record):
+        if record.args and not all(isinstance(a, _PRIMITIVES) for a in _iter_args(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def _iter_args(args):
+    return args.values() if isinstance(args, dict) else args
+
+
+def configure_logging(level: str = None, fmt: str = None, stream=None):
+    """
+    Configura el logger raíz con un QueueHandler y arranca el hilo escritor.
+
+    Es idempotente: si ya se configuró, devuelve el listener existente.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    handler = LazyQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(_parse_logger_map(os.getenv("LOG_SAMPLING"))))
+    handler.addFilter(RateLimitFilter(_parse_logger_map(os.getenv("LOG_RATE_LIMITS"))))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def queued_handler(target: logging.Handler) -> logging.Handler:
+    """
+    Envuelve `target` (ej. un FileHandler propio de un logger) en un
+    QueueHandler con su hilo escritor, para que su E/S tampoco recaiga sobre
+    la petición. El hilo se detiene en shutdown_logging.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+    listener.start()
+    if not _extra_listeners:
+        atexit.register(shutdown_logging)
+    _extra_listeners.append(listener)
+    handler = LazyQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Detiene los hilos escritores vaciando los registros pendientes."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    while _extra_listeners:
+        _extra_listeners.pop().stop()
@@ -0,0 +1,320 @@
+"""
+Métricas en formato de texto de Prometheus.
+
+Incluye contadores e histogramas en memoria, la instrumentación de la app
+Flask (latencia por ruta y sentencias SQL por petición) y la exportación en
+`/metrics`.
+
+Con varios workers de gunicorn cada proceso tiene su propio registro. Si se
+define METRICS_MULTIPROC_DIR, cada worker vuelca periódicamente una
+instantánea JSON a ese directorio y `/metrics` suma las de todos los procesos,
+de modo que cualquier worker que atienda la petición devuelve el total.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"samples": [[list(k), v] for k, v in self._values.items()]}
+
+    @staticmethod
+    def merge(target: dict, snapshot: dict) -> None:
+        for key, value in snapshot["samples"]:
+            key = tuple(key)
+            target[key] = target.get(key, 0) + value
+
+    def render(self, samples: dict) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(samples.items())]
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos y etiquetas."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [conteo por bucket..., +Inf, suma]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"samples": [[list(k), list(v)] for k, v in self._values.items()]}
+
+    @staticmethod
+    def merge(target: dict, snapshot: dict) -> None:
+        for key, state in snapshot["samples"]:
+            key = tuple(key)
+            current = target.get(key)
+            target[key] = state if current is None else [a + b for a, b in zip(current, state)]
+
+    def render(self, samples: dict) -> list:
+        lines = []
+        for key, state in sorted(samples.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+                cumulative += count
+                le = f'le="{bound}"' if bound == "+Inf" else f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Registro de métricas del proceso con volcado opcional multiproceso."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._metrics.get(name) or self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.get(name) or self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # ---- Multiproceso ----
+    @staticmethod
+    def multiproc_dir():
+        return os.getenv("METRICS_MULTIPROC_DIR")
+
+    def flush(self, force: bool = False) -> None:
+        """Vuelca la instantánea del proceso si ha pasado el intervalo configurado."""
+        directory = self.multiproc_dir()
+        if not directory:
+            return
+        now = time.monotonic()
+        interval = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+        if not force and now - self._last_flush < interval:
+            return
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_flush = now
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as fh:
+                json.dump(self.snapshot(), fh)
+            os.replace(tmp_path, path)
+        finally:
+            self._flush_lock.release()
+
+    def _collect(self) -> dict:
+        """Suma las instantáneas de todos los procesos (o solo la local)."""
+        directory = self.multiproc_dir()
+        if directory:
+            self.flush(force=True)
+            snapshots = []
+            for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+                try:
+                    with open(path) as fh:
+                        snapshots.append(json.load(fh))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots = [self.snapshot()]
+
+        merged = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, data in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is not None:
+                    metric.merge(merged[name], data)
+        return merged
+
+    def render(self) -> str:
+        """Texto de exposición de Prometheus (versión 0.0.4)."""
+        merged = self._collect()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(merged[name]))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+atexit.register(registry.flush, True)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Peticiones HTTP atendidas.", ("blueprint", "route", "method", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP.", ("blueprint", "route", "method"))
+HTTP_DB_STATEMENTS = registry.histogram(
+    "http_request_db_statements", "Sentencias SQL ejecutadas por petición.", ("blueprint", "route", "method"),
+    buckets=COUNT_BUCKETS)
+HTTP_DB_SECONDS = registry.histogram(
+    "http_request_db_duration_seconds", "Tiempo total en base de datos por petición.", ("blueprint", "route", "method"))
+DB_STATEMENT_SECONDS = registry.histogram(
+    "db_statement_duration_seconds", "Duración de cada sentencia SQL.", ("operation",))
+EMAIL_SEND_SECONDS = registry.histogram(
+    "email_send_duration_seconds", "Duración del envío de emails por SMTP.", ("result",))
+DB_TX_RETRIES = registry.counter(
+    "db_transaction_retries_total", "Transacciones reintentadas por error transitorio.", ("operation", "reason"))
+DB_TX_FAILURES = registry.counter(
+    "db_transaction_failures_total", "Transacciones fallidas por error transitorio tras agotar los reintentos.",
+    ("operation", "reason"))
+REQUEST_DEADLINE_EXCEEDED = registry.counter(
+    "request_deadline_exceeded_total", "Plazos de petición vencidos, por endpoint y etapa.", ("endpoint", "stage"))
+ADMISSION_DECISIONS = registry.counter(
+    "admission_decisions_total", "Peticiones admitidas o descartadas por el control de admisión.",
+    ("priority", "result"))
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_wait_seconds", "Espera para obtener una conexión del pool.", ("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+COALESCED_REQUESTS = registry.counter(
+    "coalesced_requests_total", "Lecturas agrupadas: líder, seguidora, acierto de microcaché u omitida.",
+    ("cache", "result"))
+RATE_LIMITED = registry.counter(
+    "rate_limited_total", "Peticiones rechazadas con 429 por regla y dimensión del límite.", ("rule", "dimension"))
+COMPRESSION_BYTES = registry.counter(
+    "http_compression_bytes_total", "Bytes de las respuestas comprimidas, antes y después.", ("encoding", "stage"))
+COMPRESSION_SECONDS = registry.histogram(
+    "http_compression_duration_seconds", "Tiempo de CPU comprimiendo respuestas.", ("encoding",),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+COMPRESSION_CACHE = registry.counter(
+    "http_compression_cache_total", "Búsquedas (hit, miss) y recompresiones en el caché de respuestas precomprimidas.", ("result",))
+JOB_RUNS = registry.counter(
+    "scheduled_job_runs_total", "Ejecuciones de tareas programadas por resultado (ok, error, missed).", ("job", "result"))
+JOB_DURATION = registry.histogram(
+    "scheduled_job_duration_seconds", "Duración de las tareas programadas.", ("job",),
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+SSE_STREAMS = registry.counter(
+    "sse_streams_total", "Streams SSE abiertos y cerrados.", ("stream", "event"))
+SSE_EVENTS = registry.counter(
+    "sse_events_total", "Eventos SSE entregados o descartados (cola llena) por suscriptor.", ("stream", "result"))
+
+
+# =========================
+# Instrumentación SQLAlchemy
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_STATEMENT_SECONDS.observe(elapsed, operation=operation)
+    if has_request_context() and "metrics_start" in g:
+        g.metrics_db_statements += 1
+        g.metrics_db_seconds += elapsed
+
+
+def _instrument_engines() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# =========================
+# Instrumentación Flask
+# =========================
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+    g.metrics_db_statements = 0
+    g.metrics_db_seconds = 0.0
+
+
+def _record_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    labels = {
+        "blueprint": request.blueprint or "app",
+        "route": request.url_rule.rule if request.url_rule else "unmatched",
+        "method": request.method,
+    }
+    HTTP_LATENCY.observe(time.perf_counter() - start, **labels)
+    HTTP_DB_STATEMENTS.observe(g.metrics_db_statements, **labels)
+    HTTP_DB_SECONDS.observe(g.metrics_db_seconds, **labels)
+    HTTP_REQUESTS.inc(status=str(response.status_code), **labels)
+    registry.flush()
+    return response
+
+
+def init_metrics(app) -> None:
+    """Registra los hooks de medición en la app y en los engines de SQLAlchemy."""
+    _instrument_engines()
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
@@ -0,0 +1,190 @@
+"""
+Límite de peticiones con token buckets compartidos entre los workers del host.
+
+Los buckets viven en un archivo mapeado en memoria (RATE_LIMIT_FILE; por
+defecto en el directorio temporal, mejor en /dev/shm) que comparten todos
+los workers de gunicorn del host, sin servicio externo. El archivo es una
+tabla hash de tamaño fijo (RATE_LIMIT_SLOTS) agrupada en grupos de
+_PROBE entradas; cada entrada guarda el hash de la clave, las fichas y la
+hora de la última actualización. Cada consulta bloquea solo su grupo con
+un lock de registro de fcntl (entre procesos) y un lock del proceso
+(fcntl no excluye entre hilos de un mismo proceso): unos pocos
+microsegundos por petición.
+
+Si el grupo está lleno se reutiliza la entrada menos reciente (un bucket
+inactivo ya estaría lleno de nuevo, así que reemplazarlo no cambia nada).
+
+Reglas (`@rate_limited("login")`), cada una con varias dimensiones:
+    - login: por IP (RATE_LIMIT_LOGIN_IP) y por nombre de usuario
+      (RATE_LIMIT_LOGIN_USER, frena el credential stuffing desde muchas IP);
+    - reservation: por usuario (RATE_LIMIT_RESERVATION_USER) y por IP
+      (RATE_LIMIT_RESERVATION_IP).
+Formato "peticiones/segundos": ráfaga de hasta `peticiones` que se recarga
+a ese ritmo. Al superarlo la respuesta es 429 con Retry-After.
+
+Detrás de un proxy (Railway, nginx) usar RATE_LIMIT_TRUST_PROXY=1 para
+tomar la IP de X-Forwarded-For. Sin fcntl (Windows) los buckets son por
+proceso. RATE_LIMIT_ENABLED=0 lo desactiva.
+"""
+import functools
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+from utils.metrics import RATE_LIMITED
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_FILE = os.getenv("RATE_LIMIT_FILE", os.path.join(tempfile.gettempdir(), "partyfinder_ratelimit.bin"))
+RATE_LIMIT_SLOTS = int(os.getenv("RATE_LIMIT_SLOTS", "65536"))
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+
+_SLOT = struct.Struct("<Qdd")  # hash de la clave, fichas, última actualización (epoch)
+_PROBE = 8
+
+
+def _parse_spec(spec: str) -> tuple:
+    """"10/60" -> (ritmo por segundo, ráfaga)."""
+    count, seconds = spec.split("/")
+    return float(count) / float(seconds), float(count)
+
+
+RULES = {
+    "login": (
+        ("ip", _parse_spec(os.getenv("RATE_LIMIT_LOGIN_IP", "20/60"))),
+        ("username", _parse_spec(os.getenv("RATE_LIMIT_LOGIN_USER", "5/60"))),
+    ),
+    "reservation": (
+        ("user", _parse_spec(os.getenv("RATE_LIMIT_RESERVATION_USER", "10/60"))),
+        ("ip", _parse_spec(os.getenv("RATE_LIMIT_RESERVATION_IP", "30/60"))),
+    ),
+}
+
+
+class SharedBuckets:
+    """Token buckets en memoria compartida. Seguro entre hilos y procesos."""
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self._groups = max(1, slots // _PROBE)
+        self._size = self._groups * _PROBE * _SLOT.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._mm = None
+
+    def _open(self) -> None:
+        # Tras un fork (workers de gunicorn) cada proceso abre su propio mapeo
+        if self._pid == os.getpid():
+            return
+        if fcntl is None:
+            self._mm = bytearray(self._size)
+        else:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < self._size:
+                os.ftruncate(fd, self._size)
+            self._fd, self._mm = fd, mmap.mmap(fd, self._size)
+        self._pid = os.getpid()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Consume una ficha del bucket de `key`: 0 si había, o segundos hasta la próxima."""
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        group = h % self._groups
+        base = group * _PROBE * _SLOT.size
+        now = time.time()
+        with self._lock:
+            self._open()
+            if self._fd is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, group)
+            try:
+                mm = self._mm
+                victim, victim_updated = base, math.inf
+                for i in range(_PROBE):
+                    offset = base + i * _SLOT.size
+                    slot_hash, tokens, updated = _SLOT.unpack_from(mm, offset)
+                    if slot_hash == h:
+                        break
+                    if updated < victim_updated:
+                        victim, victim_updated = offset, updated
+                else:
+                    offset, tokens, updated = victim, burst, now
+                tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                if tokens >= 1.0:
+                    tokens -= 1.0
+                    wait = 0.0
+                else:
+                    wait = (1.0 - tokens) / rate
+                _SLOT.pack_into(mm, offset, h, tokens, now)
+                return wait
+            finally:
+                if self._fd is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, group)
+
+
+_buckets = SharedBuckets(RATE_LIMIT_FILE, RATE_LIMIT_SLOTS)
+
+
+def client_ip() -> str:
+    """IP del cliente (la añadida por el proxy de confianza con RATE_LIMIT_TRUST_PROXY)."""
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.remote_addr or "unknown"
+
+
+def _dimension_value(dimension: str):
+    if dimension == "ip":
+        return client_ip()
+    if dimension == "user":
+        return get_jwt_identity()
+    if dimension == "username":
+        username = (request.get_json(silent=True) or {}).get("username")
+        return username.strip().lower() if isinstance(username, str) and username.strip() else None
+    raise ValueError(f"Dimensión de límite desconocida: {dimension}")
+
+
+def rate_limited(rule: str):
+    """
+    Aplica la regla a la vista antes de ejecutarla. Con la dimensión "user"
+    debe ir debajo de @jwt_required().
+    """
+    dimensions = RULES[rule]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if ENABLED:
+                wait = 0.0
+                for dimension, (rate, burst) in dimensions:
+                    value = _dimension_value(dimension)
+                    if value is None:
+                        continue
+                    dimension_wait = _buckets.take(f"{rule}:{dimension}:{value}", rate, burst)
+                    if dimension_wait:
+                        RATE_LIMITED.inc(rule=rule, dimension=dimension)
+                        wait = max(wait, dimension_wait)
+                if wait:
+                    logger.warning("Límite %s superado (IP %s)", rule, client_ip())
+                    response = jsonify({"error": "Demasiadas peticiones, intenta más tarde"})
+                    response.status_code = 429
+                    response.headers["Retry-After"] = str(math.ceil(wait))
+                    return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,245 @@
+"""
+Enrutamiento de lecturas a réplicas.
+
+Con REPLICA_URLS (URLs separadas por comas) cada réplica se registra como un
+bind de Flask-SQLAlchemy ("replica_0", "replica_1", ...) y `RoutingSession`
+(la clase de `db.session`) elige el engine de cada sentencia:
+
+    - primario: peticiones que no son GET/HEAD, código fuera de una petición
+      (hilos de fondo, scripts), sentencias de escritura o FOR UPDATE, una
+      sesión que ya escribió, bloques `use_primary()`;
+    - réplica: el resto de lecturas de GET/HEAD, siempre que la réplica esté
+      sana y al día. Cada sesión (una por petición) usa una sola réplica.
+
+Retraso: un hilo por worker escribe cada REPLICA_CHECK_INTERVAL segundos un
+latido (hora del primario) en `replica_heartbeat` y lo lee en cada réplica.
+Una réplica con el latido más viejo que REPLICA_MAX_LAG segundos, o que no
+responde, deja de recibir lecturas hasta recuperarse.
+
+Leer lo propio escrito: tras una petición que confirma escrituras la
+respuesta lleva la cookie `pf_read_after` y el header `X-Write-Timestamp`
+(hora del commit). Mientras el cliente los devuelva (cookie o header
+`X-Read-After`) solo se usan réplicas cuyo latido ya alcanzó esa hora; si
+ninguna lo alcanzó, la lectura va al primario.
+
+Sin REPLICA_URLS no cambia nada: todo va al primario.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session as OrmSession
+
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "1"))
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "60"))
+READ_AFTER_COOKIE = "pf_read_after"
+READ_AFTER_HEADER = "X-Read-After"
+WRITE_TIMESTAMP_HEADER = "X-Write-Timestamp"
+
+_BIND_PREFIX = "replica_"
+_READ_METHODS = frozenset(("GET", "HEAD"))
+_ROUTE_KEY = "replica_route"      # session.info: engine elegido para las lecturas de la sesión
+_WROTE_KEY = "replica_wrote"      # session.info: la sesión escribió
+_PRIMARY_KEY = "replica_primary"  # session.info: bloques use_primary() abiertos
+
+DB_READ_ROUTES = registry.counter(
+    "db_read_routes_total", "Sesiones de lectura por destino y motivo.", ("target", "reason"))
+
+
+class _Replica:
+    __slots__ = ("name", "healthy", "applied_at", "lag")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.healthy = False    # hasta el primer chequeo
+        self.applied_at = 0.0   # latido más reciente visto en la réplica (epoch)
+        self.lag = None
+
+
+class _Router:
+
+    def __init__(self):
+        self.replicas = []
+        self._app = None
+        self._monitor = None
+        self._lock = threading.Lock()
+
+    def configure(self, app, urls: list) -> None:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        for i, url in enumerate(urls):
+            binds[f"{_BIND_PREFIX}{i}"] = url
+        app.config["SQLALCHEMY_BINDS"] = binds
+        self.replicas = [_Replica(f"{_BIND_PREFIX}{i}") for i in range(len(urls))]
+        self._app = app
+
+    def ensure_monitor(self) -> None:
+        if self._monitor is None:
+            with self._lock:
+                if self._monitor is None:
+                    self._monitor = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+                    self._monitor.start()
+
+    def _run(self) -> None:
+        from models.db import db
+        with self._app.app_context():
+            while True:
+                try:
+                    self.check(db.engines)
+                except Exception as e:
+                    logger.error("Error en el chequeo de réplicas: %s", e)
+                time.sleep(REPLICA_CHECK_INTERVAL)
+
+    def check(self, engines) -> None:
+        """Escribe el latido en el primario y mide el de cada réplica."""
+        now = time.time()
+        with engines[None].begin() as conn:
+            updated = conn.execute(
+                text("UPDATE replica_heartbeat SET beat_at = :now WHERE id = 1 AND beat_at < :stale"),
+                {"now": now, "stale": now - REPLICA_CHECK_INTERVAL / 2},
+            ).rowcount
+            if not updated and conn.execute(text("SELECT 1 FROM replica_heartbeat WHERE id = 1")).first() is None:
+                conn.execute(text("INSERT INTO replica_heartbeat (id, beat_at) VALUES (1, :now)"), {"now": now})
+        for replica in self.replicas:
+            try:
+                with engines[replica.name].connect() as conn:
+                    beat = conn.execute(text("SELECT beat_at FROM replica_heartbeat WHERE id = 1")).scalar()
+                replica.applied_at = beat or 0.0
+                replica.lag = time.time() - replica.applied_at
+                healthy = replica.lag <= REPLICA_MAX_LAG
+            except Exception as e:
+                logger.debug("Réplica %s no disponible: %s", replica.name, e)
+                replica.lag = None
+                healthy = False
+            if healthy != replica.healthy:
+                if healthy:
+                    logger.info("Réplica %s disponible (retraso %.1fs)", replica.name, replica.lag)
+                else:
+                    logger.warning("Réplica %s fuera de servicio (retraso %s)", replica.name,
+                                   f"{replica.lag:.1f}s" if replica.lag is not None else "desconocido")
+                replica.healthy = healthy
+
+    def choose(self, session):
+        """Engine de réplica para las lecturas de la sesión, o None para el primario."""
+        route = session.info.get(_ROUTE_KEY)
+        if route is None:
+            route = session.info[_ROUTE_KEY] = self._decide(session)
+        return route
+
+    def _decide(self, session):
+        if not self.replicas or not has_request_context():
+            return False
+        if request.method not in _READ_METHODS:
+            DB_READ_ROUTES.inc(target="primary", reason="write_request")
+            return False
+        self.ensure_monitor()
+        read_after = _read_after()
+        candidates = [r for r in self.replicas if r.healthy]
+        if not candidates:
+            DB_READ_ROUTES.inc(target="primary", reason="no_healthy_replica")
+            return False
+        if read_after:
+            candidates = [r for r in candidates if r.applied_at >= read_after]
+            if not candidates:
+                DB_READ_ROUTES.inc(target="primary", reason="read_your_writes")
+                return False
+        replica = random.choice(candidates)
+        DB_READ_ROUTES.inc(target="replica", reason="read")
+        return session._db.engines[replica.name]
+
+    def status(self) -> list:
+        return [{"name": r.name, "healthy": r.healthy, "lag_seconds": round(r.lag, 3) if r.lag is not None else None}
+                for r in self.replicas]
+
+
+_router = _Router()
+
+
+def _read_after() -> float:
+    value = request.headers.get(READ_AFTER_HEADER) or request.cookies.get(READ_AFTER_COOKIE)
+    try:
+        read_after = float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+    # Pasado el tiempo de fijación ya no obliga (las réplicas con más retraso se descartan igualmente)
+    return read_after if time.time() - read_after < REPLICA_PIN_SECONDS else 0.0
+
+
+class RoutingSession(Session):
+    """Sesión de Flask-SQLAlchemy que envía las lecturas de GET a una réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and _router.replicas and not self._flushing and not self.info.get(_WROTE_KEY)
+                and not self.info.get(_PRIMARY_KEY)
+                and not (clause is not None and (getattr(clause, "is_dml", False)
+                                                 or getattr(clause, "_for_update_arg", None) is not None))):
+            engine = _router.choose(self)
+            if engine:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def use_primary(session=None):
+    """Fuerza las lecturas del bloque al primario (ej. datos que deben estar al día al instante)."""
+    if session is None:
+        from models.db import db
+        session = db.session()
+    session.info[_PRIMARY_KEY] = session.info.get(_PRIMARY_KEY, 0) + 1
+    try:
+        yield session
+    finally:
+        session.info[_PRIMARY_KEY] -= 1
+
+
+def replica_status() -> list:
+    """Estado de las réplicas de este worker (para /health)."""
+    return _router.status()
+
+
+def _after_flush(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+def _after_commit(session):
+    if session.info.get(_WROTE_KEY) and has_request_context():
+        g.replica_write_at = time.time()
+
+
+def _set_read_after(response):
+    write_at = g.pop("replica_write_at", None)
+    if write_at is not None:
+        response.headers[WRITE_TIMESTAMP_HEADER] = f"{write_at:.3f}"
+        response.set_cookie(READ_AFTER_COOKIE, f"{write_at:.3f}", max_age=REPLICA_PIN_SECONDS, httponly=True,
+                            samesite="Lax")
+    return response
+
+
+def init_replicas(app) -> None:
+    """Configura las réplicas de REPLICA_URLS (llamar antes de db.init_app)."""
+    urls = [url.strip() for url in os.getenv("REPLICA_URLS", "").split(",") if url.strip()]
+    if not urls:
+        return
+    urls = [url.replace("mysql://", "mysql+pymysql://", 1) if url.startswith("mysql://") else url for url in urls]
+    import models.replica_heartbeat  # noqa: F401  (crea la tabla del latido en el primario)
+    _router.configure(app, urls)
+    event.listen(OrmSession, "after_flush", _after_flush)
+    event.listen(OrmSession, "do_orm_execute", _do_orm_execute)
+    event.listen(OrmSession, "after_commit", _after_commit)
+    app.after_request(_set_read_after)
+    logger.info("Lecturas de GET enrutadas a %s réplica(s)", len(urls))
@@ -0,0 +1,182 @@
+"""
+Perfilado de CPU bajo demanda para una petición concreta.
+
+Un administrador (ver utils/auth.py) activa el perfilado enviando el header
+`X-Profile: 1` o el parámetro `?_profile=1` junto con su JWT. La petición se
+ejecuta bajo cProfile y el resultado se guarda en PROFILE_DIR como un archivo
+`.prof` (formato pstats) con un `.json` de metadatos al lado. Solo se
+conservan los PROFILE_MAX_FILES perfiles más recientes.
+
+Cuando la petición no lo solicita, el hook solo comprueba un header y un
+parámetro; no se crea ningún profiler.
+
+Solo se perfila una petición a la vez por proceso (cProfile no admite dos
+perfiles activos y con hilos se mezclarían): si ya hay otra en curso, la
+petición se atiende sin perfilar y la respuesta lo indica con el header
+`X-Profile-Skipped`.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from utils.auth import is_admin_identity
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "_profile"
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls")
+_PROFILE_ID = re.compile(r"^[\w.-]+$")
+_profiling_lock = threading.Lock()
+
+
+def profile_dir() -> str:
+    return os.path.abspath(os.getenv("PROFILE_DIR", "profiles"))
+
+
+def _requested() -> bool:
+    return request.headers.get(PROFILE_HEADER) == "1" or request.args.get(PROFILE_QUERY_PARAM) == "1"
+
+
+def _start_profiler():
+    if not _requested():
+        return
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if not is_admin_identity(identity):
+        logger.warning("Perfilado solicitado sin permisos de administrador en %s", request.path)
+        return
+
+    if not _profiling_lock.acquire(blocking=False):
+        logger.info("Perfilado omitido en %s: ya hay otro perfil en curso", request.path)
+        g.profiler_skipped = "otro perfil en curso"
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Otra herramienta de perfilado activa en el proceso
+        _profiling_lock.release()
+        logger.warning("Perfilado omitido en %s: %s", request.path, e)
+        g.profiler_skipped = str(e)
+        return
+    g.profiler_identity = identity
+    g.profiler_started = time.perf_counter()
+    g.profiler = profiler
+
+
+def _stop_profiler(response):
+    skipped = g.pop("profiler_skipped", None)
+    if skipped is not None:
+        response.headers["X-Profile-Skipped"] = skipped
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    _profiling_lock.release()
+    duration_ms = (time.perf_counter() - g.pop("profiler_started")) * 1000
+
+    profile_id = "{}_{}_{}".format(
+        datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"),
+        (request.endpoint or "unmatched").replace(".", "-"),
+        uuid.uuid4().hex[:8],
+    )
+    metadata = {
+        "id": profile_id,
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "duration_ms": round(duration_ms, 3),
+        "user_id": g.pop("profiler_identity", None),
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    try:
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+        with open(os.path.join(directory, f"{profile_id}.json"), "w") as fh:
+            json.dump(metadata, fh)
+        _apply_retention(directory)
+        response.headers["X-Profile-Id"] = profile_id
+        logger.info("Perfil guardado: %s (%.1f ms)", profile_id, duration_ms)
+    except OSError as e:
+        logger.error("No se pudo guardar el perfil: %s", e)
+    return response
+
+
+def _discard_profiler(exc):
+    """Garantiza que el profiler no quede activo si la respuesta no llegó a generarse."""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        _profiling_lock.release()
+
+
+def _apply_retention(directory: str) -> None:
+    """Elimina los perfiles más antiguos por encima de PROFILE_MAX_FILES."""
+    max_files = int(os.getenv("PROFILE_MAX_FILES", "50"))
+    profiles = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".prof"))
+    for profile_id in profiles[:-max_files] if max_files > 0 else profiles:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(directory, profile_id + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> list:
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    result = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                result.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return result
+
+
+def profile_path(profile_id: str):
+    """Ruta del archivo .prof de un perfil, o None si no existe o el id no es válido."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(profile_dir(), f"{profile_id}.prof")
+    return path if os.path.isfile(path) else None
+
+
+def render_profile(profile_id: str, sort: str = "cumulative", limit: int = 40):
+    """Resumen en texto (pstats) de un perfil guardado."""
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+def init_request_profiler(app) -> None:
+    """Registra los hooks de perfilado bajo demanda."""
+    app.before_request(_start_profiler)
+    app.after_request(_stop_profiler)
+    app.teardown_request(_discard_profiler)
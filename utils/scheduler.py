@@ -0,0 +1,284 @@
+"""
+Tareas programadas dentro de los workers, con elección de líder por la base de datos.
+
+Las tareas se declaran con `@job("nombre", "cron")` (cron de 5 campos:
+minuto hora día-del-mes mes día-de-la-semana, con *, listas, rangos y
+pasos, en la zona SCHEDULER_TZ). Cada worker de gunicorn arranca un hilo
+(`start_scheduler`, desde gunicorn.conf.py) que cada SCHEDULER_TICK
+segundos mira qué ejecuciones programadas vencieron.
+
+Una ejecución programada (slot: la hora en que tocaba) se ejecuta una sola
+vez entre todos los workers y hosts: el worker que logra el UPDATE
+condicional sobre su fila de `scheduled_jobs` (slot aún no completado y sin
+lease vigente) la ejecuta y renueva el lease mientras dura; el resto lo
+ve ocupado o ya hecho. Si el worker muere a mitad, el lease vence y otro
+la retoma (las tareas deben ser idempotentes). Una ejecución no reclamada
+en SCHEDULER_MISFIRE_GRACE segundos (ej. todo apagado) se descarta: cuenta
+la siguiente.
+
+Scripts, benchmarks y tests importan la app sin arrancar el hilo.
+SCHEDULER_ENABLED=0 lo desactiva también en los workers.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.db import db
+from models.scheduled_job import ScheduledJob
+from utils.metrics import JOB_DURATION, JOB_RUNS
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
+SCHEDULER_TZ = ZoneInfo(os.getenv("SCHEDULER_TZ", "America/Bogota"))
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK", "30"))
+SCHEDULER_LEASE = float(os.getenv("SCHEDULER_LEASE", "300"))
+SCHEDULER_MISFIRE_GRACE = float(os.getenv("SCHEDULER_MISFIRE_GRACE", "3600"))
+
+_FIELDS = (("minuto", 0, 59), ("hora", 0, 23), ("día", 1, 31), ("mes", 1, 12), ("día de la semana", 0, 7))
+
+
+def _parse_field(expr: str, name: str, low: int, high: int) -> frozenset:
+    values = set()
+    for part in expr.split(","):
+        base, _, step = part.partition("/")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start, end = (int(v) for v in base.split("-", 1))
+        else:
+            start = end = int(base)
+            if step:
+                end = high
+        if not (low <= start <= end <= high):
+            raise ValueError(f"Campo {name} fuera de rango: {part}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return frozenset(values)
+
+
+class Cron:
+    """Expresión cron de 5 campos evaluada en SCHEDULER_TZ, con resolución de minutos."""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron de 5 campos esperado: {expression!r}")
+        self.expression = expression
+        minutes, hours, days, months, weekdays = (
+            _parse_field(expr, *spec) for expr, spec in zip(fields, _FIELDS))
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = frozenset(d % 7 for d in weekdays)  # 0 y 7: domingo
+        # Como en cron: si se restringen día del mes y día de la semana, basta con uno
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, timestamp: float) -> float:
+        """Primera hora programada estrictamente posterior a `timestamp` (epoch)."""
+        moment = datetime.fromtimestamp(timestamp, SCHEDULER_TZ).replace(second=0, microsecond=0)
+        moment += timedelta(minutes=1)
+        for _ in range(400 * 24 * 60):
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"El cron {self.expression!r} nunca se cumple")
+
+
+class Job:
+    __slots__ = ("name", "cron", "fn", "next_at", "pending_slot")
+
+    def __init__(self, name: str, cron: Cron, fn):
+        self.name = name
+        self.cron = cron
+        self.fn = fn
+        self.next_at = None
+        self.pending_slot = None
+
+
+class Scheduler:
+
+    def __init__(self):
+        self.jobs = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def job(self, name: str, cron: str):
+        """Registra la función decorada como tarea programada."""
+        def decorator(fn):
+            self.jobs[name] = Job(name, Cron(cron), fn)
+            return fn
+        return decorator
+
+    # ---- Hilo ----
+    def start(self, app) -> None:
+        self._app = app
+        if self._thread is not None or not ENABLED or not self.jobs:
+            return
+        # Tras el fork cada worker tiene su pid
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Planificador iniciado (%s): %s", self.owner, ", ".join(sorted(self.jobs)))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        # Desfase aleatorio para que los workers no consulten todos a la vez
+        self._stop.wait(random.uniform(0, SCHEDULER_TICK))
+        with self._app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self.tick(time.time())
+                except Exception as e:
+                    logger.error("Error en el planificador: %s", e)
+                finally:
+                    db.session.remove()
+                self._stop.wait(SCHEDULER_TICK * random.uniform(0.8, 1.2))
+
+    def tick(self, now: float) -> None:
+        """Ejecuta las tareas con una ejecución programada vencida que este worker logre reclamar."""
+        for job in self.jobs.values():
+            if job.next_at is None:
+                job.next_at = job.cron.next_after(now)
+            if job.pending_slot is None and job.next_at <= now:
+                # Si se pasaron varias (worker parado), solo cuenta la última
+                slot = job.next_at
+                while (following := job.cron.next_after(slot)) <= now:
+                    slot = following
+                job.pending_slot, job.next_at = slot, job.cron.next_after(slot)
+            if job.pending_slot is None:
+                continue
+            if now - job.pending_slot > SCHEDULER_MISFIRE_GRACE:
+                logger.warning("Tarea %s: ejecución de las %s descartada (sin reclamar a tiempo)",
+                               job.name, datetime.fromtimestamp(job.pending_slot, SCHEDULER_TZ))
+                JOB_RUNS.inc(job=job.name, result="missed")
+                job.pending_slot = None
+                continue
+            state = self._claim(job.name, job.pending_slot, now)
+            if state == "busy":
+                continue  # otro worker la está ejecutando: se vuelve a mirar en el próximo tick
+            if state == "claimed":
+                self._execute(job, job.pending_slot)
+            job.pending_slot = None
+
+    # ---- Lock en la base de datos ----
+    def _claim(self, name: str, slot: float, now: float) -> str:
+        """"claimed" si este worker ejecuta el slot, "done" si ya se hizo, "busy" si otro lo tiene."""
+        with db.engine.begin() as conn:
+            claimed = conn.execute(
+                update(ScheduledJob)
+                .where(ScheduledJob.name == name, ScheduledJob.done_slot < slot, ScheduledJob.lease_until < now)
+                .values(owner=self.owner, lease_until=now + SCHEDULER_LEASE, started_at=now)
+            ).rowcount
+            if claimed:
+                return "claimed"
+            row = conn.execute(select(ScheduledJob.done_slot).where(ScheduledJob.name == name)).first()
+        if row is None:
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(ScheduledJob).values(name=name, lease_until=0.0, done_slot=0.0))
+            except IntegrityError:
+                pass  # otro worker la creó a la vez
+            return self._claim(name, slot, now)
+        return "done" if row.done_slot >= slot else "busy"
+
+    def _renew_lease(self, name: str, running: threading.Event) -> None:
+        while not running.wait(SCHEDULER_LEASE / 3):
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(update(ScheduledJob)
+                                 .where(ScheduledJob.name == name, ScheduledJob.owner == self.owner)
+                                 .values(lease_until=time.time() + SCHEDULER_LEASE))
+            except Exception as e:
+                logger.error("No se pudo renovar el lease de %s: %s", name, e)
+
+    def _execute(self, job: Job, slot: float) -> None:
+        finished = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(job.name, finished),
+                                   name=f"lease-{job.name}", daemon=True)
+        renewer.start()
+        started = time.perf_counter()
+        status, error = "ok", None
+        logger.info("Tarea %s: inicio (programada %s)", job.name, datetime.fromtimestamp(slot, SCHEDULER_TZ))
+        try:
+            result = job.fn()
+            if isinstance(result, dict) and "error" in result:
+                status, error = "error", str(result["error"])
+            else:
+                logger.info("Tarea %s: fin en %.1fs: %s", job.name, time.perf_counter() - started, result)
+        except Exception as e:
+            status, error = "error", str(e)
+        finally:
+            db.session.rollback()
+            finished.set()
+            renewer.join()
+        if error:
+            logger.error("Tarea %s: error: %s", job.name, error)
+        JOB_RUNS.inc(job=job.name, result=status)
+        JOB_DURATION.observe(time.perf_counter() - started, job=job.name)
+        # Un error también completa el slot: se reintenta en la siguiente ejecución programada
+        with db.engine.begin() as conn:
+            conn.execute(update(ScheduledJob)
+                         .where(ScheduledJob.name == job.name, ScheduledJob.owner == self.owner)
+                         .values(done_slot=slot, lease_until=0.0, finished_at=time.time(),
+                                 last_status=status, last_error=error))
+
+    def run_now(self, name: str) -> str:
+        """Ejecuta la tarea ya (requiere app context), con el mismo lock que las programadas."""
+        job = self.jobs[name]
+        now = time.time()
+        state = self._claim(name, now, now)
+        if state == "claimed":
+            self._execute(job, now)
+        return state
+
+    def status_of(self, name: str) -> dict:
+        """Estado de una tarea según la base de datos (requiere app context)."""
+        row = db.session.get(ScheduledJob, name)
+        db.session.refresh(row)
+        return row.to_dict()
+
+    def status(self) -> list:
+        """Estado de las tareas registradas según la base de datos (requiere app context)."""
+        rows = {row.name: row for row in db.session.execute(select(ScheduledJob)).scalars()}
+        return [dict(rows[name].to_dict() if name in rows else {"name": name}, cron=self.jobs[name].cron.expression)
+                for name in sorted(self.jobs)]
+
+
+scheduler = Scheduler()
+job = scheduler.job
+
+
+def init_scheduler(app) -> None:
+    """Registra las tareas de la app (no arranca el hilo: ver start_scheduler)."""
+    import services.scheduled_jobs  # noqa: F401
+    scheduler._app = app
+
+
+def start_scheduler(app=None) -> None:
+    """Arranca el hilo del planificador en este proceso (un worker de gunicorn)."""
+    scheduler.start(app or scheduler._app)
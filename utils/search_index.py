@@ -0,0 +1,184 @@
+"""
+Índice invertido en memoria para búsquedas de texto con prefijos.
+
+Estructura (al estilo de los motores con segmentos):
+    - segmento principal inmutable: vocabulario ordenado y, por token y peso,
+      un array compacto de ids de documento (4 bytes por posting);
+    - delta mutable: postings en dicts para los documentos creados o
+      modificados desde la última construcción;
+    - máscara: documentos del segmento principal que ya no son válidos
+      (modificados, que ahora viven en el delta, o eliminados).
+
+Las actualizaciones solo tocan el delta y la máscara; una reconstrucción
+periódica vuelve a compactar todo en un segmento nuevo.
+
+Tokenización: minúsculas, sin tildes (utils.text.fold), alfanuméricos,
+sin palabras vacías del español. Cada término de la consulta se busca como
+prefijo ("cand" encuentra "candela") y todos deben aparecer (AND).
+
+Relevancia: cada término aporta el peso del campo más relevante en que
+aparece (pesos enteros pequeños, ej. nombre=3); el puntaje es la suma. Como
+hay pocos niveles de peso, el ranking se resuelve con operaciones de
+conjuntos por nivel (en C) en lugar de puntuar documento a documento, y los
+niveles se materializan de mayor a menor solo hasta completar el límite: las
+coincidencias en el nombre rara vez obligan a recorrer las de la descripción.
+"""
+import heapq
+import itertools
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+from utils.text import fold
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a al con de del el en la las lo los o para por que se su sus un una y".split()
+)
+MIN_PREFIX = 2
+MAX_EXPANSIONS = 64
+
+
+def tokenize(text: str) -> list:
+    if not text:
+        return []
+    return [t for t in _TOKEN.findall(fold(text)) if t not in STOPWORDS]
+
+
+def document_tokens(fields: dict, weights: dict) -> dict:
+    """{token: peso} de un documento; el peso de un token es el del campo más relevante en que aparece."""
+    tokens = {}
+    for name, text in fields.items():
+        weight = weights.get(name, 1)
+        for token in tokenize(text):
+            if tokens.get(token, 0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+class Segment:
+    """Segmento inmutable: vocabulario ordenado y postings compactos por peso."""
+
+    __slots__ = ("vocabulary", "postings", "doc_count")
+
+    def __init__(self, documents, weights: dict):
+        builder = {}
+        count = 0
+        for doc_id, fields in documents:
+            count += 1
+            for token, weight in document_tokens(fields, weights).items():
+                by_weight = builder.get(token)
+                if by_weight is None:
+                    by_weight = builder[token] = {}
+                ids = by_weight.get(weight)
+                if ids is None:
+                    ids = by_weight[weight] = array("I")
+                ids.append(doc_id)
+        self.postings = builder  # token -> {peso: array de ids}
+        self.vocabulary = sorted(builder)
+        self.doc_count = count
+
+    def expand(self, prefix: str) -> list:
+        """Tokens del vocabulario que empiezan por `prefix` (como máximo MAX_EXPANSIONS)."""
+        start = bisect_left(self.vocabulary, prefix)
+        matches = []
+        for token in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+
+class InvertedIndex:
+    """Segmento principal + delta mutable. Seguro entre hilos."""
+
+    def __init__(self, segment: Segment, weights: dict):
+        self.segment = segment
+        self.weights = weights
+        self._lock = threading.Lock()
+        self._masked = set()
+        self._delta = {}          # token -> {doc_id: peso}
+        self._delta_docs = {}     # doc_id -> tokens del documento en el delta
+
+    @property
+    def delta_size(self) -> int:
+        return len(self._delta_docs)
+
+    def update(self, doc_id: int, fields) -> None:
+        """Indexa la nueva versión de un documento, o lo elimina si `fields` es None."""
+        tokens = document_tokens(fields, self.weights) if fields is not None else {}
+        with self._lock:
+            self._masked.add(doc_id)
+            for token in self._delta_docs.pop(doc_id, ()):
+                postings = self._delta[token]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._delta[token]
+            if tokens:
+                for token, weight in tokens.items():
+                    self._delta.setdefault(token, {})[doc_id] = weight
+                self._delta_docs[doc_id] = tuple(tokens)
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """[(doc_id, puntaje)] ordenados por relevancia (y por id a igual puntaje)."""
+        terms = [t for t in dict.fromkeys(tokenize(query)) if len(t) >= MIN_PREFIX or t.isdigit()]
+        if not terms:
+            return []
+        ranked = []
+        with self._lock:
+            tiers = [_TermTiers(self, term) for term in terms]
+            if not all(t.levels for t in tiers):
+                return []
+            # Puntajes posibles de mayor a menor; cada combinación de niveles es una intersección
+            by_score = {}
+            for combo in itertools.product(*(t.levels for t in tiers)):
+                by_score.setdefault(sum(combo), []).append(combo)
+            for score in sorted(by_score, reverse=True):
+                docs = set()
+                for combo in by_score[score]:
+                    docs |= set.intersection(*(tier.get(w) for tier, w in zip(tiers, combo)))
+                ranked.extend((doc, score) for doc in heapq.nsmallest(limit - len(ranked), docs))
+                if len(ranked) >= limit:
+                    break
+        return ranked
+
+
+class _TermTiers:
+    """Documentos de un término por nivel de peso, calculados bajo demanda."""
+
+    __slots__ = ("index", "tokens", "delta", "levels", "_exact", "_above")
+
+    def __init__(self, index: InvertedIndex, term: str):
+        self.index = index
+        self.tokens = index.segment.expand(term)
+        self.delta = {}
+        for token, postings in index._delta.items():
+            if token.startswith(term):
+                for doc, weight in postings.items():
+                    self.delta.setdefault(weight, set()).add(doc)
+        levels = set(self.delta)
+        for token in self.tokens:
+            levels.update(index.segment.postings[token])
+        self.levels = sorted(levels, reverse=True)
+        self._exact = {}
+        self._above = set()  # documentos ya asignados a niveles superiores
+
+    def get(self, weight: int) -> set:
+        """Documentos cuyo mejor peso para el término es exactamente `weight`."""
+        if weight not in self._exact:
+            for level in self.levels:
+                if level in self._exact:
+                    continue
+                ids = set()
+                for token in self.tokens:
+                    ids.update(self.index.segment.postings[token].get(level, ()))
+                # La versión vigente de un documento enmascarado, si existe, está en el delta
+                ids -= self.index._masked
+                ids |= self.delta.get(level, set())
+                ids -= self._above
+                self._exact[level] = ids
+                self._above |= ids
+                if level == weight:
+                    break
+        return self._exact[weight]
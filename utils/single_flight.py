@@ -0,0 +1,184 @@
+"""
+Agrupación de lecturas idénticas concurrentes (single flight) con microcaché.
+
+Cuando muchas peticiones piden a la vez lo mismo (ej. el detalle de un bar
+que acaba de publicar una promoción), solo la primera (líder) ejecuta la
+consulta y la serialización; las que llegan mientras tanto esperan y
+reciben los mismos bytes. El resultado se reutiliza además durante
+COALESCE_TTL segundos (0.5 por defecto; 0 solo agrupa las concurrentes).
+
+    - Los cambios confirmados en este proceso invalidan las entradas
+      afectadas (utils.change_events); con varios workers lo desactualizado
+      está acotado por el TTL.
+    - Un error del líder (5xx o excepción) no se comparte ni se guarda: las
+      que esperaban eligen un nuevo líder.
+    - Las peticiones que deben leer lo propio escrito (cookie o header de
+      utils.replicas) no usan el caché.
+    - Solo para vistas públicas: la respuesta (cuerpo y headers, incluidas
+      cookies) no puede depender del usuario.
+
+COALESCE_ENABLED=0 lo desactiva.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+
+from flask import Response, current_app, request
+from werkzeug.http import is_hop_by_hop_header
+
+from utils import change_events
+from utils.deadlines import remaining
+from utils.metrics import COALESCED_REQUESTS
+from utils.replicas import READ_AFTER_COOKIE, READ_AFTER_HEADER
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("COALESCE_ENABLED", "1") != "0"
+COALESCE_TTL = float(os.getenv("COALESCE_TTL", "0.5"))
+COALESCE_MAX_ENTRIES = int(os.getenv("COALESCE_MAX_ENTRIES", "10000"))
+_DEFAULT_WAIT = 10.0
+
+
+class _Call:
+    __slots__ = ("event", "value", "ok", "done", "expires_at")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.ok = False
+        self.done = False
+        self.expires_at = 0.0
+
+
+class SingleFlight:
+    """Ejecuciones en curso y resultados recientes por clave. Seguro entre hilos."""
+
+    def __init__(self, name: str, ttl: float = COALESCE_TTL, shareable=None, max_entries: int = COALESCE_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._shareable = shareable or (lambda value: True)
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout: float = None) -> tuple:
+        """
+        Resultado de `fn()` para `key`, compartido con las llamadas concurrentes.
+        Devuelve (valor, origen) con origen leader, follower, hit o timeout.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None and call.done and call.expires_at <= time.monotonic():
+                    del self._calls[key]
+                    call = None
+                leader = call is None
+                if leader:
+                    if len(self._calls) >= self.max_entries:
+                        self._purge()
+                    call = self._calls[key] = _Call()
+            if leader:
+                return self._lead(key, call, fn), "leader"
+            if call.done:
+                return call.value, "hit"
+            if not call.event.wait(timeout):
+                return fn(), "timeout"
+            if call.ok:
+                return call.value, "follower"
+            # El líder falló: se reintenta detrás de un líder nuevo
+
+    def _lead(self, key, call, fn):
+        try:
+            value = fn()
+        except BaseException:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done = True
+            call.event.set()
+            raise
+        with self._lock:
+            call.value = value
+            call.ok = self._shareable(value)
+            call.expires_at = time.monotonic() + self.ttl
+            call.done = True
+            # Invalidada durante la ejecución (o fallida): no se guarda para las siguientes
+            if self._calls.get(key) is call and (not call.ok or self.ttl <= 0):
+                del self._calls[key]
+        call.event.set()
+        return value
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, c in self._calls.items() if c.done and c.expires_at <= now]:
+            del self._calls[key]
+        if len(self._calls) >= self.max_entries:
+            logger.warning("Caché %s lleno (%s entradas): se vacía", self.name, len(self._calls))
+            self._calls = {k: c for k, c in self._calls.items() if not c.done}
+
+    def invalidate(self, predicate=None) -> None:
+        """Descarta las entradas cuya clave cumple `predicate` (todas si es None)."""
+        with self._lock:
+            if predicate is None:
+                self._calls = {}
+            else:
+                for key in [k for k in self._calls if predicate(k)]:
+                    del self._calls[key]
+
+
+# =========================
+# Vistas Flask
+# =========================
+def _successful(value) -> bool:
+    return value[1] < 500
+
+
+def response_flight(name: str, ttl: float = COALESCE_TTL) -> SingleFlight:
+    """SingleFlight para respuestas de vistas (no comparte los errores 5xx)."""
+    return SingleFlight(name, ttl, shareable=_successful)
+
+
+def invalidate_on(flight: SingleFlight, model, arg: str = None) -> None:
+    """
+    Invalida las respuestas de `flight` cuando cambia `model` en este proceso:
+    solo las del argumento de ruta `arg` igual al id cambiado o, sin `arg`
+    (o ante un cambio masivo), todas.
+    """
+    def on_change(changes):
+        ids = {record_id for op, record_id in changes}
+        if arg is None or None in ids:
+            flight.invalidate()
+        else:
+            flight.invalidate(lambda key: dict(key[0]).get(arg) in ids)
+    change_events.subscribe(model, on_change)
+
+
+def coalesced(flight: SingleFlight):
+    """
+    Agrupa las peticiones concurrentes idénticas (mismos argumentos de ruta y
+    query string) a la vista y comparte su respuesta serializada: cuerpo,
+    estado y headers (salvo los hop-by-hop y Content-Length, que se recalcula).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ENABLED or request.headers.get(READ_AFTER_HEADER) or request.cookies.get(READ_AFTER_COOKIE):
+                COALESCED_REQUESTS.inc(cache=flight.name, result="bypass")
+                return view(*args, **kwargs)
+
+            def compute():
+                response = current_app.make_response(view(*args, **kwargs))
+                headers = [(name, value) for name, value in response.headers.items()
+                           if name.lower() != "content-length" and not is_hop_by_hop_header(name)]
+                return response.get_data(), response.status_code, headers
+
+            key = (tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            left = remaining()
+            (body, status, headers), origin = flight.do(
+                key, compute, timeout=max(0.0, left) if left is not None else _DEFAULT_WAIT)
+            COALESCED_REQUESTS.inc(cache=flight.name, result=origin)
+            return Response(body, status=status, headers=headers)
+        return wrapper
+    return decorator
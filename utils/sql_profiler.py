@@ -0,0 +1,206 @@
+"""
+Perfilador de SQL por petición.
+
+Agrupa las sentencias por huella (la sentencia sin literales ni listas de
+parámetros), cuenta ejecuciones y tiempos, marca como sospechosas de N+1 las
+huellas SELECT repetidas dentro de una misma petición y escribe un log de
+consultas lentas.
+
+Variables de entorno:
+    SQL_PROFILER_ENABLED       "1" para activar el perfilador (desactivado por defecto).
+    SQL_PROFILER_N1_THRESHOLD  Repeticiones de una huella SELECT para sospechar N+1 (por defecto 5).
+    SQL_SLOW_QUERY_MS          Umbral del log de consultas lentas en ms (por defecto 200).
+    SQL_SLOW_LOG_FILE          Archivo opcional para el log de consultas lentas.
+    SQL_PROFILER_SERVER_TIMING "1" para añadir el header Server-Timing a las respuestas.
+
+`profile_queries()` permite usar el mismo registro fuera de una petición
+(scripts, benchmarks).
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.logging_config import queued_handler
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("sql.slow")
+n_plus_one_logger = logging.getLogger("sql.n_plus_one")
+
+_current_profile = contextvars.ContextVar("sql_profile", default=None)
+
+_COMMENTS = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+_fingerprints = {}
+_FINGERPRINT_CACHE_SIZE = 2048
+
+
+def fingerprint(statement: str) -> str:
+    """Normaliza una sentencia para agrupar ejecuciones equivalentes."""
+    cached = _fingerprints.get(statement)
+    if cached is not None:
+        return cached
+    fp = _COMMENTS.sub(" ", statement)
+    fp = _STRINGS.sub("?", fp)
+    fp = _NUMBERS.sub("?", fp)
+    fp = _PLACEHOLDERS.sub("?", fp)
+    fp = _IN_LISTS.sub("(...)", fp)
+    fp = _SPACES.sub(" ", fp).strip()
+    if len(_fingerprints) >= _FINGERPRINT_CACHE_SIZE:
+        _fingerprints.clear()
+    _fingerprints[statement] = fp
+    return fp
+
+
+class QueryProfile:
+    """Estadísticas de las sentencias ejecutadas en un ámbito (petición o bloque)."""
+
+    def __init__(self):
+        self.fingerprints = {}  # huella -> [conteo, tiempo_total, tiempo_max, sentencia_ejemplo]
+        self.count = 0
+        self.total_time = 0.0
+
+    def record(self, statement: str, elapsed: float) -> None:
+        fp = fingerprint(statement)
+        stats = self.fingerprints.get(fp)
+        if stats is None:
+            self.fingerprints[fp] = [1, elapsed, elapsed, statement]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+        self.count += 1
+        self.total_time += elapsed
+
+    def suspected_n_plus_one(self, threshold: int = None) -> list:
+        """Huellas SELECT que se repiten al menos `threshold` veces."""
+        if threshold is None:
+            threshold = int(os.getenv("SQL_PROFILER_N1_THRESHOLD", "5"))
+        return [
+            {"fingerprint": fp, "count": stats[0], "total_ms": round(stats[1] * 1000, 3)}
+            for fp, stats in self.fingerprints.items()
+            if stats[0] >= threshold and fp[:6].upper() == "SELECT"
+        ]
+
+    def summary(self) -> list:
+        """Huellas ordenadas por tiempo total, de mayor a menor."""
+        return [
+            {
+                "fingerprint": fp,
+                "count": stats[0],
+                "total_ms": round(stats[1] * 1000, 3),
+                "max_ms": round(stats[2] * 1000, 3),
+            }
+            for fp, stats in sorted(self.fingerprints.items(), key=lambda item: item[1][1], reverse=True)
+        ]
+
+
+def current_profile():
+    """Perfil activo en el contexto actual, o None."""
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries():
+    """Registra las sentencias ejecutadas dentro del bloque."""
+    _instrument_engines()
+    profile = QueryProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+# =========================
+# Eventos SQLAlchemy
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("profiler_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    if elapsed * 1000 >= _slow_query_ms:
+        slow_logger.warning(
+            "Consulta lenta (%.1f ms): %s", elapsed * 1000, statement,
+            extra={"duration_ms": round(elapsed * 1000, 3), "fingerprint": fingerprint(statement)},
+        )
+
+
+_slow_query_ms = float("inf")
+
+
+def _instrument_engines() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# =========================
+# Hooks Flask
+# =========================
+def _start_profile():
+    g.sql_profile_token = _current_profile.set(QueryProfile())
+
+
+def _finish_profile(response):
+    profile = _current_profile.get()
+    if profile is None:
+        return response
+    for suspect in profile.suspected_n_plus_one():
+        n_plus_one_logger.warning(
+            "Posible N+1 en %s %s: %s ejecuciones de %s",
+            request.method, request.path, suspect["count"], suspect["fingerprint"],
+            extra={"endpoint": request.endpoint, "count": suspect["count"]},
+        )
+    if os.getenv("SQL_PROFILER_SERVER_TIMING") == "1":
+        entry = f'db;dur={profile.total_time * 1000:.2f};desc="{profile.count} queries"'
+        existing = response.headers.get("Server-Timing")
+        response.headers["Server-Timing"] = f"{existing}, {entry}" if existing else entry
+    return response
+
+
+def _reset_profile(exc):
+    token = g.pop("sql_profile_token", None)
+    if token is not None:
+        _current_profile.reset(token)
+
+
+def init_sql_profiler(app) -> None:
+    """Activa el perfilador si SQL_PROFILER_ENABLED=1; en otro caso no añade ningún hook."""
+    global _slow_query_ms
+    if os.getenv("SQL_PROFILER_ENABLED") != "1":
+        return
+
+    _slow_query_ms = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    slow_log_file = os.getenv("SQL_SLOW_LOG_FILE")
+    if slow_log_file and not slow_logger.handlers:
+        handler = logging.FileHandler(slow_log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        # Lo escribe un hilo aparte, como el resto de los logs
+        slow_logger.addHandler(queued_handler(handler))
+
+    _instrument_engines()
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_reset_profile)
+    logger.info("Perfilador SQL activado (consultas lentas >= %s ms)", _slow_query_ms)
@@ -0,0 +1,21 @@
+"""
+Normalización de texto en español para búsquedas y claves.
+"""
+import re
+import unicodedata
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas sin tildes ni diéresis, en ASCII: "Reggaetón Pingüino" -> "reggaeton pinguino"."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    # NFKD separa las marcas diacríticas, que desaparecen al pasar a ASCII
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def slugify(text: str) -> str:
+    """Clave estable para URLs y filtros: "Hip Hop" -> "hip-hop"."""
+    return _NON_ALNUM.sub("-", fold(text)).strip("-")
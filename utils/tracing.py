@@ -0,0 +1,331 @@
+"""
+Trazas en proceso por capas (controlador, servicio, repositorio, SQL, email).
+
+Cada petición recibe un ID de correlación (header X-Request-ID, o uno nuevo)
+que se devuelve en la respuesta y se añade a los logs. Una fracción de las
+peticiones (TRACE_SAMPLE_RATE, 0.01 por defecto) se traza: el span raíz
+representa al controlador, `@traced(capa)` crea spans hijos para servicios,
+repositorios y email, y cada sentencia SQL es un span "db". Si la petición
+trae un header W3C `traceparent`, se respetan su trace id y su decisión de
+muestreo.
+
+Los spans terminados se exportan en segundo plano en formato Zipkin v2 (JSON)
+con un POST a TRACE_EXPORT_URL (ej: http://localhost:9411/api/v2/spans) o,
+si no, a TRACE_EXPORT_FILE (una línea JSON por span), que rota al superar
+TRACE_EXPORT_MAX_BYTES (50 MiB) conservando TRACE_EXPORT_BACKUPS copias
+(.1, .2, ...). Sin ninguno de los dos no hay exportador y no se traza nada:
+solo quedan los IDs de correlación.
+
+En las peticiones no muestreadas el costo es una lectura de ContextVar por
+llamada decorada.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.logging_config import request_id_var as _request_id
+from utils.sql_profiler import fingerprint
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "partyfinder-api")
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(r"^[\w.:-]{1,128}$")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def current_request_id():
+    """ID de correlación de la petición en curso, o None fuera de una petición."""
+    return _request_id.get()
+
+
+class Span:
+    """Unidad de trabajo cronometrada dentro de una traza."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "layer", "start_us", "_start", "duration_us", "tags")
+
+    def __init__(self, trace_id: str, parent_id, name: str, layer: str, tags: dict = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.layer = layer
+        self.start_us = int(time.time() * 1_000_000)
+        self._start = time.perf_counter()
+        self.duration_us = None
+        self.tags = tags or {}
+
+    def finish(self) -> None:
+        self.duration_us = max(1, int((time.perf_counter() - self._start) * 1_000_000))
+        _exporter.submit(self)
+
+    def child(self, name: str, layer: str, tags: dict = None) -> "Span":
+        return Span(self.trace_id, self.span_id, name, layer, tags)
+
+    def to_zipkin(self) -> dict:
+        tags = {"layer": self.layer}
+        tags.update({k: str(v) for k, v in self.tags.items()})
+        span = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": self.start_us,
+            "duration": self.duration_us,
+            "localEndpoint": {"serviceName": SERVICE_NAME},
+            "tags": tags,
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        else:
+            span["kind"] = "SERVER"
+        return span
+
+
+class _SpanContext:
+    """Context manager que activa un span hijo del span actual (si lo hay)."""
+
+    __slots__ = ("name", "layer", "tags", "span", "token")
+
+    def __init__(self, name: str, layer: str, tags: dict):
+        self.name = name
+        self.layer = layer
+        self.tags = tags
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self.span = parent.child(self.name, self.layer, self.tags)
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None:
+            if exc is not None:
+                self.span.tags["error"] = repr(exc)
+            _current_span.reset(self.token)
+            self.span.finish()
+        return False
+
+
+def span(name: str, layer: str, **tags) -> _SpanContext:
+    """Crea un span hijo: `with span("smtp.send", "email"): ...`."""
+    return _SpanContext(name, layer, tags)
+
+
+def traced(layer: str):
+    """Decorador que envuelve la función en un span de la capa indicada."""
+    def decorator(fn):
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with _SpanContext(name, layer, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# =========================
+# Exportación
+# =========================
+class _SpanExporter:
+    """Agrupa spans terminados y los escribe desde un hilo en segundo plano."""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, finished: Span) -> None:
+        if self._thread is None:
+            self._start()
+        self._queue.put(finished)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                return
+            stop = False
+            while len(batch) < 512:
+                try:
+                    item = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._export([s.to_zipkin() for s in batch])
+            if stop:
+                return
+
+    @staticmethod
+    def _export(spans: list) -> None:
+        url = os.getenv("TRACE_EXPORT_URL")
+        try:
+            if url:
+                body = json.dumps(spans).encode("utf-8")
+                req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(req, timeout=5).close()
+            else:
+                path = os.environ["TRACE_EXPORT_FILE"]
+                _SpanExporter._rotate(path)
+                with open(path, "a") as fh:
+                    fh.write("".join(json.dumps(s) + "\n" for s in spans))
+        except Exception as e:
+            logger.warning("No se pudieron exportar %s spans: %s", len(spans), e)
+
+    @staticmethod
+    def _rotate(path: str) -> None:
+        """Rota `path` a .1, .2, ... si supera TRACE_EXPORT_MAX_BYTES."""
+        max_bytes = int(os.getenv("TRACE_EXPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+        backups = int(os.getenv("TRACE_EXPORT_BACKUPS", "3"))
+        try:
+            if os.path.getsize(path) < max_bytes:
+                return
+        except OSError:
+            return
+        for index in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    def shutdown(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_exporter = _SpanExporter()
+atexit.register(_exporter.shutdown)
+
+
+# =========================
+# SQL
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is not None:
+        conn.info.setdefault("trace_spans", []).append(parent.child("db.query", "db", {"db.statement": fingerprint(statement)}))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans and _current_span.get() is not None:
+        spans.pop().finish()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        failed = spans.pop()
+        failed.tags["error"] = repr(exception_context.original_exception)
+        failed.finish()
+
+
+# =========================
+# Hooks Flask
+# =========================
+def _parse_traceparent(header: str):
+    """Devuelve (trace_id, parent_id, sampled) de un header W3C traceparent, o None."""
+    parts = header.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+def _start_request():
+    request_id = request.headers.get(REQUEST_ID_HEADER, "")
+    if not _VALID_REQUEST_ID.match(request_id):
+        request_id = uuid.uuid4().hex
+    g.request_id = request_id
+    g.request_id_token = _request_id.set(request_id)
+
+    parent = _parse_traceparent(request.headers.get("traceparent", ""))
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id, sampled = uuid.uuid4().hex, None, random.random() < _sample_rate
+    if not sampled or not _exporting:
+        return
+
+    root = Span(trace_id, parent_id, request.endpoint or "unmatched", "controller",
+                {"http.method": request.method, "http.path": request.path, "request_id": request_id})
+    g.trace_root = root
+    g.trace_token = _current_span.set(root)
+
+
+def _finish_request(response):
+    response.headers[REQUEST_ID_HEADER] = g.get("request_id", "")
+    root = g.get("trace_root")
+    if root is not None:
+        root.tags["http.status_code"] = response.status_code
+        response.headers["traceparent"] = f"00-{root.trace_id}-{root.span_id}-01"
+    return response
+
+
+def _teardown_request(exc):
+    root = g.pop("trace_root", None)
+    if root is not None:
+        if exc is not None:
+            root.tags["error"] = repr(exc)
+        _current_span.reset(g.pop("trace_token"))
+        root.finish()
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        _request_id.reset(token)
+
+
+_sample_rate = 0.0
+_exporting = False
+
+
+def init_tracing(app) -> None:
+    """Registra IDs de correlación y, si hay exportador y TRACE_SAMPLE_RATE > 0, las trazas por petición."""
+    global _sample_rate, _exporting
+    _exporting = bool(os.getenv("TRACE_EXPORT_URL") or os.getenv("TRACE_EXPORT_FILE"))
+    _sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0.01")) if _exporting else 0.0
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    if _exporting:
+        logger.info("Trazas activadas (muestreo %s)", _sample_rate)
+    else:
+        logger.info("Trazas desactivadas: sin TRACE_EXPORT_URL ni TRACE_EXPORT_FILE (solo IDs de correlación)")
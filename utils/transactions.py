@@ -0,0 +1,121 @@
+"""
+Unidad de trabajo transaccional con reintentos.
+
+`@transactional("reservation.create")` envuelve un método de servicio que
+escribe con `db.session` y hace commit:
+    - si lanza una excepción: rollback; si es un error transitorio
+      (deadlock, lock wait timeout, fallo de serialización, SQLite
+      bloqueada) y la transacción no llegó a confirmarse, se repite entera
+      tras una espera exponencial con jitter, mientras queden intentos
+      (TX_RETRY_ATTEMPTS) y tiempo (TX_RETRY_BUDGET segundos, sin pasar del
+      plazo de la petición de utils.deadlines); si no,
+      devuelve {"error": ...} como el resto de servicios;
+    - si devuelve un dict con "error": rollback de lo que hubiera quedado
+      pendiente (ej. un flush previo a una validación).
+
+La función se vuelve a ejecutar desde el principio, así que no debe tener
+efectos fuera de la base de datos antes del commit (emails, llamadas
+externas): esos van después, fuera del método decorado. Las llamadas
+anidadas se ejecutan dentro de la unidad de trabajo exterior.
+"""
+import functools
+import logging
+import os
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from models.db import db
+from utils.deadlines import remaining
+from utils.metrics import DB_TX_FAILURES, DB_TX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+TX_RETRY_ATTEMPTS = int(os.getenv("TX_RETRY_ATTEMPTS", "5"))
+TX_RETRY_BUDGET = float(os.getenv("TX_RETRY_BUDGET", "2.0"))
+TX_RETRY_BASE_DELAY = float(os.getenv("TX_RETRY_BASE_DELAY", "0.02"))
+TX_RETRY_MAX_DELAY = float(os.getenv("TX_RETRY_MAX_DELAY", "0.5"))
+
+# Errores de MySQL tras los que InnoDB ya deshizo la sentencia o la transacción
+_MYSQL_RETRYABLE = {1205: "lock_wait_timeout", 1213: "deadlock"}
+_SQLSTATE_RETRYABLE = {"40001": "serialization_failure", "40P01": "deadlock"}
+_SQLITE_LOCKED = ("database is locked", "database table is locked")
+
+_DEPTH_KEY = "tx_depth"
+_COMMITTED_KEY = "tx_committed"
+
+
+def retry_reason(exc: BaseException):
+    """Motivo si `exc` es un error transitorio que justifica repetir la transacción; None si no."""
+    if not isinstance(exc, DBAPIError) or exc.orig is None:
+        return None
+    orig = exc.orig
+    code = orig.args[0] if getattr(orig, "args", None) else None
+    if isinstance(code, int) and code in _MYSQL_RETRYABLE:
+        return _MYSQL_RETRYABLE[code]
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if sqlstate in _SQLSTATE_RETRYABLE:
+        return _SQLSTATE_RETRYABLE[sqlstate]
+    message = str(orig).lower()
+    if any(text in message for text in _SQLITE_LOCKED):
+        return "sqlite_locked"
+    return None
+
+
+def _backoff(attempt: int) -> float:
+    """Espera antes del intento `attempt + 1` (full jitter)."""
+    return random.uniform(0, min(TX_RETRY_MAX_DELAY, TX_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def _after_commit(session):
+    if session.info.get(_DEPTH_KEY):
+        session.info[_COMMITTED_KEY] = True
+
+
+def transactional(operation: str):
+    """Decorador de unidad de trabajo con reintentos; `operation` etiqueta los logs y métricas."""
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_commit", _after_commit)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = db.session()
+            if session.info.get(_DEPTH_KEY):
+                return fn(*args, **kwargs)
+
+            left = remaining()
+            deadline = time.monotonic() + (TX_RETRY_BUDGET if left is None else min(TX_RETRY_BUDGET, left))
+            attempt = 0
+            while True:
+                attempt += 1
+                session.info[_DEPTH_KEY] = 1
+                session.info[_COMMITTED_KEY] = False
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    session.rollback()
+                    reason = retry_reason(e)
+                    if reason is None:
+                        logger.error("Error en %s: %s", operation, e)
+                        return {"error": str(e)}
+                    delay = _backoff(attempt)
+                    if (not session.info[_COMMITTED_KEY] and attempt < TX_RETRY_ATTEMPTS
+                            and time.monotonic() + delay < deadline):
+                        DB_TX_RETRIES.inc(operation=operation, reason=reason)
+                        logger.warning("Reintentando %s tras %s (intento %s): %s", operation, reason, attempt, e)
+                        time.sleep(delay)
+                        continue
+                    DB_TX_FAILURES.inc(operation=operation, reason=reason)
+                    logger.error("Error en %s tras %s intento(s) (%s): %s", operation, attempt, reason, e)
+                    return {"error": str(e)}
+                finally:
+                    session.info[_DEPTH_KEY] = 0
+                if isinstance(result, dict) and "error" in result:
+                    session.rollback()
+                return result
+        return wrapper
+    return decorator